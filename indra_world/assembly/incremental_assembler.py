@@ -26,8 +26,11 @@ class IncrementalAssembler:
 
     Parameters
     ----------
-    prepared_stmts : list[indra.statements.Statement]
-        A list of prepared INDRA Statements.
+    prepared_stmts : iterable[indra.statements.Statement]
+        A list of prepared INDRA Statements, or any other iterable of them,
+        for instance, a generator decoding them from the DB in chunks. Note
+        that all the statements are kept in memory since any other iterable
+        is made into a list which is stored in the prepared_stmts attribute.
     refinement_filters : Optional[list[indra.preassembler.refinement.RefinementFilter]]
         A list of refinement filter classes to be used for refinement
         finding. Default: the standard set of compositional refinement filters.
@@ -59,7 +62,8 @@ class IncrementalAssembler:
         self.stmts_by_hash = {}
         self.evs_by_stmt_hash = {}
         self.refinement_edges = set()
-        self.prepared_stmts = prepared_stmts
+        self.prepared_stmts = prepared_stmts \
+            if isinstance(prepared_stmts, list) else list(prepared_stmts)
         self.known_corrects = set()
         self.ontology = ontology if ontology else world_ontology
 
@@ -3,7 +3,8 @@ __all__ = ['get_expanded_events_influences', 'remove_namespaces',
            'remove_hume_redundant', 'fix_wm_ontology', 'filter_context_date',
            'filter_groundings', 'deduplicate_groundings',
            'compositional_grounding_filter_stmt',
-           'compositional_grounding_filter', 'standardize_names_compositional',
+           'compositional_grounding_filter', 'copy_stmt_shared_evidence',
+           'standardize_names_compositional',
            'add_flattened_grounding_compositional', 'validate_grounding_format',
            'make_display_name', 'make_display_name_linear',
            'set_positive_polarities',
@@ -28,6 +29,7 @@ from indra.pipeline import register_pipeline
 from indra.statements import Influence, Association, Event
 from indra.statements.concept import get_sorted_compositional_groundings
 from indra_world.sources.eidos.client import reground_texts
+from indra_world.sources.eidos.grounding_cache import GroundingCache
 
 from .matches import *
 from .refinement import *
@@ -39,32 +41,71 @@ register_pipeline(datetime)
 
 
 @register_pipeline
-def get_expanded_events_influences(stmts):
-    """Return a list of all standalone events from a list of statements."""
+def get_expanded_events_influences(stmts, copy_mode='deep'):
+    """Return a list of all standalone events from a list of statements.
+
+    Parameters
+    ----------
+    stmts : list[indra.statements.Statement]
+        A list of INDRA Statements to expand.
+    copy_mode : Optional[str]
+        If 'deep', each statement is deep-copied, including all its
+        evidences, before its members are expanded. If 'cow', only the
+        members themselves are copied and each expanded event gets shallow
+        copies of the original evidences with their context removed, so
+        evidence text, annotations and text_refs are shared with the
+        original statement rather than duplicated. Default: 'deep'
+
+    Returns
+    -------
+    list[indra.statements.Statement]
+        A list of the expanded Events along with the original Influences.
+    """
+    if copy_mode not in {'deep', 'cow'}:
+        raise ValueError('Invalid copy mode: %s' % copy_mode)
     events_influences = []
     for stmt_orig in stmts:
-        stmt = copy.deepcopy(stmt_orig)
-        if isinstance(stmt, Influence):
-            for member in [stmt.subj, stmt.obj]:
-                member.evidence = stmt.evidence[:]
+        if copy_mode == 'deep':
+            stmt = copy.deepcopy(stmt_orig)
+        else:
+            stmt = stmt_orig
+        if isinstance(stmt, (Influence, Association)):
+            members = [stmt.subj, stmt.obj] if isinstance(stmt, Influence) \
+                else stmt.members
+            for member in members:
+                if copy_mode == 'deep':
+                    member.evidence = stmt.evidence[:]
+                else:
+                    member = copy_stmt_shared_evidence(member)
+                    member.evidence = [copy.copy(ev) for ev in stmt.evidence]
                 # Remove the context since it may be for the other member
                 for ev in member.evidence:
                     ev.context = None
                 events_influences.append(member)
             # We add the Influence too
-            events_influences.append(stmt_orig)
-        elif isinstance(stmt, Association):
-            for member in stmt.members:
-                member.evidence = stmt.evidence[:]
-                # Remove the context since it may be for the other member
-                for ev in member.evidence:
-                    ev.context = None
-                events_influences.append(member)
+            if isinstance(stmt, Influence):
+                events_influences.append(stmt_orig)
         elif isinstance(stmt, Event):
+            if copy_mode == 'cow':
+                stmt = copy_stmt_shared_evidence(stmt)
             events_influences.append(stmt)
     return events_influences
 
 
+def copy_stmt_shared_evidence(stmt):
+    """Return a copy of a statement which shares its evidences with the
+    original.
+
+    The statement's agents, their db_refs and any other attributes are
+    deep-copied so that they can be modified independently of the original,
+    while the (typically much larger) Evidence objects are not copied.
+    The evidence list itself is a new list so evidences can be added to or
+    removed from the copy without affecting the original.
+    """
+    memo = {id(ev): ev for ev in stmt.evidence}
+    return copy.deepcopy(stmt, memo)
+
+
 @register_pipeline
 def remove_namespaces(stmts, namespaces):
     """Remove unnecessary namespaces from Concept grounding."""
@@ -105,8 +146,58 @@ def check_event_context(events):
 
 @register_pipeline
 def reground_stmts(stmts, ont_manager, namespace, eidos_service=None,
-                   overwrite=True, sources=None):
+                   overwrite=True, sources=None, grounding_cache_path=None,
+                   grounding_cache_max_entries=1000000, max_workers=1,
+                   previous_ont_manager=None):
+    """Reground concepts in statements with the Eidos service.
+
+    Parameters
+    ----------
+    stmts : list[indra.statements.Statement]
+        A list of INDRA Statements whose concepts should be regrounded.
+    ont_manager : indra_world.ontology.WorldOntology
+        The ontology to reground concepts with respect to.
+    namespace : str
+        The db_refs namespace in which the new groundings are set.
+    eidos_service : Optional[str]
+        The address of the Eidos web service. Default: http://localhost:9000
+    overwrite : Optional[bool]
+        If True, existing groundings in the given namespace are overwritten.
+        Default: True
+    sources : Optional[set[str]]
+        Only statements with evidence from these sources are regrounded.
+        Default: {'sofia', 'cwms'}
+    grounding_cache_path : Optional[str]
+        The path to an SQLite file used as a persistent grounding cache
+        shared across calls and processes. If not given, no persistent
+        cache is used. Default: None
+    grounding_cache_max_entries : Optional[int]
+        The maximum number of entries kept in the persistent grounding
+        cache. Default: 1000000
+    max_workers : Optional[int]
+        The number of regrounding requests sent to Eidos concurrently.
+        Default: 1
+    previous_ont_manager : Optional[indra_world.ontology.WorldOntology]
+        A previous version of the ontology. If given along with a
+        grounding_cache_path, regrounding is incremental: only texts whose
+        groundings with respect to the previous ontology, as found in the
+        persistent cache, may be affected by ontology changes are regrounded.
+        Default: None
+
+    Returns
+    -------
+    list[indra.statements.Statement]
+        The list of statements with regrounded concepts.
+    """
     ont_manager.initialize()
+    previous_yaml_str = None
+    if previous_ont_manager is not None:
+        if not grounding_cache_path:
+            logger.warning('Incremental regrounding requires a grounding '
+                           'cache, all texts will be regrounded.')
+        else:
+            previous_ont_manager.initialize()
+            previous_yaml_str = yaml.dump(previous_ont_manager.yml)
     if sources is None:
         sources = {'sofia', 'cwms'}
     if eidos_service is None:
@@ -123,8 +214,14 @@ def reground_stmts(stmts, ont_manager, namespace, eidos_service=None,
             concept_txt = concept.db_refs.get('TEXT')
             concepts.append(concept_txt)
     logger.info(f'Finding grounding for {len(concepts)} texts')
+    persistent_cache = GroundingCache(
+        grounding_cache_path, max_entries=grounding_cache_max_entries) \
+        if grounding_cache_path else None
     groundings = reground_texts(concepts, yaml_str,
-                                webservice=eidos_service)
+                                webservice=eidos_service,
+                                persistent_cache=persistent_cache,
+                                max_workers=max_workers,
+                                previous_ont_yml=previous_yaml_str)
     # Update the corpus with new groundings
     idx = 0
     logger.info(f'Setting new grounding for {len(stmts)} statements')
@@ -226,8 +323,41 @@ def deduplicate_groundings(groundings):
 
 def compositional_grounding_filter_stmt(stmt, score_threshold,
                                         groundings_to_exclude,
-                                        remove_self_loops=False):
-    stmt = copy.deepcopy(stmt)
+                                        remove_self_loops=False,
+                                        copy_mode='deep'):
+    """Return a statement with its compositional groundings filtered.
+
+    Parameters
+    ----------
+    stmt : indra.statements.Statement
+        The statement whose WM groundings should be filtered.
+    score_threshold : float
+        Grounding entries with a score below this threshold are removed.
+    groundings_to_exclude : list[str]
+        Grounding entries for these ontology nodes are removed.
+    remove_self_loops : Optional[bool]
+        If True, properties and processes that are the same as the theme
+        are removed. Default: False
+    copy_mode : Optional[str]
+        If 'deep', the statement is deep-copied along with all its evidences
+        before filtering. If 'cow', the statement and its agents are copied
+        but evidences are shared with the original statement, which is
+        left unchanged. If 'inplace', the statement is not copied and its
+        groundings are modified in place, even if it is eventually filtered
+        out. Default: 'deep'
+
+    Returns
+    -------
+    indra.statements.Statement or None
+        The statement with filtered groundings or None if any of its
+        agents ended up without a grounding.
+    """
+    if copy_mode == 'deep':
+        stmt = copy.deepcopy(stmt)
+    elif copy_mode == 'cow':
+        stmt = copy_stmt_shared_evidence(stmt)
+    elif copy_mode != 'inplace':
+        raise ValueError('Invalid copy mode: %s' % copy_mode)
     for concept in stmt.agent_list():
         if concept is not None and 'WM' in concept.db_refs:
             wm_groundings = copy.copy(concept.db_refs['WM'])
@@ -294,14 +424,16 @@ def compositional_grounding_filter_stmt(stmt, score_threshold,
 @register_pipeline
 def compositional_grounding_filter(stmts, score_threshold,
                                    groundings_to_exclude=None,
-                                   remove_self_loops=False):
+                                   remove_self_loops=False,
+                                   copy_mode='deep'):
     groundings_to_exclude = groundings_to_exclude \
         if groundings_to_exclude else []
     stmts_out = []
     for stmt in stmts:
         stmt_out = compositional_grounding_filter_stmt(stmt, score_threshold,
                                                        groundings_to_exclude,
-                                                       remove_self_loops=remove_self_loops)
+                                                       remove_self_loops=remove_self_loops,
+                                                       copy_mode=copy_mode)
         if stmt_out:
             stmts_out.append(stmt_out)
     return stmts_out
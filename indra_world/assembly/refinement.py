@@ -238,8 +238,9 @@ def event_compositional_refinement(st1, st2, ontology, entities_refined,
             refinement = False
             break
         # Otherwise the values can still be equal which we allow
-        # for refinement purposes
-        elif entry1 == entry2:
+        # for refinement purposes. Groundings are interned so equal
+        # values are typically identical.
+        elif entry1 is entry2 or entry1 == entry2:
             continue
         # Finally, the only way there is a refinement is if entry1
         # isa entry2
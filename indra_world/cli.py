@@ -6,6 +6,7 @@ from indra.pipeline import AssemblyPipeline
 from indra.statements import stmts_to_json_file
 from indra_world.assembly.incremental_assembler import IncrementalAssembler
 from indra_world.sources import dart
+from indra_world.sources.dart.stmt_cache import StatementCache
 from indra_world.ontology import WorldOntology
 from indra_world.assembly.operations import *
 from indra_world.service.controller import preparation_pipeline
@@ -53,6 +54,17 @@ def main():
              "corresponding to a reader output record. Only applicable if "
              "DART is being used.")
 
+    group.add_argument(
+        '--nproc', type=int, default=1,
+        help="The number of worker processes to use for processing reader "
+             "outputs. Default: 1")
+    group.add_argument(
+        '--stmt-cache', type=str,
+        help="Path to a file in which statements processed from each reader "
+             "output are cached, so that reader outputs don't need to be "
+             "processed again in subsequent runs unless the processing code "
+             "changes.")
+
     group = parser.add_argument_group('Assembly options')
 
     group.add_argument(
@@ -83,27 +95,23 @@ def main():
 
     args = parser.parse_args()
 
-    # Handle input options first and construct in-memory reader outputs
+    # Handle input options first and construct the reader output items
+    # (files or DART records) to be processed
+    dc = None
     if args.reader_output_files:
         index = load_json_file(args.reader_output_files)
-        reader_outputs = {}
-        for reader, files in index.items():
-            reader_outputs[reader] = {}
-            for file in files:
-                content = load_text_file(file)
-                reader_outputs[reader][file] = content
+        items = [(reader, file, file) for reader, files in index.items()
+                 for file in files]
     elif args.reader_output_dart_query:
         query_args = load_json_file(args.reader_output_dart_query)
         dc = dart.DartClient()
-        records = dc.get_reader_output_records(**query_args)
-        reader_outputs = dc.get_outputs_from_records(records)
+        items = dc.get_reader_output_records(**query_args)
     elif args.reader_output_dart_keys:
         dc = dart.DartClient()
         records = dc.get_reader_output_records(
             readers=['eidos', 'sofia', 'hume'])
         record_keys = load_list_file(args.reader_output_dart_keys)
-        records = [r for r in records if r['storage_key'] in set(record_keys)]
-        reader_outputs = dc.get_outputs_from_records(records)
+        items = [r for r in records if r['storage_key'] in set(record_keys)]
 
     # Handle assembly options
     if args.assembly_config:
@@ -117,8 +125,23 @@ def main():
         dc = dart.DartClient()
         ontology = dc.get_ontology_graph(args.ontology_id)
 
-    # Now process all the reader outputs into statements
-    stmts = dart.process_reader_outputs(reader_outputs)
+    # Now process all the reader outputs into statements, streaming them
+    # so that reader outputs don't need to be held in memory
+    stmt_cache = StatementCache(args.stmt_cache) if args.stmt_cache else None
+    stmts = []
+    failed_items = []
+    for item, item_stmts in dart.iter_process_reader_outputs(
+            items, dart_client=dc, nproc=args.nproc, stmt_cache=stmt_cache):
+        if item_stmts is None:
+            failed_items.append(item)
+            continue
+        stmts += item_stmts
+    if failed_items:
+        logger.error('Could not process the following %d reader outputs, '
+                     'their statements are missing from the output: %s' %
+                     (len(failed_items),
+                      ', '.join(item['storage_key'] if isinstance(item, dict)
+                                else item[2] for item in failed_items)))
 
     # Run the preparation pipeline, then run assembly to get assembled
     # staements
@@ -0,0 +1,132 @@
+"""A process-wide interning pool for WM groundings of statements.
+
+The same ontology terms and scored grounding entries appear in the db_refs of
+a very large number of concepts across raw, prepared and assembled
+statements. Interning them means that each distinct ontology term string and
+each distinct (term, score) tuple is stored only once per process, which
+reduces memory use substantially and lets equality checks between
+groundings short-circuit on identity.
+
+The pool of (term, score) tuples is bounded and discards the least recently
+used entries beyond its maximum size, which can be set with the
+INDRA_WORLD_INTERNING_POOL_SIZE configuration value. Scores vary widely, so an
+unbounded pool would grow without limit in long-running processes. Discarded
+entries remain valid; they are just no longer shared with entries interned
+later.
+
+Containers of grounding entries that assembly modifies in place (the list of
+groundings and compositional grounding lists) are never shared, only the
+immutable entries inside them are.
+"""
+__all__ = ['intern_term', 'intern_groundings', 'intern_statements',
+           'clear_pool', 'get_pool_size']
+
+import sys
+import threading
+from collections import OrderedDict
+from indra.config import get_config
+
+default_maxsize = 100000
+
+_pool = OrderedDict()
+_pool_lock = threading.Lock()
+_maxsize = None
+
+
+def _get_maxsize():
+    global _maxsize
+    if _maxsize is None:
+        maxsize = get_config('INDRA_WORLD_INTERNING_POOL_SIZE')
+        _maxsize = int(maxsize) if maxsize else default_maxsize
+    return _maxsize
+
+
+def intern_term(term):
+    """Return the interned version of a (term, score) grounding entry.
+
+    Parameters
+    ----------
+    term : tuple or list or None
+        A grounding entry consisting of an ontology term and a score. Lists,
+        as obtained when deserializing from JSON, are converted into tuples.
+
+    Returns
+    -------
+    tuple or None
+        The interned (term, score) tuple, or None if the entry is None.
+    """
+    if term is None:
+        return None
+    name, score = term
+    key = (sys.intern(name), score)
+    with _pool_lock:
+        try:
+            value = _pool[key]
+            _pool.move_to_end(key)
+            return value
+        except KeyError:
+            _pool[key] = key
+            if len(_pool) > _get_maxsize():
+                _pool.popitem(last=False)
+            return key
+
+
+def intern_groundings(groundings):
+    """Return WM groundings with all their entries interned.
+
+    Parameters
+    ----------
+    groundings : list
+        A list of groundings which are either flat (term, score) entries or
+        compositional groundings of four (term, score) entries or None.
+
+    Returns
+    -------
+    list
+        A new list of groundings with the same structure in which each
+        (term, score) entry is interned.
+    """
+    interned = []
+    for grounding in groundings:
+        # A flat grounding entry with a term and a score
+        if grounding and isinstance(grounding[0], str):
+            interned.append(intern_term(grounding))
+        # A compositional grounding whose container type we retain
+        else:
+            interned.append(type(grounding)(intern_term(term)
+                                            for term in grounding))
+    return interned
+
+
+def intern_statements(stmts):
+    """Intern the WM groundings of the concepts of statements in place.
+
+    Parameters
+    ----------
+    stmts : list[indra.statements.Statement]
+        The statements whose concepts' WM groundings should be interned.
+
+    Returns
+    -------
+    list[indra.statements.Statement]
+        The same list of statements.
+    """
+    for stmt in stmts:
+        for concept in stmt.agent_list():
+            if concept is None:
+                continue
+            groundings = concept.db_refs.get('WM')
+            if groundings and isinstance(groundings, list):
+                concept.db_refs['WM'] = intern_groundings(groundings)
+    return stmts
+
+
+def clear_pool():
+    """Remove all the entries from the interning pool."""
+    with _pool_lock:
+        _pool.clear()
+
+
+def get_pool_size():
+    """Return the number of distinct entries in the interning pool."""
+    return len(_pool)
@@ -0,0 +1,110 @@
+"""A JSON codec layer which uses a fast JSON backend when available.
+
+By default, orjson is used if it is installed, otherwise, the standard
+library's json module is used. The backend can also be set explicitly with
+the INDRA_WORLD_JSON_BACKEND configuration value or with set_backend.
+
+The two backends produce the same objects when deserializing, however, the
+serialized output can differ in formatting (e.g., whitespace) and in that
+orjson serializes NaN and infinite floats as null whereas the standard
+library writes them as the (non-standard) NaN and Infinity literals.
+Also note that orjson deserializes integers that don't fit in 64 bits
+(i.e., outside of [-2**63, 2**64-1]) as floats, payloads with such integers
+should be handled with the json backend.
+"""
+__all__ = ['loads', 'dumps', 'load', 'dump', 'set_backend', 'get_backend']
+
+import json
+import logging
+from indra.config import get_config
+
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+backends = {'json', 'orjson'}
+_backend = None
+
+def set_backend(backend):
+    """Set the JSON backend to use, either `json` or `orjson`."""
+    global _backend
+    if backend not in backends:
+        raise ValueError('Invalid JSON backend: %s' % backend)
+    if backend == 'orjson' and orjson is None:
+        raise ValueError('The orjson package is not available.')
+    _backend = backend
+
+
+def get_backend():
+    """Return the name of the JSON backend in use."""
+    global _backend
+    if _backend is None:
+        backend = get_config('INDRA_WORLD_JSON_BACKEND')
+        if backend:
+            set_backend(backend)
+        else:
+            _backend = 'orjson' if orjson is not None else 'json'
+    return _backend
+
+
+def loads(s):
+    """Return an object deserialized from a JSON str or bytes."""
+    if get_backend() == 'orjson':
+        try:
+            return orjson.loads(s)
+        # orjson rejects some content that the standard library accepts,
+        # e.g., NaN literals, in which case we fall back to the latter
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(s)
+
+
+def dumps(obj, indent=None, sort_keys=False):
+    """Return an object serialized as a JSON str.
+
+    Parameters
+    ----------
+    obj : object
+        The object to serialize.
+    indent : Optional[int]
+        The number of spaces to indent with, if any. Note that orjson only
+        supports indentation by 2 spaces, other values are handled by
+        the standard library. Default: None
+    sort_keys : Optional[bool]
+        If True, the keys of dicts are sorted. Default: False
+
+    Note that NaN and infinite floats are serialized as null by orjson but
+    as NaN and Infinity by the standard library.
+
+    Returns
+    -------
+    str
+        The serialized JSON.
+    """
+    if get_backend() == 'orjson' and indent in {None, 2}:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        try:
+            return orjson.dumps(obj, option=option).decode('utf-8')
+        # orjson doesn't support some objects that the standard library can
+        # serialize, for instance, integers beyond 64 bits
+        except orjson.JSONEncodeError:
+            pass
+    return json.dumps(obj, indent=indent, sort_keys=sort_keys)
+
+
+def load(fh):
+    """Return an object deserialized from a JSON file handle."""
+    return loads(fh.read())
+
+
+def dump(obj, fh, indent=None, sort_keys=False):
+    """Serialize an object as JSON into a file handle opened in text mode."""
+    fh.write(dumps(obj, indent=indent, sort_keys=sort_keys))
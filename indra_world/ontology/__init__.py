@@ -1,4 +1,5 @@
 """Module containing the implementation of an IndraOntology for the
 World Modelers use case. """
 from .ontology import world_ontology, load_world_ontology, \
-    WorldOntology, flat_onto_url, comp_onto_url
+    WorldOntology, flat_onto_url, comp_onto_url, get_ontology_nodes, \
+    get_ontology_changes
@@ -261,6 +261,72 @@ class WorldOntology(IndraOntology):
         self._load_yml(self.yml)
 
 
+def get_ontology_nodes(yml):
+    """Return the attributes of each node in an ontology YAML keyed by path.
+
+    Only ontologies in the new format (> v3.0) are supported.
+
+    Parameters
+    ----------
+    yml : list
+        The ontology YAML as loaded by the yaml package.
+
+    Returns
+    -------
+    dict
+        A dict keyed by node path (e.g., wm/concept/agriculture) whose
+        values are dicts of node attributes other than children.
+    """
+    if not (isinstance(yml, list) and set(yml[0]) == {'node'}):
+        raise ValueError('Only ontologies in the new format are supported.')
+    nodes = {}
+
+    def add_node(node, prefix):
+        path = prefix + '/' + node['name'] if prefix else node['name']
+        nodes[path] = {k: v for k, v in node.items() if k != 'children'}
+        for child in node.get('children') or []:
+            add_node(child['node'], path)
+
+    for top_entry in yml:
+        add_node(top_entry['node'], '')
+    return nodes
+
+
+def get_ontology_changes(old_yml, new_yml):
+    """Return the nodes and examples that changed between two ontologies.
+
+    Parameters
+    ----------
+    old_yml : list
+        The previous ontology YAML as loaded by the yaml package.
+    new_yml : list
+        The new ontology YAML as loaded by the yaml package.
+
+    Returns
+    -------
+    changed_nodes : set[str]
+        The paths of nodes that were added, removed or whose attributes
+        (e.g., examples) changed.
+    added_examples : dict[str, list[str]]
+        Examples added to each node, keyed by node path. For new nodes,
+        all their examples are considered added.
+    """
+    old_nodes = get_ontology_nodes(old_yml)
+    new_nodes = get_ontology_nodes(new_yml)
+    changed_nodes = set(old_nodes) ^ set(new_nodes)
+    added_examples = {}
+    for path, attrs in new_nodes.items():
+        old_attrs = old_nodes.get(path, {})
+        if attrs != old_attrs:
+            changed_nodes.add(path)
+        old_examples = set(old_attrs.get('examples') or [])
+        examples = [ex for ex in attrs.get('examples') or []
+                    if ex not in old_examples]
+        if examples:
+            added_examples[path] = examples
+    return changed_nodes, added_examples
+
+
 @register_pipeline
 def load_world_ontology(url=None, default_type='compositional'):
     """Load the world ontology from a given URL or file path."""
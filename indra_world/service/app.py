@@ -1,17 +1,18 @@
 import os.path
 from collections import Counter
-import json
 import logging
 
 from indra.config import get_config
 from indra.statements import stmts_to_json
-from flask import Flask, request, abort
+from flask import Flask, request, abort, make_response
 from flask_bootstrap import Bootstrap
 from flask_restx import Api, Resource, fields, reqparse
 from .controller import ServiceController
 from .corpus_manager import CorpusManager
 from ..sources.dart import DartClient, get_record_key
+from ..sources.dart.stmt_cache import StatementCache
 from ..sources import hume, cwms, sofia, eidos
+from .. import json_codec
 
 logger = logging.getLogger('indra_world.service.app')
 
@@ -20,7 +21,16 @@ if not get_config('DART_WM_URL'):
     dart_client = DartClient(storage_mode='local')
 else:
     dart_client = DartClient(storage_mode='web')
-sc = ServiceController(db_url, dart_client=dart_client)
+stmt_cache_path = get_config('INDRA_WM_STMT_CACHE')
+stmt_cache = StatementCache(stmt_cache_path) if stmt_cache_path else None
+stmt_format = get_config('INDRA_WM_STMT_FORMAT') or 'json'
+db_pool_size = get_config('INDRA_WM_DB_POOL_SIZE')
+db_pool_size = int(db_pool_size) if db_pool_size else None
+db_max_overflow = get_config('INDRA_WM_DB_MAX_OVERFLOW')
+db_max_overflow = int(db_max_overflow) if db_max_overflow else None
+sc = ServiceController(db_url, dart_client=dart_client, stmt_cache=stmt_cache,
+                       stmt_format=stmt_format, db_pool_size=db_pool_size,
+                       db_max_overflow=db_max_overflow)
 
 VERSION = '3.0'
 
@@ -30,10 +40,27 @@ Bootstrap(app)
 app.config['RESTX_MASK_SWAGGER'] = False
 app.config["SWAGGER_UI_DOC_EXPANSION"] = "list"
 app.config['SECRET_KEY'] = 'dev_key'
+
+
+@app.teardown_appcontext
+def remove_db_session(exception=None):
+    """Discard the DB session of the thread that handled the request."""
+    sc.db.remove_session()
+
+
 api = Api(app, title='INDRA World Modelers API',
           description='REST API for INDRA World Modelers',
           version=VERSION)
 
+
+@api.representation('application/json')
+def output_json(data, code, headers=None):
+    """Return a JSON response serialized with the JSON codec."""
+    resp = make_response(json_codec.dumps(data) + '\n', code)
+    resp.headers.extend(headers or {})
+    return resp
+
+
 # Namespaces
 base_ns = api.namespace('Basic functions',
                         'Basic functions',
@@ -534,7 +561,7 @@ class HumeProcessJsonld(Resource):
         """
         args = request.json
         jsonld_str = args.get('jsonld')
-        jsonld = json.loads(jsonld_str)
+        jsonld = json_codec.loads(jsonld_str)
         hp = hume.process_jsonld(jsonld)
         return _stmts_from_proc(hp)
 
@@ -666,7 +693,7 @@ class EidosProcessJsonld(Resource):
         grounding_ns = args.get('grounding_ns')
         extract_filter = args.get('extract_filter')
         grounding_mode = args.get('grounding_mode')
-        jj = json.loads(eidos_json)
+        jj = json_codec.loads(eidos_json)
         ep = eidos.process_json(
             jj, grounding_ns=grounding_ns, extract_filter=extract_filter,
             grounding_mode=grounding_mode)
@@ -708,7 +735,7 @@ class SofiaProcessJson(Resource):
         sofia_json = args.get('json')
         extract_filter = args.get('extract_filter')
         grounding_mode = args.get('grounding_mode')
-        jj = json.loads(sofia_json)
+        jj = json_codec.loads(sofia_json)
         ep = sofia.process_json(
             jj, extract_filter=extract_filter, grounding_mode=grounding_mode)
         return _stmts_from_proc(ep)
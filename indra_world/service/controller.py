@@ -1,8 +1,15 @@
+import tqdm
 import logging
 import datetime
-from indra_world.sources.dart import process_reader_output, DartClient
+import functools
+from multiprocessing import Pool
+from indra import __version__ as indra_version
+from indra.statements import stmts_to_json
+from indra_world.sources.dart import process_reader_output, \
+    process_dart_record_output, DartClient
 from indra_world.assembly.incremental_assembler import \
     IncrementalAssembler
+from indra_world.assembly.matches import location_matches_compositional
 from indra_world.resources import get_resource_file
 from indra.pipeline import AssemblyPipeline
 from indra_world.assembly.operations import *
@@ -19,8 +26,34 @@ expected_readers = {'eidos', 'hume', 'sofia'}
 
 
 class ServiceController:
-    def __init__(self, db_url, dart_client=None):
-        self.db = DbManager(db_url)
+    """Controller for the INDRA World service's DB and assembly state.
+
+    Parameters
+    ----------
+    db_url : str
+        The URL of the service DB.
+    dart_client : Optional[indra_world.sources.dart.DartClient]
+        A DART client used to obtain reader outputs. If not given, a DART
+        client in web mode is created.
+    stmt_cache : Optional[indra_world.sources.dart.stmt_cache.StatementCache]
+        A cache of raw statements processed from reader outputs, used to
+        avoid reprocessing reader outputs for records that were processed
+        before with the same processor code. Default: None
+    stmt_format : Optional[str]
+        The format in which prepared statements are stored in the DB, see
+        DbManager for options. Default: json
+    db_pool_size : Optional[int]
+        The size of the DB connection pool, see DbManager. Default: None
+    db_max_overflow : Optional[int]
+        The number of DB connections that can be opened beyond the pool
+        size, see DbManager. Default: None
+    """
+    def __init__(self, db_url, dart_client=None, stmt_cache=None,
+                 stmt_format='json', db_pool_size=None, db_max_overflow=None):
+        self.db = DbManager(db_url, stmt_format=stmt_format,
+                            pool_size=db_pool_size,
+                            max_overflow=db_max_overflow)
+        self.stmt_cache = stmt_cache
         self.assemblers = {}
         self.assembly_triggers = {}
         if dart_client:
@@ -34,16 +67,16 @@ class ServiceController:
         if res is None:
             return None
         if corpus_id:
-            record_keys = self.db.get_records_for_corpus(corpus_id)
-            return self.db.add_records_for_project(project_id, record_keys)
+            return self.db.add_records_for_project_from_corpus(project_id,
+                                                               corpus_id)
 
     def load_project(self, project_id, record_keys=None):
         """Load a given project for incremental assembly into memory."""
         # 1. Select records associated with project
         if record_keys is None:
             record_keys = self.db.get_records_for_project(project_id)
-        # 2. Select statements from prepared stmts table
-        prepared_stmts = self.db.get_statements_for_records(record_keys)
+        # 2. Select statements from prepared stmts table in chunks
+        prepared_stmts = self.db.iter_statements_for_records(record_keys)
         # 3. Select curations for project
         curations = self.get_project_curations(project_id)
         # 4. Try to find the right ontology
@@ -88,13 +121,59 @@ class ServiceController:
                                        tenants=record.get('tenants'),
                                        )
 
+    def sync_dart_records(self, **query_args):
+        """Fetch DART records newer than the last sync of the same query and
+        add or update them in the database.
+
+        Parameters
+        ----------
+        **query_args :
+            Query arguments passed to
+            DartClient.sync_reader_output_records.
+
+        Returns
+        -------
+        list[dict]
+            The list of new DART records.
+        """
+        records = self.dart_client.sync_reader_output_records(**query_args)
+        date = datetime.datetime.utcnow().isoformat()
+        db_records = []
+        for record in records:
+            db_record = {
+                'reader': record['identity'],
+                'reader_version': record['version'],
+                'output_version': record.get('output_version'),
+                'document_id': record['document_id'],
+                'storage_key': record['storage_key'],
+                'date': date,
+            }
+            # DART gives labels and tenants as lists which we store in
+            # the same pipe-joined form as records added via the API
+            for key in ['labels', 'tenants']:
+                value = record.get(key)
+                db_record[key] = '|'.join(value) \
+                    if isinstance(value, list) else value
+            db_records.append(db_record)
+        self.db.upsert_dart_records(db_records)
+        return records
+
     def process_dart_record(self, record, grounding_mode='compositional',
                             extract_filter='influence'):
-        """Process a DART record's corresponding reader output."""
-        reader_output = self.dart_client.get_output_from_record(record)
-        return self.add_reader_output(reader_output, record,
-                                      grounding_mode=grounding_mode,
-                                      extract_filter=extract_filter)
+        """Process a DART record's corresponding reader output.
+
+        Returns None without adding any statements if the reader output for
+        the record isn't available.
+        """
+        stmts = process_dart_record_output(record, self.dart_client,
+                                           grounding_mode=grounding_mode,
+                                           extract_filter=extract_filter,
+                                           stmt_cache=self.stmt_cache)
+        if stmts is None:
+            logger.error('Could not get reader output for DART record %s'
+                         % record['storage_key'])
+            return None
+        return self.add_reader_statements(stmts, record)
 
     def add_reader_output(self, content, record,
                           grounding_mode='compositional',
@@ -103,7 +182,9 @@ class ServiceController:
         stmts = process_reader_output(record['identity'], content,
                                       record['document_id'],
                                       grounding_mode=grounding_mode,
-                                      extract_filter=extract_filter)
+                                      extract_filter=extract_filter,
+                                      stmt_cache=self.stmt_cache,
+                                      storage_key=record['storage_key'])
         return self.add_reader_statements(stmts, record)
 
     def add_reader_statements(self, stmts, record):
@@ -113,12 +194,101 @@ class ServiceController:
         return self.add_prepared_statements(prepared_stmts,
                                             record['storage_key'])
 
+    def process_dart_records(self, records, nproc=4, batch_size=100,
+                             chunksize=10, grounding_mode='compositional',
+                             extract_filter='influence'):
+        """Process and prepare reader outputs for DART records in parallel.
+
+        Each record's reader output is read, processed, prepared and
+        serialized in a worker process, while the DART records and the
+        resulting prepared statements are added to the DB in batches
+        by the current process.
+
+        Parameters
+        ----------
+        records : list[dict]
+            A list of DART records to process.
+        nproc : Optional[int]
+            The number of worker processes to use. Default: 4
+        batch_size : Optional[int]
+            The number of records whose prepared statements are inserted
+            into the DB together. Default: 100
+        chunksize : Optional[int]
+            The number of records sent to a worker process at a time.
+            Default: 10
+        grounding_mode : Optional[str]
+            The grounding mode to use for processing. Default: compositional
+        extract_filter : Optional[str]
+            The types of statements to extract. Default: influence
+
+        Returns
+        -------
+        dict
+            A dict with the storage keys of records that were processed and
+            added to the DB under 'processed', and a dict of error messages
+            keyed by the storage keys of records that failed under 'failed'.
+            Failed records are not added to the DB so that they can be
+            processed again later.
+        """
+        process_fun = functools.partial(_prepare_dart_record_safe,
+                                        dart_client=self.dart_client,
+                                        grounding_mode=grounding_mode,
+                                        extract_filter=extract_filter,
+                                        stmt_cache=self.stmt_cache)
+        pool = Pool(nproc)
+        results = {'processed': [], 'failed': {}}
+        batch = []
+        try:
+            for record, stmt_jsons, error in tqdm.tqdm(
+                    pool.imap_unordered(process_fun, records,
+                                        chunksize=chunksize),
+                    total=len(records)):
+                if error is not None:
+                    logger.error('Could not process record %s: %s' %
+                                 (record['storage_key'], error))
+                    results['failed'][record['storage_key']] = error
+                    continue
+                batch.append((record, stmt_jsons))
+                if len(batch) >= batch_size:
+                    self._add_prepared_batch(batch, results)
+                    batch = []
+            self._add_prepared_batch(batch, results)
+        finally:
+            logger.debug('Closing pool...')
+            pool.close()
+            logger.debug('Joining pool...')
+            pool.join()
+            logger.info('Pool closed and joined.')
+        logger.info('Processed %d records, %d failed' %
+                    (len(results['processed']), len(results['failed'])))
+        return results
+
+    def _add_prepared_batch(self, batch, results):
+        """Add a batch of processed DART records and their prepared statement
+        JSONs to the DB and record the outcome in the results."""
+        stmt_jsons_by_record = {record['storage_key']: stmt_jsons
+                                for record, stmt_jsons in batch}
+        if any(stmt_jsons_by_record.values()):
+            res = self.add_prepared_statement_jsons(stmt_jsons_by_record)
+            if res is None:
+                for storage_key in stmt_jsons_by_record:
+                    results['failed'][storage_key] = \
+                        'Could not add prepared statements to the DB'
+                return
+        # DART records are only added once their statements are in the DB
+        for record, _ in batch:
+            self.add_dart_record(record)
+            results['processed'].append(record['storage_key'])
+
+    def add_prepared_statement_jsons(self, stmt_jsons_by_record):
+        """Add serialized prepared statements for a set of record keys."""
+        return self.db.add_statement_jsons_for_records(
+            stmt_jsons_by_record, indra_version=indra_version)
+
     def add_prepared_statements(self, prepared_stmts, record_key):
         """Add a set of prepared statements for a given record key."""
         return self.db.add_statements_for_record(record_key=record_key,
-                                                 # FIXME: how should we set the
-                                                 # version here?
-                                                 indra_version='1.0',
+                                                 indra_version=indra_version,
                                                  stmts=prepared_stmts)
 
     def assemble_new_records(self, project_id, new_record_keys):
@@ -171,4 +341,38 @@ class ServiceController:
 
     def get_all_records(self):
         """Return all full DART records stored in the service's DB."""
-        return self.db.get_full_dart_records()
\ No newline at end of file
+        return self.db.get_full_dart_records()
+
+
+def prepare_dart_record(record, dart_client, grounding_mode='compositional',
+                        extract_filter='influence', stmt_cache=None):
+    """Return a DART record with its reader output processed into prepared
+    statement JSONs.
+
+    This function is used as a worker in ServiceController's parallel
+    processing of DART records and therefore doesn't interact with the DB.
+    """
+    stmts = process_dart_record_output(record, dart_client,
+                                       grounding_mode=grounding_mode,
+                                       extract_filter=extract_filter,
+                                       stmt_cache=stmt_cache)
+    if stmts is None:
+        return record, []
+    prepared_stmts = preparation_pipeline.run(stmts)
+    # Note: unlike in DbManager.add_statements_for_record, no deepcopy is
+    # needed here since the prepared statements are discarded after
+    # serialization. The matches hash is calculated the same way as in
+    # assembly so that it can be stored as the statement's hash in the DB.
+    return record, stmts_to_json(prepared_stmts,
+                                 matches_fun=location_matches_compositional)
+
+
+def _prepare_dart_record_safe(record, **kwargs):
+    """Return a DART record, its prepared statement JSONs and an error
+    message if processing it failed, without raising."""
+    try:
+        record, stmt_jsons = prepare_dart_record(record, **kwargs)
+        return record, stmt_jsons, None
+    except Exception as e:
+        logger.exception(e)
+        return record, None, '%s: %s' % (type(e).__name__, e)
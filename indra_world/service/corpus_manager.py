@@ -2,13 +2,12 @@
 (i.e., reader outputs) into a 'seed corpus' that can be dumped on S3
 for loading into CauseMos."""
 import os
-import json
 import tqdm
 import yaml
 import logging
 import datetime
 from indra.statements import stmts_to_json, stmts_to_json_file
-from indra_world import default_bucket, default_key_base
+from indra_world import default_bucket, default_key_base, json_codec
 from indra_world.ontology import world_ontology
 from indra_world.assembly.incremental_assembler import IncrementalAssembler
 from .controller import ServiceController
@@ -21,8 +20,10 @@ class CorpusManager:
     """Corpus manager class allowing running assembly on a set of DART records.
     """
     def __init__(self, db_url, dart_records, corpus_id, metadata,
-                 dart_client=None, tenant=None, ontology=None):
-        self.sc = ServiceController(db_url=db_url, dart_client=dart_client)
+                 dart_client=None, tenant=None, ontology=None,
+                 stmt_cache=None):
+        self.sc = ServiceController(db_url=db_url, dart_client=dart_client,
+                                    stmt_cache=stmt_cache)
         self.corpus_id = corpus_id
         self.dart_records = dart_records
         self.metadata = metadata
@@ -46,13 +47,22 @@ class CorpusManager:
         else:
             self.ontology = ontology
 
-    def prepare(self, records_exist=False):
+    def prepare(self, records_exist=False, nproc=None):
         """Run the preprocessing pipeline on statements.
 
         This function adds the new corpus to the DB, adds records to the
         new corpus, then processes the reader outputs for those records into
         statements, preprocesses the statements, and then stores these
         prepared statements in the DB.
+
+        Parameters
+        ----------
+        records_exist : Optional[bool]
+            If True, the records and their prepared statements are assumed
+            to already be in the DB and are not processed. Default: False
+        nproc : Optional[int]
+            If given and larger than 1, records are processed and prepared
+            in parallel by this many worker processes. Default: None
         """
         logger.info('Adding corpus %s to DB' % self.corpus_id)
         self.sc.db.add_corpus(self.corpus_id, self.metadata)
@@ -61,7 +71,11 @@ class CorpusManager:
             self.corpus_id,
             [c['storage_key'] for c in self.dart_records]
         )
-        if not records_exist:
+        if not records_exist and nproc and nproc > 1:
+            logger.info('Adding and processing records with %d workers'
+                        % nproc)
+            self.sc.process_dart_records(self.dart_records, nproc=nproc)
+        elif not records_exist:
             logger.info('Adding and processing records')
             for record in tqdm.tqdm(self.dart_records):
                 # This adds DART records
@@ -75,15 +89,16 @@ class CorpusManager:
         This function loads all the prepared statements associated with the
         corpus and then runs assembly on them.
         """
-        all_stmts = []
         logger.info('Loading statements from DB for %d records' %
                     len(self.dart_records))
-        for record in tqdm.tqdm(self.dart_records):
-            stmts = self.sc.db.get_statements_for_record(record['storage_key'])
-            all_stmts += stmts
-        logger.info('Instantiating incremental assembler with %d statements'
-                    % len(all_stmts))
-        ia = IncrementalAssembler(all_stmts, ontology=self.ontology)
+        # Statements are decoded from the DB in chunks of batched queries,
+        # note that the assembler still keeps all of them in memory
+        stmts = self.sc.db.iter_statements_for_records(
+            [record['storage_key'] for record in self.dart_records])
+        logger.info('Instantiating incremental assembler')
+        ia = IncrementalAssembler(stmts, ontology=self.ontology)
+        logger.info('Assembler instantiated with %d statements'
+                    % len(ia.prepared_stmts))
         logger.info('Getting assembled statements')
         self.assembled_stmts = ia.get_statements()
         logger.info('Got %d assembled statements' % len(self.assembled_stmts))
@@ -95,7 +110,7 @@ class CorpusManager:
             corpus_folder = os.path.join(base_folder, self.corpus_id)
             os.makedirs(corpus_folder, exist_ok=True)
             with open(os.path.join(corpus_folder, 'metadata.json'), 'w') as fh:
-                json.dump(self.metadata, fh)
+                json_codec.dump(self.metadata, fh)
             fname = os.path.join(corpus_folder, 'statements.json')
         else:
             fname = os.path.join(base_folder, 'statements.json')
@@ -112,7 +127,7 @@ class CorpusManager:
         s3.put_object(Body=jsonl_str, Bucket=default_bucket, Key=key)
 
         # Upload meta data
-        metadata_str = json.dumps(self.metadata, indent=1)
+        metadata_str = json_codec.dumps(self.metadata, indent=1)
         key = os.path.join(default_key_base, self.corpus_id, 'metadata.json')
         s3.put_object(Body=metadata_str, Bucket=default_bucket, Key=key)
 
@@ -148,7 +163,8 @@ def _make_s3_client(profile_name='wm'):
 
 
 def stmts_to_jsonl_str(stmts):
-    return '\n'.join([json.dumps(stmt) for stmt in stmts_to_json(stmts)])
+    return '\n'.join([json_codec.dumps(stmt)
+                      for stmt in stmts_to_json(stmts)])
 
 
 def get_corpus_index():
@@ -1,40 +1,166 @@
+import zlib
 import logging
 from copy import deepcopy
-from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.orm import sessionmaker
+from collections import defaultdict
+from contextlib import contextmanager
+from sqlalchemy.exc import SQLAlchemyError, DBAPIError
+from sqlalchemy.orm import sessionmaker, scoped_session, Query
 from sqlalchemy.engine.url import make_url
-from sqlalchemy import and_, insert, create_engine
+from sqlalchemy import and_, or_, func, insert, select, literal, \
+    create_engine
 from indra.statements import stmts_from_json, stmts_to_json
 from indra.util import batch_iter
+from indra_world import json_codec
+from indra_world.interning import intern_statements
+from indra_world.assembly.matches import location_matches_compositional
 from . import schema as wms_schema
 
+# The columns needed to load prepared statements in any format
+stmt_columns = (wms_schema.PreparedStatements.stmt,
+                wms_schema.PreparedStatements.stmt_format,
+                wms_schema.PreparedStatements.stmt_blob)
+
 logger = logging.getLogger(__name__)
 
+# The formats in which prepared statements can be stored: either in the JSON
+# column or as zlib-compressed JSON in the binary column. The version number
+# needs to be incremented if the encoding of the binary format changes.
+stmt_formats = {'json', 'json-zlib-1'}
+
 
 class DbManager:
     """Manages transactions with the assembly database and exposes an API
-    for various operations."""
-    def __init__(self, url):
+    for various operations.
+
+    Each operation is run as a short transaction in its own session, so a
+    single DbManager can be shared by multiple threads, for instance, those
+    of a threaded WSGI server handling concurrent requests.
+
+    IDs, record keys, readers and versions given to lookup methods are
+    matched exactly. Earlier versions matched them with SQL LIKE, so
+    wildcards such as % and _ in the given values are no longer expanded.
+
+    Parameters
+    ----------
+    url : str
+        The URL of the database.
+    stmt_format : Optional[str]
+        The format in which prepared statements are stored, either 'json'
+        to store them in the JSON column or 'json-zlib-1' to store them
+        as compressed binary payloads. Statements in either format can be
+        read regardless of this setting. Default: json
+    pool_size : Optional[int]
+        The number of connections kept open in the engine's connection pool.
+        If not given, the SQLAlchemy default is used. Not applicable to
+        SQLite. Default: None
+    max_overflow : Optional[int]
+        The number of connections that can be opened beyond the pool size
+        when all pooled connections are in use. If not given, the SQLAlchemy
+        default is used. Not applicable to SQLite. Default: None
+    retries : Optional[int]
+        The number of times an operation is retried if the connection to
+        the DB was lost while running it. Default: 2
+    """
+    def __init__(self, url, stmt_format='json', pool_size=None,
+                 max_overflow=None, retries=2):
+        if stmt_format not in stmt_formats:
+            raise ValueError('Invalid statement format: %s' % stmt_format)
+        self.stmt_format = stmt_format
+        self.retries = retries
         self.url = make_url(url)
         logger.info('Starting DB manager with URL: %s' % str(self.url))
-        self.engine = create_engine(self.url)
-        self.session = None
+        # Stale connections (e.g., after a DB restart) are detected and
+        # replaced when they are checked out from the pool
+        engine_kwargs = {'pool_pre_ping': True}
+        # SQLite uses pools that aren't sized
+        if self.url.get_backend_name() != 'sqlite':
+            if pool_size is not None:
+                engine_kwargs['pool_size'] = pool_size
+            if max_overflow is not None:
+                engine_kwargs['max_overflow'] = max_overflow
+        # JSON columns are serialized and deserialized with the JSON codec
+        self.engine = create_engine(self.url,
+                                    json_serializer=json_codec.dumps,
+                                    json_deserializer=json_codec.loads,
+                                    **engine_kwargs)
+        # Objects stay usable after the session they were loaded in is closed
+        self.session_maker = sessionmaker(bind=self.engine,
+                                          expire_on_commit=False)
+        self.session = scoped_session(self.session_maker)
 
     def get_session(self):
-        """Return the current active session or create one if not available."""
-        if self.session is None:
-            session_maker = sessionmaker(bind=self.engine)
-            self.session = session_maker()
-        return self.session
+        """Return the session of the current thread.
+
+        The session is shared by all callers in the same thread until
+        remove_session is called. The methods of the DB manager don't use
+        this session, they each use a separate session via session_scope.
+        """
+        return self.session()
+
+    def remove_session(self):
+        """Close and discard the session of the current thread, if any."""
+        self.session.remove()
+
+    @contextmanager
+    def session_scope(self):
+        """Provide a new session for a unit of work as a context manager.
+
+        The transaction is committed when the context is exited, or rolled
+        back if an exception is raised, after which the session is closed.
+        """
+        session = self.session_maker()
+        try:
+            yield session
+            session.commit()
+        except BaseException:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def run(self, fun):
+        """Run a function with a session as a single transaction.
+
+        If the connection to the DB is lost while running the function, the
+        transaction is rolled back and the function is run again in a new
+        session up to the configured number of retries. If the connection is
+        lost while committing, the error is raised without retrying since
+        the transaction may have been applied and running it again could
+        duplicate its effects.
+
+        Parameters
+        ----------
+        fun : Callable
+            A function which takes a session as its only argument.
+
+        Returns
+        -------
+        :
+            The return value of the function.
+        """
+        attempt = 0
+        while True:
+            committing = False
+            try:
+                with self.session_scope() as session:
+                    res = fun(session)
+                    # The transaction is committed when the context exits
+                    committing = True
+                return res
+            except DBAPIError as e:
+                if committing or not e.connection_invalidated or \
+                        attempt >= self.retries:
+                    raise
+                attempt += 1
+                logger.warning('Lost connection to the DB, retrying '
+                               '(%d/%d)' % (attempt, self.retries))
 
     def create_all(self):
         """Create all the database tables in the schema."""
         wms_schema.Base.metadata.create_all(self.engine)
-        self.engine.execute('create index record_key_idx on '
-                            'prepared_statements (record_key)')
 
     def query(self, *query_args):
-        """Run and return results of a generic query."""
+        """Return a generic query on the session of the current thread."""
         session = self.get_session()
         return session.query(*query_args)
 
@@ -43,19 +169,34 @@ class DbManager:
         return self.engine.execute(query_str)
 
     def execute(self, operation):
-        """Execute an insert operation on the current session and return
+        """Execute an insert operation in a new transaction and return
         results."""
-        session = self.get_session()
-        try:
+        def _execute(session):
             res = session.execute(operation)
-            session.commit()
             return {'rowcount': res.rowcount,
                     'inserted_primary_key': res.inserted_primary_key}
+        try:
+            return self.run(_execute)
         except SQLAlchemyError as e:
             logger.error(e)
-            session.rollback()
             return None
 
+    def execute_many(self, table, rows):
+        """Insert a list of rows into a table with a single executemany call
+        in a new transaction and return results."""
+        def _execute_many(session):
+            res = session.execute(insert(table), rows)
+            return {'rowcount': res.rowcount}
+        try:
+            return self.run(_execute_many)
+        except SQLAlchemyError as e:
+            logger.error(e)
+            return None
+
+    def fetch_all(self, q):
+        """Return all the results of a query run in a new transaction."""
+        return self.run(lambda session: q.with_session(session).all())
+
     def add_project(self, project_id, name, corpus_id=None):
         """Add a new project.
 
@@ -74,43 +215,56 @@ class DbManager:
                                                 corpus_id=corpus_id)
         return self.execute(op)
 
-    def add_records_for_project(self, project_id, record_keys):
+    def add_records_for_project(self, project_id, record_keys,
+                                batch_size=10000):
         """Add document IDs for a project with the given ID."""
-        op = insert(wms_schema.ProjectRecords).values(
-            [
-                {'project_id': project_id,
-                 'record_key': rec_key}
-                for rec_key in record_keys
-            ]
-        )
-        return self.execute(op)
+        return self._add_records(wms_schema.ProjectRecords, 'project_id',
+                                 project_id, record_keys, batch_size)
+
+    def add_records_for_project_from_corpus(self, project_id, corpus_id):
+        """Add all the records of a corpus to a project with the given ID.
+
+        The records are copied with a single INSERT ... SELECT statement so
+        that the record keys of the corpus never leave the DB.
+        """
+        corpus_records = select(
+            [literal(project_id), wms_schema.CorpusRecords.record_key]).where(
+            wms_schema.CorpusRecords.corpus_id == corpus_id)
+        op = insert(wms_schema.ProjectRecords).from_select(
+            ['project_id', 'record_key'], corpus_records)
+        try:
+            return self.run(
+                lambda session: {'rowcount': session.execute(op).rowcount})
+        except SQLAlchemyError as e:
+            logger.error(e)
+            return None
 
     def get_records_for_project(self, project_id):
-        qfilter = and_(wms_schema.ProjectRecords.project_id.like(project_id))
-        q = self.query(wms_schema.ProjectRecords.record_key).filter(qfilter)
-        record_keys = [r[0] for r in q.all()]
+        qfilter = and_(wms_schema.ProjectRecords.project_id == project_id)
+        q = Query(wms_schema.ProjectRecords.record_key).filter(qfilter)
+        record_keys = [r[0] for r in self.fetch_all(q)]
         return record_keys
 
     def get_documents_for_project(self, project_id):
         qfilter = and_(
-            wms_schema.ProjectRecords.project_id.like(project_id),
+            wms_schema.ProjectRecords.project_id == project_id,
             (wms_schema.DartRecords.storage_key ==
              wms_schema.ProjectRecords.record_key))
-        q = self.query(wms_schema.DartRecords.document_id).filter(qfilter)
-        doc_ids = sorted(set(r[0] for r in q.all()))
+        q = Query(wms_schema.DartRecords.document_id).filter(qfilter)
+        doc_ids = sorted(set(r[0] for r in self.fetch_all(q)))
         return doc_ids
 
     def get_projects(self):
         """Retyurn a list of all projects."""
-        q = self.query(wms_schema.Projects)
-        projects = [{'id': p.id, 'name': p.name} for p in q.all()]
+        q = Query(wms_schema.Projects)
+        projects = [{'id': p.id, 'name': p.name} for p in self.fetch_all(q)]
         return projects
 
     def get_corpus_for_project(self, project_id):
         """Return the corpus ID that a project was derived from, if available."""
-        q = self.query(wms_schema.Projects.corpus_id).filter(
-            wms_schema.Projects.id.like(project_id))
-        res = list(q.all())
+        q = Query(wms_schema.Projects.corpus_id).filter(
+            wms_schema.Projects.id == project_id)
+        res = list(self.fetch_all(q))
         if res:
             return res[0][0]
         else:
@@ -118,9 +272,9 @@ class DbManager:
 
     def get_tenant_for_corpus(self, corpus_id):
         """Return the tenant for a given corpus, if available."""
-        q = self.query(wms_schema.Corpora.meta_data).filter(
-            wms_schema.Corpora.id.like(corpus_id))
-        res = list(q.all())
+        q = Query(wms_schema.Corpora.meta_data).filter(
+            wms_schema.Corpora.id == corpus_id)
+        res = list(self.fetch_all(q))
         if res:
             metadata = res[0][0]
             return metadata.get('tenant')
@@ -132,50 +286,126 @@ class DbManager:
                                                meta_data=metadata)
         return self.execute(op)
 
-    def add_records_for_corpus(self, corpus_id, record_keys):
-        op = insert(wms_schema.CorpusRecords).values(
-            [
-                {'corpus_id': corpus_id,
-                 'record_key': rec_key}
-                for rec_key in record_keys
-            ]
-        )
-        return self.execute(op)
+    def add_records_for_corpus(self, corpus_id, record_keys,
+                               batch_size=10000):
+        return self._add_records(wms_schema.CorpusRecords, 'corpus_id',
+                                 corpus_id, record_keys, batch_size)
+
+    def _add_records(self, table, id_column, id_value, record_keys,
+                     batch_size):
+        """Add record keys for a project or corpus in a single transaction.
+
+        The rows are inserted in batches with executemany calls rather than
+        as one multi-row INSERT whose size would grow with the number of
+        records beyond the statement and parameter limits of some DBs.
+        """
+        def _add_records(session):
+            rowcount = 0
+            for batch in batch_iter(record_keys, batch_size, list):
+                rows = [{id_column: id_value, 'record_key': record_key}
+                        for record_key in batch]
+                rowcount += session.execute(insert(table), rows).rowcount
+            return {'rowcount': rowcount}
+        try:
+            return self.run(_add_records)
+        except SQLAlchemyError as e:
+            logger.error(e)
+            return None
 
     def get_records_for_corpus(self, corpus_id):
-        qfilter = and_(wms_schema.CorpusRecords.corpus_id.like(corpus_id))
-        q = self.query(wms_schema.CorpusRecords.record_key).filter(qfilter)
-        record_keys = [r[0] for r in q.all()]
+        qfilter = and_(wms_schema.CorpusRecords.corpus_id == corpus_id)
+        q = Query(wms_schema.CorpusRecords.record_key).filter(qfilter)
+        record_keys = [r[0] for r in self.fetch_all(q)]
         return record_keys
 
     def get_documents_for_corpus(self, corpus_id):
         qfilter = and_(
-            wms_schema.CorpusRecords.corpus_id.like(corpus_id),
+            wms_schema.CorpusRecords.corpus_id == corpus_id,
             (wms_schema.DartRecords.storage_key ==
              wms_schema.CorpusRecords.record_key))
-        q = self.query(wms_schema.DartRecords.document_id).filter(qfilter)
-        doc_ids = sorted(set(r[0] for r in q.all()))
+        q = Query(wms_schema.DartRecords.document_id).filter(qfilter)
+        doc_ids = sorted(set(r[0] for r in self.fetch_all(q)))
         return doc_ids
 
     def add_statements_for_record(self, record_key, stmts, indra_version):
         """Add a set of prepared statements for a given document."""
-        if not stmts:
+        return self.add_statements_for_records({record_key: stmts},
+                                               indra_version)
+
+    def add_statements_for_records(self, stmts_by_record, indra_version,
+                                   batch_size=10000):
+        """Add prepared statements for multiple records at once.
+
+        Parameters
+        ----------
+        stmts_by_record : dict[str, list[indra.statements.Statement]]
+            A dict keyed by record key whose values are lists of prepared
+            statements for the given record.
+        indra_version : str
+            The INDRA version to associate with the statements.
+        batch_size : Optional[int]
+            The number of statements inserted with a single executemany
+            call. Default: 10000
+        """
+        # Note: the deepcopy here is done because when dumping
+        # statements into JSON, the hash cached in each statement is
+        # overwritten. The hash is calculated with the matches function used
+        # for assembly and is then stored as the statement's hash.
+        stmt_jsons_by_record = {
+            record_key: stmts_to_json(
+                deepcopy(stmts), matches_fun=location_matches_compositional)
+            for record_key, stmts in stmts_by_record.items()
+        }
+        return self.add_statement_jsons_for_records(stmt_jsons_by_record,
+                                                    indra_version,
+                                                    batch_size=batch_size)
+
+    def add_statement_jsons_for_records(self, stmt_jsons_by_record,
+                                        indra_version, batch_size=10000):
+        """Add serialized prepared statements for multiple records at once.
+
+        Parameters
+        ----------
+        stmt_jsons_by_record : dict[str, list[dict]]
+            A dict keyed by record key whose values are lists of prepared
+            statement JSONs for the given record.
+        indra_version : str
+            The INDRA version to associate with the statements.
+        batch_size : Optional[int]
+            The number of statements inserted with a single executemany
+            call. All the batches are inserted in a single transaction.
+            Default: 10000
+
+        Note that the matches_hash of each statement JSON is stored as the
+        statement's hash, therefore statements are expected to be serialized
+        with location_matches_compositional as the matches function.
+        """
+        def _add_stmt_rows(session):
+            rows = (
+                _get_stmt_row(record_key, indra_version, stmt_json,
+                              self.stmt_format)
+                for record_key, stmt_jsons in stmt_jsons_by_record.items()
+                for stmt_json in stmt_jsons
+            )
+            nrows = 0
+            rowcount = 0
+            for batch in batch_iter(rows, batch_size, list):
+                res = session.execute(
+                    insert(wms_schema.PreparedStatements), batch)
+                nrows += len(batch)
+                rowcount += res.rowcount
+            return nrows, rowcount
+
+        # All the batches are inserted in a single transaction so that
+        # either all or none of the statements are added
+        try:
+            nrows, rowcount = self.run(_add_stmt_rows)
+        except SQLAlchemyError as e:
+            logger.error(e)
             return None
-        op = insert(wms_schema.PreparedStatements).values(
-            [
-                {
-                    'record_key': record_key,
-                    'indra_version': indra_version,
-                    'stmt': stmt
-                 }
-                # Note: the deepcopy here is done because when dumping
-                # statements into JSON, the hash is overwritten, potentially
-                # with an inadequate one (due to a custom matches_fun not being
-                # given here).
-                for stmt in stmts_to_json(deepcopy(stmts))
-            ]
-        )
-        return self.execute(op)
+        if not nrows:
+            return None
+        return {'rowcount': rowcount}
 
     def add_curation_for_project(self, project_id, stmt_hash, curation):
         """Add curations for a given project."""
@@ -186,83 +416,248 @@ class DbManager:
 
     def get_statements_for_record(self, record_key):
         """Return prepared statements for given record key."""
-        qfilter = wms_schema.PreparedStatements.record_key.like(record_key)
-        q = self.query(wms_schema.PreparedStatements.stmt).filter(qfilter)
-        stmts = stmts_from_json([r[0] for r in q.all()])
+        qfilter = wms_schema.PreparedStatements.record_key == record_key
+        q = Query(stmt_columns).filter(qfilter)
+        stmts = _stmts_from_rows(self.fetch_all(q))
         return stmts
 
     def get_statements_for_records(self, record_keys, batch_size=1000):
         """Return prepared statements for given list of record keys."""
-        stmts = []
-        for record_key_batch in batch_iter(record_keys, batch_size, list):
-            qfilter = wms_schema.PreparedStatements.record_key.in_(
-                record_key_batch)
-            q = self.query(wms_schema.PreparedStatements.stmt).filter(qfilter)
-            stmts += stmts_from_json([r[0] for r in q.all()])
-        return stmts
+        return list(self.iter_statements_for_records(record_keys,
+                                                     batch_size=batch_size))
 
     def get_statements(self):
         """Return all prepared statements in the DB."""
-        q = self.query(wms_schema.PreparedStatements.stmt)
-        stmts = stmts_from_json([r[0] for r in q.all()])
+        return list(self.iter_statements_for_records())
+
+    def iter_statements_for_records(self, record_keys=None, batch_size=1000,
+                                    chunk_size=1000):
+        """Yield prepared statements for given record keys streamed from the DB.
+
+        Rows are fetched from the DB in chunks (using a server-side cursor
+        where the DB supports it) and each chunk is decoded into statements
+        before the next one is fetched, so that the raw statement JSONs of
+        all the records are never held in memory together.
+
+        Parameters
+        ----------
+        record_keys : Optional[list[str]]
+            The record keys whose statements should be returned. If not
+            given, all prepared statements in the DB are returned.
+            Default: None
+        batch_size : Optional[int]
+            The number of record keys to query for at a time. Default: 1000
+        chunk_size : Optional[int]
+            The number of rows fetched from the DB and decoded into
+            statements at a time. Default: 1000
+
+        Yields
+        ------
+        indra.statements.Statement
+            The prepared statements for the given records.
+        """
+        # Streaming can't be resumed after a lost connection so we don't
+        # retry here, and the session is held until all rows are consumed
+        with self.session_scope() as session:
+            if record_keys is None:
+                q = Query(stmt_columns, session=session)
+                yield from _iter_stmts_from_query(q, chunk_size)
+                return
+            for record_key_batch in batch_iter(record_keys, batch_size, list):
+                qfilter = wms_schema.PreparedStatements.record_key.in_(
+                    record_key_batch)
+                q = Query(stmt_columns, session=session).filter(qfilter)
+                yield from _iter_stmts_from_query(q, chunk_size)
+
+    def get_statements_by_hash(self, stmt_hashes, record_keys=None,
+                               batch_size=1000):
+        """Return prepared statements with given hashes.
+
+        Parameters
+        ----------
+        stmt_hashes : list[int]
+            The location-compositional matches hashes of the statements to
+            return.
+        record_keys : Optional[list[str]]
+            If given, only statements for these records are returned.
+            Default: None
+        batch_size : Optional[int]
+            The number of hashes and record keys to query for at a time.
+            Default: 1000
+        """
+        table = wms_schema.PreparedStatements
+        stmts = []
+        for stmt_hash_batch in _get_batches(stmt_hashes, batch_size):
+            for record_key_batch in _get_batches(record_keys, batch_size):
+                qfilter = table.stmt_hash.in_(stmt_hash_batch)
+                if record_key_batch is not None:
+                    qfilter = and_(qfilter,
+                                   table.record_key.in_(record_key_batch))
+                q = Query(stmt_columns).filter(qfilter)
+                stmts += _stmts_from_rows(self.fetch_all(q))
         return stmts
 
+    def get_statements_for_theme(self, theme, record_keys=None,
+                                 batch_size=1000):
+        """Return prepared statements with a given top theme grounding.
+
+        Parameters
+        ----------
+        theme : str
+            An ontology term which is the top theme grounding of the subject
+            or object of the statements to return.
+        record_keys : Optional[list[str]]
+            If given, only statements for these records are returned.
+            Default: None
+        batch_size : Optional[int]
+            The number of record keys to query for at a time. Default: 1000
+        """
+        stmts = []
+        for record_key_batch in _get_batches(record_keys, batch_size):
+            qfilter = or_(wms_schema.PreparedStatements.subj_theme == theme,
+                          wms_schema.PreparedStatements.obj_theme == theme)
+            if record_key_batch is not None:
+                qfilter = and_(qfilter,
+                               wms_schema.PreparedStatements.record_key.in_(
+                                   record_key_batch))
+            q = Query(stmt_columns).filter(qfilter)
+            stmts += _stmts_from_rows(self.fetch_all(q))
+        return stmts
+
+    def get_statement_hash_counts(self, record_keys=None, batch_size=1000):
+        """Return the number of prepared statements for each statement hash.
+
+        Parameters
+        ----------
+        record_keys : Optional[list[str]]
+            If given, only statements for these records are counted.
+            Default: None
+        batch_size : Optional[int]
+            The number of record keys to query for at a time. Default: 1000
+
+        Returns
+        -------
+        dict[int, int]
+            The number of statements (i.e., duplicates to be merged in
+            assembly) for each statement hash.
+        """
+        table = wms_schema.PreparedStatements
+        counts = defaultdict(int)
+        for record_key_batch in _get_batches(record_keys, batch_size):
+            q = Query([table.stmt_hash, func.count(table.stmt_hash)])
+            if record_key_batch is not None:
+                q = q.filter(table.record_key.in_(record_key_batch))
+            q = q.group_by(table.stmt_hash)
+            for stmt_hash, count in self.fetch_all(q):
+                counts[stmt_hash] += count
+        return dict(counts)
+
     def get_statements_for_document(self, document_id, reader=None,
                                     reader_version=None, indra_version=None):
         """Return prepared statements for a given document."""
         qfilter = and_(
-            wms_schema.DartRecords.document_id.like(document_id),
+            wms_schema.DartRecords.document_id == document_id,
             wms_schema.DartRecords.storage_key ==
             wms_schema.PreparedStatements.record_key)
         if reader:
             qfilter = and_(
                 qfilter,
-                wms_schema.DartRecords.reader.like(reader)
+                wms_schema.DartRecords.reader == reader
             )
         if reader_version:
             qfilter = and_(
                 qfilter,
-                wms_schema.DartRecords.reader_version.like(reader_version)
+                wms_schema.DartRecords.reader_version == reader_version
             )
         if indra_version:
             qfilter = and_(
                 qfilter,
-                wms_schema.PreparedStatements.indra_version.like(indra_version)
+                wms_schema.PreparedStatements.indra_version == indra_version
             )
 
-        q = self.query(wms_schema.PreparedStatements.stmt).filter(qfilter)
-        stmts = stmts_from_json([r[0] for r in q.all()])
+        q = Query(stmt_columns).filter(qfilter)
+        stmts = _stmts_from_rows(self.fetch_all(q))
         return stmts
 
     def get_curations_for_project(self, project_id):
         """Return curations for a given project"""
-        qfilter = wms_schema.Curations.project_id.like(project_id)
-        q = self.query(wms_schema.Curations).filter(qfilter)
+        qfilter = wms_schema.Curations.project_id == project_id
+        q = Query(wms_schema.Curations).filter(qfilter)
         # Build a dict of stmt_hash: curation records
-        curations = {res.stmt_hash: res.curation for res in q.all()}
+        curations = {res.stmt_hash: res.curation for res in self.fetch_all(q)}
         return curations
 
     def add_dart_record(self, reader, reader_version, document_id, storage_key,
                         date, output_version=None, labels=None, tenants=None):
         """Insert a DART record into the database."""
-        op = insert(wms_schema.DartRecords).values(
-                **{
-                    'reader': reader,
-                    'reader_version': reader_version,
-                    'document_id': document_id,
-                    'storage_key': storage_key,
-                    'date': date,
-                    'output_version': output_version,
-                    'labels': labels,
-                    'tenants': tenants
-                }
-        )
-        return self.execute(op)
+        record = {
+            'reader': reader,
+            'reader_version': reader_version,
+            'document_id': document_id,
+            'storage_key': storage_key,
+            'date': date,
+            'output_version': output_version,
+            'labels': labels,
+            'tenants': tenants
+        }
+        op = insert(wms_schema.DartRecords).values(**record)
+
+        def _add_dart_record(session):
+            res = session.execute(op)
+            _add_record_labels_tenants(session, [record])
+            return {'rowcount': res.rowcount,
+                    'inserted_primary_key': res.inserted_primary_key}
+        try:
+            return self.run(_add_dart_record)
+        except SQLAlchemyError as e:
+            logger.error(e)
+            return None
+
+    def upsert_dart_records(self, records, batch_size=1000):
+        """Insert DART records into the database, replacing existing ones.
+
+        Parameters
+        ----------
+        records : list[dict]
+            A list of DART records, each a dict with the same keys as the
+            arguments of add_dart_record.
+        batch_size : Optional[int]
+            The number of records deleted and inserted with a single
+            statement. All the batches are upserted in a single transaction.
+            Default: 1000
+        """
+        tables = [wms_schema.DartRecords, wms_schema.DartRecordLabels,
+                  wms_schema.DartRecordTenants]
+
+        def _upsert_batch(session, batch):
+            keys = [rec['storage_key'] for rec in batch]
+            for table in tables:
+                session.query(table).filter(
+                    table.storage_key.in_(keys)).delete(
+                    synchronize_session=False)
+            session.execute(insert(wms_schema.DartRecords), batch)
+            _add_record_labels_tenants(session, batch)
+
+        def _upsert_batches(session):
+            for batch in batch_iter(records, batch_size, list):
+                _upsert_batch(session, batch)
+
+        # All the batches are upserted in a single transaction so that
+        # either all or none of the records are replaced
+        try:
+            self.run(_upsert_batches)
+        except SQLAlchemyError as e:
+            logger.error(e)
+            return None
+        return {'rowcount': len(records)}
 
     def get_dart_records(self, reader=None, document_id=None,
                          reader_version=None, output_version=None, labels=None,
                          tenants=None):
-        """Return storage keys for DART records given constraints."""
+        """Return storage keys for DART records given constraints.
+
+        See get_full_dart_records for how constraints are matched.
+        """
         records = self.get_full_dart_records(
             reader=reader, document_id=document_id,
             reader_version=reader_version,
@@ -273,36 +668,38 @@ class DbManager:
     def get_full_dart_records(self, reader=None, document_id=None,
                               reader_version=None, output_version=None,
                               labels=None, tenants=None):
-        """Return full DART records given constraints."""
+        """Return full DART records given constraints.
+
+        Each given constraint is matched exactly (wildcards aren't
+        expanded). If labels or tenants are given, only records which have
+        all the given labels and tenants are returned.
+        """
+        table = wms_schema.DartRecords
         qfilter = None
-        if document_id:
-            qfilter = extend_filter(
-                qfilter,
-                wms_schema.DartRecords.document_id.like(document_id))
-        if reader:
-            qfilter = extend_filter(qfilter,
-                                    wms_schema.DartRecords.reader.like(reader))
-        if reader_version:
-            qfilter = extend_filter(qfilter, wms_schema.DartRecords.
-                                    reader_version.like(reader_version))
-        if output_version:
-            qfilter = extend_filter(qfilter, wms_schema.DartRecords.
-                                    output_version.like(output_version))
-        if qfilter is not None:
-            q = self.query(wms_schema.DartRecords).filter(qfilter)
-        else:
-            q = self.query(wms_schema.DartRecords)
+        for column, value in [(table.document_id, document_id),
+                              (table.reader, reader),
+                              (table.reader_version, reader_version),
+                              (table.output_version, output_version)]:
+            if value:
+                qfilter = extend_filter(qfilter, column == value)
+        # Records need to have each of the given labels and tenants which we
+        # look up in the normalized tables
+        for tag_table, tag_column, tags in \
+                [(wms_schema.DartRecordLabels, 'label', labels),
+                 (wms_schema.DartRecordTenants, 'tenant', tenants)]:
+            for tag in sorted(set(tags or [])):
+                subquery = select([tag_table.storage_key]).where(
+                    getattr(tag_table, tag_column) == tag)
+                qfilter = extend_filter(qfilter,
+                                        table.storage_key.in_(subquery))
         record_keys = ['reader', 'reader_version', 'document_id', 'storage_key',
                        'date', 'output_version', 'labels', 'tenants']
-        records = [{k: r.__dict__.get(k) for k in record_keys} for r in q.all()]
-        # If some labels are given, we retain opnly records where there are
-        # some labels given and all the given labels are contained in those
-        if labels:
-            records = [r for r in records if r['labels'] and
-                       set(labels) <= set(r['labels'].split('|'))]
-        if tenants:
-            records = [r for r in records if r['tenants'] and
-                       set(tenants) <= set(r['tenants'].split('|'))]
+        # We only query the columns we need rather than full objects which
+        # is substantially faster for a large number of records
+        q = Query([getattr(table, k) for k in record_keys])
+        if qfilter is not None:
+            q = q.filter(qfilter)
+        records = [dict(zip(record_keys, r)) for r in self.fetch_all(q)]
         return records
 
 
@@ -311,3 +708,104 @@ def extend_filter(qfilter, constraint):
         return constraint
     else:
         return and_(qfilter, constraint)
+
+
+def _add_record_labels_tenants(session, records):
+    """Add the normalized labels and tenants of DART records in a session."""
+    label_rows = []
+    tenant_rows = []
+    for record in records:
+        for key, rows, column in [('labels', label_rows, 'label'),
+                                  ('tenants', tenant_rows, 'tenant')]:
+            for tag in _split_tags(record.get(key)):
+                rows.append({'storage_key': record['storage_key'],
+                             column: tag})
+    if label_rows:
+        session.execute(insert(wms_schema.DartRecordLabels), label_rows)
+    if tenant_rows:
+        session.execute(insert(wms_schema.DartRecordTenants), tenant_rows)
+
+
+def _split_tags(tags):
+    """Return the set of labels or tenants given in pipe-joined form."""
+    if not tags:
+        return set()
+    return {tag for tag in tags.split('|') if tag}
+
+
+def _get_stmt_row(record_key, indra_version, stmt_json, stmt_format):
+    """Return a prepared statements row with a statement in a given format."""
+    row = {'record_key': record_key, 'indra_version': indra_version,
+           'stmt_format': stmt_format, 'stmt': None, 'stmt_blob': None}
+    row.update(_get_stmt_columns(stmt_json))
+    if stmt_format == 'json-zlib-1':
+        row['stmt_blob'] = \
+            zlib.compress(json_codec.dumps(stmt_json).encode('utf-8'))
+    else:
+        row['stmt'] = stmt_json
+    return row
+
+
+def _get_stmt_columns(stmt_json):
+    """Return the values of the precomputed columns for a statement JSON."""
+    subj_theme, obj_theme = _get_themes(stmt_json)
+    evidence = stmt_json.get('evidence')
+    return {'stmt_hash': int(stmt_json['matches_hash']),
+            'stmt_type': stmt_json['type'],
+            'source_api': evidence[0].get('source_api') if evidence else None,
+            'subj_theme': subj_theme, 'obj_theme': obj_theme}
+
+
+def _get_themes(stmt_json):
+    """Return the top theme groundings of the subject and object events."""
+    if stmt_json['type'] == 'Influence':
+        events = [stmt_json['subj'], stmt_json['obj']]
+    elif stmt_json['type'] == 'Association':
+        events = stmt_json['members']
+    else:
+        events = [stmt_json]
+    themes = []
+    for event in events[:2]:
+        wm = event['concept'].get('db_refs', {}).get('WM')
+        top_grounding = wm[0] if wm else None
+        if not top_grounding:
+            theme = None
+        # Flat groundings consist of a single term and score
+        elif isinstance(top_grounding[0], str):
+            theme = top_grounding[0]
+        else:
+            theme = top_grounding[0][0] if top_grounding[0] else None
+        themes.append(theme)
+    themes += [None] * (2 - len(themes))
+    return themes
+
+
+def _get_stmt_json(stmt, stmt_format, stmt_blob):
+    """Return a statement JSON from the columns of a prepared statement."""
+    # Rows added before formats were introduced don't have a format set
+    if stmt_format is None or stmt_format == 'json':
+        return stmt
+    elif stmt_format == 'json-zlib-1':
+        return json_codec.loads(zlib.decompress(stmt_blob))
+    raise ValueError('Invalid statement format: %s' % stmt_format)
+
+
+def _get_batches(values, batch_size):
+    """Return batches of values to filter by, or a single None batch if the
+    values are not given, meaning that no filter is applied."""
+    if values is None:
+        return [None]
+    # Duplicates in different batches would lead to duplicate results
+    return batch_iter(set(values), batch_size, list)
+
+
+def _iter_stmts_from_query(q, chunk_size):
+    for rows in batch_iter(q.yield_per(chunk_size), chunk_size, list):
+        yield from _stmts_from_rows(rows)
+
+
+def _stmts_from_rows(rows):
+    stmt_jsons = [_get_stmt_json(*row) for row in rows]
+    # Groundings are interned since the same ones recur across the very
+    # large number of statements loaded from the DB
+    return intern_statements(stmts_from_json(stmt_jsons))
@@ -0,0 +1,149 @@
+"""Migrate an existing INDRA World service DB to the current schema.
+
+The migration adds the tables, columns and indexes that are missing from the
+DB, rebuilds the normalized labels and tenants of DART records, and fills in
+the precomputed columns of prepared statements added before these columns
+existed. It can be run repeatedly, each step only does what is still
+necessary.
+
+Usage: python -m indra_world.service.db.migrate <db_url>
+"""
+__all__ = ['migrate']
+
+import logging
+import argparse
+from sqlalchemy import inspect, delete
+from sqlalchemy.orm import Query
+from indra.statements import stmts_from_json
+from indra.util import batch_iter
+from indra_world.assembly.matches import location_matches_compositional
+from . import schema as wms_schema
+from .manager import DbManager, _add_record_labels_tenants, \
+    _get_stmt_json, _get_stmt_columns
+
+
+logger = logging.getLogger(__name__)
+
+
+def migrate(db_url, backfill_statements=True, batch_size=1000):
+    """Migrate the DB at a given URL to the current schema.
+
+    Parameters
+    ----------
+    db_url : str
+        The URL of the DB to migrate.
+    backfill_statements : Optional[bool]
+        If True, the precomputed columns of existing prepared statements
+        are filled in, which requires deserializing each of them once.
+        Default: True
+    batch_size : Optional[int]
+        The number of rows processed in a single transaction. Default: 1000
+    """
+    db = DbManager(db_url)
+    # This creates tables that don't exist yet along with their indexes
+    wms_schema.Base.metadata.create_all(db.engine)
+    _add_missing_columns(db.engine)
+    _add_missing_indexes(db.engine)
+    _rebuild_labels_tenants(db, batch_size)
+    if backfill_statements:
+        _backfill_statement_columns(db, batch_size)
+
+
+def _add_missing_columns(engine):
+    inspector = inspect(engine)
+    for table in wms_schema.Base.metadata.sorted_tables:
+        existing = {c['name'] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            logger.info('Adding column %s.%s' % (table.name, column.name))
+            column_type = column.type.compile(dialect=engine.dialect)
+            engine.execute('ALTER TABLE %s ADD COLUMN %s %s' %
+                           (table.name, column.name, column_type))
+
+
+def _add_missing_indexes(engine):
+    inspector = inspect(engine)
+    for table in wms_schema.Base.metadata.sorted_tables:
+        existing = {ix['name'] for ix in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            logger.info('Adding index %s' % index.name)
+            index.create(bind=engine)
+
+
+def _rebuild_labels_tenants(db, batch_size):
+    logger.info('Rebuilding DART record labels and tenants')
+    with db.session_scope() as session:
+        session.execute(delete(wms_schema.DartRecordLabels))
+        session.execute(delete(wms_schema.DartRecordTenants))
+        table = wms_schema.DartRecords
+        q = session.query(table.storage_key, table.labels, table.tenants)
+        for batch in batch_iter(q.yield_per(batch_size), batch_size, list):
+            records = [{'storage_key': storage_key, 'labels': labels,
+                        'tenants': tenants}
+                       for storage_key, labels, tenants in batch]
+            _add_record_labels_tenants(session, records)
+
+
+def _backfill_statement_columns(db, batch_size):
+    table = wms_schema.PreparedStatements
+    nrows = 0
+    nskipped = 0
+    last_id = None
+    while True:
+        # We page through rows that don't have a hash by primary key
+        q = Query([table._dummy, table.stmt, table.stmt_format,
+                   table.stmt_blob]).filter(table.stmt_hash.is_(None))
+        if last_id is not None:
+            q = q.filter(table._dummy > last_id)
+        rows = db.fetch_all(q.order_by(table._dummy).limit(batch_size))
+        if not rows:
+            break
+        mappings = []
+        for row_id, stmt, stmt_format, stmt_blob in rows:
+            # Malformed statements are skipped and keep empty columns
+            # rather than aborting the migration
+            try:
+                stmt_json = _get_stmt_json(stmt, stmt_format, stmt_blob)
+                # The stored matches_hash may have been calculated with a
+                # different matches function so we recalculate it
+                stmt_hash = stmts_from_json([stmt_json])[0].get_hash(
+                    matches_fun=location_matches_compositional)
+                columns = _get_stmt_columns(dict(stmt_json,
+                                                 matches_hash=stmt_hash))
+            except Exception as e:
+                logger.warning('Skipping malformed prepared statement %s: %s'
+                               % (row_id, e))
+                nskipped += 1
+                continue
+            columns['_dummy'] = row_id
+            mappings.append(columns)
+        if mappings:
+            db.run(lambda session: session.bulk_update_mappings(table,
+                                                                mappings))
+        last_id = rows[-1][0]
+        nrows += len(mappings)
+        logger.info('Filled in columns for %d prepared statements' % nrows)
+    if nskipped:
+        logger.warning('Skipped %d malformed prepared statements' % nskipped)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Migrate an INDRA World service DB to the current schema.')
+    parser.add_argument('db_url', help='The URL of the DB to migrate.')
+    parser.add_argument('--no-backfill', action='store_true',
+                        help='Do not fill in the precomputed columns of '
+                             'existing prepared statements.')
+    parser.add_argument('--batch-size', type=int, default=1000,
+                        help='The number of rows processed in a single '
+                             'transaction. Default: 1000')
+    args = parser.parse_args()
+    migrate(args.db_url, backfill_statements=not args.no_backfill,
+            batch_size=args.batch_size)
+
+
+if __name__ == '__main__':
+    main()
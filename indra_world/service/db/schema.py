@@ -1,6 +1,6 @@
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy import Column, String, Integer, JSON, UniqueConstraint, \
-    BigInteger
+    BigInteger, LargeBinary, Index
 
 Base = declarative_base()
 
@@ -19,21 +19,35 @@ class ProjectRecords(Base):
                                        name='uc_pr'),)
     _dummy = Column(Integer, primary_key=True)
     project_id = Column(String)
-    record_key = Column(String)
+    record_key = Column(String, index=True)
 
 
 class PreparedStatements(Base):
     __tablename__ = 'prepared_statements'
+    __table_args__ = (Index('record_key_idx', 'record_key'),)
     _dummy = Column(Integer, primary_key=True)
     record_key = Column(String)
     indra_version = Column(String)
-    stmt = Column(JSON)
+    stmt = Column(JSON(none_as_null=True))
+    # Statements can alternatively be stored as compressed binary payloads,
+    # stmt_format tags the way in which a statement is stored
+    stmt_format = Column(String)
+    stmt_blob = Column(LargeBinary)
+    # These are precomputed from the statement when it is added so that
+    # statements can be aggregated and filtered without deserializing them.
+    # The hash is calculated with the location_matches_compositional
+    # matches function used for assembly.
+    stmt_hash = Column(BigInteger, index=True)
+    stmt_type = Column(String, index=True)
+    source_api = Column(String, index=True)
+    subj_theme = Column(String, index=True)
+    obj_theme = Column(String, index=True)
 
 
 class Curations(Base):
     __tablename__ = 'curations'
     _dummy = Column(Integer, primary_key=True)
-    project_id = Column(String)
+    project_id = Column(String, index=True)
     stmt_hash = Column(BigInteger)
     curation = Column(JSON)
 
@@ -48,15 +62,29 @@ class Ontologies(Base):
 class DartRecords(Base):
     __tablename__ = 'dart_records'
     storage_key = Column(String, primary_key=True)
-    document_id = Column(String)
+    document_id = Column(String, index=True)
     reader_version = Column(String)
     reader = Column(String)
     output_version = Column(String)
     date = Column(String)
+    # Labels and tenants are stored here pipe-joined, as well as normalized
+    # into the dart_record_labels and dart_record_tenants tables for querying
     labels = Column(String)
     tenants = Column(String)
 
 
+class DartRecordLabels(Base):
+    __tablename__ = 'dart_record_labels'
+    storage_key = Column(String, primary_key=True)
+    label = Column(String, primary_key=True, index=True)
+
+
+class DartRecordTenants(Base):
+    __tablename__ = 'dart_record_tenants'
+    storage_key = Column(String, primary_key=True)
+    tenant = Column(String, primary_key=True, index=True)
+
+
 class Corpora(Base):
     __tablename__ = 'corpora'
     id = Column(String, primary_key=True)
@@ -69,4 +97,4 @@ class CorpusRecords(Base):
                                        name='uc_cr'),)
     _dummy = Column(Integer, primary_key=True)
     corpus_id = Column(String)
-    record_key = Column(String)
+    record_key = Column(String, index=True)
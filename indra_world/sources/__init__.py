@@ -5,6 +5,7 @@ import functools
 from typing import List, Mapping, Optional
 from multiprocessing import Pool
 from indra.statements import Statement
+from indra_world.interning import intern_statements
 from indra_world.sources import eidos, hume, sofia
 
 logger = logging.getLogger(__name__)
@@ -15,7 +16,11 @@ def _reader_wrapper(fname, reader, dart_ids=None, **kwargs):
         pr = eidos.process_json_file(fname, **kwargs)
         pr.doc.tree = None
     elif reader == 'sofia':
-        pr = sofia.process_json_file(fname, **kwargs)
+        # Older Sofia outputs are Excel workbooks
+        if fname.endswith('.xlsx'):
+            pr = sofia.process_table(fname, **kwargs)
+        else:
+            pr = sofia.process_json_file(fname, **kwargs)
     elif reader == 'hume':
         pr = hume.process_jsonld_file(fname, **kwargs)
     if dart_ids:
@@ -38,7 +43,8 @@ def process_reader_outputs(fnames: List[str],
     Parameters
     ----------
     fnames :
-        The list of file paths to the reader outputs to be processed.
+        The list of file paths to the reader outputs to be processed. For
+        Sofia, these can be JSON files or Excel (.xlsx) workbooks.
     reader :
         The name of the reader which produced the outputs.
     dart_ids :
@@ -74,7 +80,9 @@ def process_reader_outputs(fnames: List[str],
     for res in tqdm.tqdm(pool.imap_unordered(process_fun, fnames,
                                              chunksize=chunk_size),
                          total=len(fnames)):
-        stmts += res
+        # Statements coming from worker processes are interned here so
+        # that they share groundings with each other
+        stmts += intern_statements(res)
 
     logger.debug('Closing pool...')
     pool.close()
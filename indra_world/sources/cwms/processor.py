@@ -58,6 +58,9 @@ class CWMSProcessor(object):
         The list of all paragraphs in the EKB with their IDs
     par_to_sec : dict[str: str]
         A map from paragraph IDs to their associated section types
+    elements_by_id : dict[str: xml.etree.ElementTree.Element]
+        A map from IDs to the top-level EKB elements (terms, events, etc.)
+        with those IDs
     """
 
     def __init__(self, xml_string):
@@ -81,6 +84,15 @@ class CWMSProcessor(object):
         self.par_to_sec = {p.attrib['id']: p.attrib.get('sec-type')
                            for p in paragraph_tags}
 
+        # Index the top-level elements of the EKB by their ID, keeping the
+        # first element if an ID is repeated
+        self.elements_by_id = {}
+        for element in self.tree:
+            element_id = element.attrib.get('id')
+            if element_id is not None:
+                self.elements_by_id.setdefault(element_id, element)
+        self._arg_parent_elements = None
+
         # Keep a list of events that are part of relations and events
         # subsumed by other events
         self.relation_events = set()
@@ -91,6 +103,10 @@ class CWMSProcessor(object):
 
         self._preprocess_events()
 
+    def _get_term(self, term_id):
+        """Return the top-level element of the EKB with a given ID."""
+        return self.elements_by_id.get(term_id)
+
     def _preprocess_events(self):
         events = self.tree.findall("EVENT/[type]")
         for event in events:
@@ -315,7 +331,7 @@ class CWMSProcessor(object):
         if refset_arg is None:
             return None
         refset_id = refset_arg.attrib['id']
-        refset_term = self.tree.find("*[@id='%s']" % refset_id)
+        refset_term = self._get_term(refset_id)
         if refset_term is None:
             return None
         features = refset_term.find('features')
@@ -326,14 +342,17 @@ class CWMSProcessor(object):
             return None
         inevent_id = inevent.attrib['id']
         self.subsumed_events.add(inevent_id)
-        inevent_term = self.tree.find("*[@id='%s']" % inevent_id)
+        inevent_term = self._get_term(inevent_id)
         return inevent_term
 
     def _get_other_event_term(self, arg_term):
         refset_arg = arg_term.find('refset')
-        potential_events = self.tree.findall("EVENT/[type].//arg1/..") + \
-            self.tree.findall("EVENT/[type].//arg2/..")
-        for ev in potential_events:
+        # These don't change so we only look them up once
+        if self._arg_parent_elements is None:
+            self._arg_parent_elements = \
+                self.tree.findall("EVENT/[type].//arg1/..") + \
+                self.tree.findall("EVENT/[type].//arg2/..")
+        for ev in self._arg_parent_elements:
             arg1 = ev.find('arg1')
             arg2 = ev.find('arg2')
             for arg in [arg1, arg2]:
@@ -342,21 +361,19 @@ class CWMSProcessor(object):
                         if arg.attrib.get('id') == refset_arg.attrib.get('id'):
                             event_id = ev.attrib['id']
                             self.subsumed_events.add(event_id)
-                            event_term = self.tree.find("*[@id='%s']"
-                                                        % event_id)
+                            event_term = self._get_term(event_id)
                             return event_term
                     else:
                         # Refset might be on a different level
                         if arg.attrib.get('id'):
-                            term = self.tree.find("*[@id='%s']" % arg.attrib['id'])
+                            term = self._get_term(arg.attrib['id'])
                             arg_refset_arg = term.find('refset')
                             if arg_refset_arg is not None:
                                 if arg_refset_arg.attrib.get('id') == \
                                         arg_term.attrib.get('id'):
                                     event_id = ev.attrib['id']
                                     self.subsumed_events.add(event_id)
-                                    event_term = self.tree.find("*[@id='%s']"
-                                                                % event_id)
+                                    event_term = self._get_term(event_id)
                                     return event_term
         return None
 
@@ -364,7 +381,7 @@ class CWMSProcessor(object):
         potential_args = term.findall('arg1') + term.findall('arg2')
         for arg in potential_args:
             if arg.attrib.get('id'):
-                new_term = self.tree.find("*[@id='%s']" % arg.attrib['id'])
+                new_term = self._get_term(arg.attrib['id'])
                 if new_term is not None:
                     self.subsumed_events.add(new_term.attrib['id'])
                     return new_term
@@ -395,7 +412,7 @@ class CWMSProcessor(object):
         return existing_locs
 
     def _get_size(self, size_term_id):
-        size_term = self.tree.find("*[@id='%s']" % size_term_id)
+        size_term = self._get_term(size_term_id)
         value = size_term.find('value')
         if value is None:
             value = size_term.find('amount')
@@ -448,7 +465,7 @@ class CWMSProcessor(object):
         element_id = element.attrib.get('id')
         if element_id is None:
             return None, None
-        element_term = self.tree.find("*[@id='%s']" % element_id)
+        element_term = self._get_term(element_id)
         if element_term is None:
             return None, None
         return element_id, element_term
@@ -528,7 +545,7 @@ class CWMSProcessor(object):
             if time is None:
                 return None
         time_id = time.attrib.get('id')
-        time_term = self.tree.find("*[@id='%s']" % time_id)
+        time_term = self._get_term(time_id)
         if time_term is None:
             return None
         text = sanitize_name(time_term.findtext('text'))
@@ -546,14 +563,14 @@ class CWMSProcessor(object):
             to_time_el = time_term.find('to-time')
             if from_time_el is not None:
                 from_time_id = from_time_el.attrib.get('id')
-                from_time_term = self.tree.find("*[@id='%s']" % from_time_id)
+                from_time_term = self._get_term(from_time_id)
                 if time_term is not None:
                     timex = from_time_term.find('timex')
                     if timex is not None:
                         start = self._process_timex(timex)
             if to_time_el is not None:
                 to_time_id = to_time_el.attrib.get('id')
-                to_time_term = self.tree.find("*[@id='%s']" % to_time_id)
+                to_time_term = self._get_term(to_time_id)
                 if to_time_term is not None:
                     timex = to_time_term.find('timex')
                     if timex is not None:
@@ -603,7 +620,7 @@ class CWMSProcessor(object):
         if loc is None:
             return None
         loc_id = loc.attrib.get('id')
-        loc_term = self.tree.find("*[@id='%s']" % loc_id)
+        loc_term = self._get_term(loc_id)
         if loc_term is None:
             return None
         text = loc_term.findtext('text')
@@ -637,7 +654,7 @@ class CWMSProcessor(object):
                 return assoc_with_grounding
             # If the assoc-with has an ID then find the TERM
             # corresponding to it
-            assoc_with_term = self.tree.find("*[@id='%s']" % assoc_with_id)
+            assoc_with_term = self._get_term(assoc_with_id)
             if assoc_with_term is not None:
                 # We then get the grounding for the term
                 assoc_with_grounding = assoc_with_term.find('type').text
@@ -649,7 +666,7 @@ class CWMSProcessor(object):
         if assoc_with is not None:
             assoc_with_id = assoc_with.attrib.get('id')
             if assoc_with_id is not None:
-                assoc_with_term = self.tree.find("*[@id='%s']" % assoc_with_id)
+                assoc_with_term = self._get_term(assoc_with_id)
                 return assoc_with_term
 
     def _get_evidence(self, event_tag):
@@ -687,8 +704,8 @@ class CWMSProcessor(object):
         return sec
 
     def _remove_multi_extraction_artifacts(self):
-        # Build up a dict of evidence matches keys with statement UUIDs
-        evmks = {}
+        # Group statements by their evidence and argument matches keys
+        stmts_by_evmk = {}
         logger.debug('Starting with %d Statements.' % len(self.statements))
         for stmt in self.statements:
             if isinstance(stmt, Event):
@@ -701,33 +718,25 @@ class CWMSProcessor(object):
                 evmk = (stmt.evidence[0].matches_key() +
                         stmt.members[0].matches_key() +
                         stmt.members[1].matches_key())
-            if evmk not in evmks:
-                evmks[evmk] = [stmt.uuid]
             else:
-                evmks[evmk].append(stmt.uuid)
-        # This is a list of groups of statement UUIDs that are redundant
-        multi_evmks = [v for k, v in evmks.items() if len(v) > 1]
-        # We now figure out if anything needs to be removed
-        to_remove = []
-        # Remove redundant statements
-        for uuids in multi_evmks:
+                continue
+            stmts_by_evmk.setdefault(evmk, []).append(stmt)
+        # We now figure out if anything needs to be removed from each group
+        # of redundant statements
+        to_remove = set()
+        for stmts in stmts_by_evmk.values():
+            if len(stmts) < 2:
+                continue
             # Influence statements to be removed
-            infl_stmts = [s for s in self.statements if (
-                            s.uuid in uuids and isinstance(s, Influence))]
-            infl_stmts = sorted(infl_stmts, key=lambda x: x.polarity_count(),
-                                reverse=True)
-            to_remove += [s.uuid for s in infl_stmts[1:]]
-            # Association statements to be removed
-            assn_stmts = [s for s in self.statements if (
-                            s.uuid in uuids and isinstance(s, Association))]
-            assn_stmts = sorted(assn_stmts, key=lambda x: x.polarity_count(),
+            infl_stmts = sorted([s for s in stmts if isinstance(s, Influence)],
+                                key=lambda x: x.polarity_count(),
                                 reverse=True)
+            to_remove |= {s.uuid for s in infl_stmts[1:]}
             # Standalone events to be removed
-            events = [s for s in self.statements if (
-                        s.uuid in uuids and isinstance(s, Event))]
-            events = sorted(events, key=lambda x: event_delta_score(x),
+            events = sorted([s for s in stmts if isinstance(s, Event)],
+                            key=lambda x: event_delta_score(x),
                             reverse=True)
-            to_remove += [e.uuid for e in events[1:]]
+            to_remove |= {e.uuid for e in events[1:]}
 
         # Remove all redundant statements
         if to_remove:
@@ -1,13 +1,17 @@
-__all__ = ['process_reader_output', 'process_reader_outputs',
+__all__ = ['process_reader_output', 'process_reader_output_file',
+           'process_reader_outputs',
+           'iter_process_reader_outputs', 'process_dart_record_output',
            'print_record_stats', 'get_record_key', 'get_unique_records']
 
-import os
-import json
-import pickle
 import logging
+import functools
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
 from indra.statements import Statement
+from indra_world import json_codec
+from indra_world.interning import intern_statements
 from indra_world.sources import eidos, hume, sofia, cwms
+from .stmt_cache import StatementCache, get_content_key
 
 
 logger = logging.getLogger(__name__)
@@ -25,17 +29,53 @@ def fix_provenance(stmts, doc_id):
 
 
 def process_reader_output(reader, reader_output_str, doc_id,
-                          grounding_mode, extract_filter):
+                          grounding_mode, extract_filter, stmt_cache=None,
+                          storage_key=None):
+    """Return statements processed from a reader output.
+
+    Parameters
+    ----------
+    reader : str
+        The name of the reader that produced the output.
+    reader_output_str : str
+        The reader output as a string.
+    doc_id : str
+        The DART document ID to set as provenance for the statements.
+    grounding_mode : str
+        The grounding mode to use for processing.
+    extract_filter : list[str] or str
+        The types of statements to extract.
+    stmt_cache : Optional[indra_world.sources.dart.stmt_cache.StatementCache]
+        A cache of processed raw statements which is looked up before
+        processing and updated with newly processed statements.
+        Default: None
+    storage_key : Optional[str]
+        The DART storage key of the reader output used as the key in the
+        stmt_cache. If not given, a hash of the reader output is used.
+        Default: None
+
+    Returns
+    -------
+    list[indra.statements.Statement]
+        The list of statements extracted from the reader output.
+    """
+    if stmt_cache is not None:
+        if storage_key is None:
+            storage_key = get_content_key(reader_output_str)
+        stmts = stmt_cache.get_statements(storage_key, reader,
+                                          grounding_mode, extract_filter)
+        if stmts is not None:
+            return intern_statements(fix_provenance(stmts, doc_id))
     if reader == 'eidos':
         pr = eidos.process_json_str(reader_output_str,
                                     grounding_mode=grounding_mode,
                                     extract_filter=extract_filter)
     elif reader == 'hume':
-        jld = json.loads(reader_output_str)
+        jld = json_codec.loads(reader_output_str)
         pr = hume.process_jsonld(jld, grounding_mode=grounding_mode,
                                  extract_filter=extract_filter)
     elif reader == 'sofia':
-        jd = json.loads(reader_output_str)
+        jd = json_codec.loads(reader_output_str)
         pr = sofia.process_json(jd, grounding_mode=grounding_mode,
                                 extract_filter=extract_filter)
     elif reader == 'cwms':
@@ -43,43 +83,270 @@ def process_reader_output(reader, reader_output_str, doc_id,
                               extract_filter=extract_filter)
     else:
         raise ValueError('Unknown reader %s' % reader)
-    if pr is not None:
-        stmts = fix_provenance(pr.statements, doc_id)
-        return stmts
-    else:
-        return []
+    stmts = fix_provenance(pr.statements, doc_id) if pr is not None else []
+    intern_statements(stmts)
+    if stmt_cache is not None:
+        stmt_cache.add_statements(storage_key, reader, grounding_mode,
+                                  extract_filter, stmts)
+    return stmts
+
+
+def process_dart_record_output(record, dart_client, grounding_mode,
+                               extract_filter, stmt_cache=None):
+    """Return statements processed from the reader output for a DART record.
+
+    If a stmt_cache is given and has valid statements for the record, the
+    reader output isn't obtained or processed.
+
+    Parameters
+    ----------
+    record : dict
+        A DART record.
+    dart_client : indra_world.sources.dart.DartClient
+        A DART client used to get the reader output for the record.
+    grounding_mode : str
+        The grounding mode to use for processing.
+    extract_filter : list[str] or str
+        The types of statements to extract.
+    stmt_cache : Optional[indra_world.sources.dart.stmt_cache.StatementCache]
+        A cache of processed raw statements. Default: None
+
+    Returns
+    -------
+    list[indra.statements.Statement] or None
+        The list of statements extracted from the reader output or None
+        if the reader output isn't available.
+    """
+    if stmt_cache is not None:
+        stmts = stmt_cache.get_statements(record['storage_key'],
+                                          record['identity'],
+                                          grounding_mode, extract_filter)
+        if stmts is not None:
+            return intern_statements(fix_provenance(stmts,
+                                                    record['document_id']))
+    reader_output_str = dart_client.get_output_from_record(record)
+    if reader_output_str is None:
+        return None
+    return process_reader_output(record['identity'], reader_output_str,
+                                 record['document_id'],
+                                 grounding_mode=grounding_mode,
+                                 extract_filter=extract_filter,
+                                 stmt_cache=stmt_cache,
+                                 storage_key=record['storage_key'])
+
+
+def process_reader_output_file(reader, fname, doc_id, grounding_mode,
+                               extract_filter, stmt_cache=None):
+    """Return statements processed from a reader output file.
+
+    Outputs compressed in local storage (see DartClient) are decompressed,
+    and Sofia outputs in Excel (.xlsx) workbooks are processed as tables.
+
+    Parameters
+    ----------
+    reader : str
+        The name of the reader that produced the output.
+    fname : str
+        The path to the reader output file.
+    doc_id : str
+        The DART document ID to set as provenance for the statements.
+    grounding_mode : str
+        The grounding mode to use for processing.
+    extract_filter : list[str] or str
+        The types of statements to extract.
+    stmt_cache : Optional[indra_world.sources.dart.stmt_cache.StatementCache]
+        A cache of processed raw statements, keyed by the content of the
+        reader output. Default: None
+
+    Returns
+    -------
+    list[indra.statements.Statement]
+        The list of statements extracted from the reader output.
+    """
+    from .client import read_local_output
+    if not (reader == 'sofia' and fname.endswith('.xlsx')):
+        return process_reader_output(reader, read_local_output(fname), doc_id,
+                                     grounding_mode=grounding_mode,
+                                     extract_filter=extract_filter,
+                                     stmt_cache=stmt_cache)
+    if stmt_cache is not None:
+        with open(fname, 'rb') as fh:
+            storage_key = get_content_key(fh.read())
+        stmts = stmt_cache.get_statements(storage_key, reader,
+                                          grounding_mode, extract_filter)
+        if stmts is not None:
+            return intern_statements(fix_provenance(stmts, doc_id))
+    pr = sofia.process_table(fname, extract_filter=extract_filter,
+                             grounding_mode=grounding_mode)
+    stmts = intern_statements(fix_provenance(pr.statements, doc_id))
+    if stmt_cache is not None:
+        stmt_cache.add_statements(storage_key, reader, grounding_mode,
+                                  extract_filter, stmts)
+    return stmts
 
 
 def process_reader_outputs(outputs, corpus_id=None,
                            grounding_mode='compositional',
-                           extract_filter=None):
+                           extract_filter=None, stmt_cache=None):
+    """Return statements processed from a set of reader outputs.
+
+    Parameters
+    ----------
+    outputs : dict
+        A dict keyed by reader whose values are dicts of reader output
+        strings keyed by document ID.
+    corpus_id : Optional[str]
+        If given and no stmt_cache is provided, a statement cache named
+        after the corpus is used in the current folder. Default: None
+    grounding_mode : Optional[str]
+        The grounding mode to use for processing. Default: compositional
+    extract_filter : Optional[list[str]]
+        The types of statements to extract. Default: ['influence']
+    stmt_cache : Optional[indra_world.sources.dart.stmt_cache.StatementCache]
+        A cache of processed raw statements, keyed by the content of each
+        reader output. Default: None
+
+    Returns
+    -------
+    list[indra.statements.Statement]
+        The list of statements extracted from all the reader outputs.
+    """
     if not extract_filter:
         extract_filter = ['influence']
+    if corpus_id and stmt_cache is None:
+        stmt_cache = StatementCache('%s_raw.sqlite' % corpus_id)
     all_stmts = []
     for reader, reader_outputs in outputs.items():
-        if corpus_id:
-            fname = '%s_%s_raw.pkl' % (corpus_id, reader)
-            if os.path.exists(fname):
-                with open(fname, 'rb') as fh:
-                    all_stmts += pickle.load(fh)
-                    continue
         logger.info('Processing %d outputs for %s' %
                     (len(reader_outputs), reader))
-        reader_stmts = []
         for doc_id, reader_output_str in reader_outputs.items():
-            reader_stmts += process_reader_output(reader,
-                                                  reader_output_str,
-                                                  doc_id,
-                                                  grounding_mode=grounding_mode,
-                                                  extract_filter=extract_filter)
-        if corpus_id:
-            with open(fname, 'wb') as fh:
-                pickle.dump(reader_stmts, fh)
-        all_stmts += reader_stmts
+            all_stmts += process_reader_output(reader,
+                                               reader_output_str,
+                                               doc_id,
+                                               grounding_mode=grounding_mode,
+                                               extract_filter=extract_filter,
+                                               stmt_cache=stmt_cache)
     assert all(isinstance(stmt, Statement) for stmt in all_stmts)
     return all_stmts
 
 
+def iter_process_reader_outputs(items, dart_client=None,
+                                grounding_mode='compositional',
+                                extract_filter=None, nproc=4,
+                                max_pending=None, stmt_cache=None):
+    """Yield statements processed from reader outputs one document at a time.
+
+    Reader outputs are loaded and processed in a pool of worker processes,
+    and only a bounded number of outputs are being processed or waiting
+    to be consumed at any time, so that reading, downstream processing
+    and storage of statements can be pipelined without holding all
+    reader outputs in memory.
+
+    Parameters
+    ----------
+    items : iterable
+        An iterable of items each of which is either a DART record (dict)
+        whose reader output is obtained through the dart_client, or a
+        (reader, doc_id, fname) tuple pointing to a reader output file
+        (see process_reader_output_file).
+    dart_client : Optional[indra_world.sources.dart.DartClient]
+        A DART client used to get reader outputs for DART records.
+        Default: None
+    grounding_mode : Optional[str]
+        The grounding mode to use for processing. Default: compositional
+    extract_filter : Optional[list[str]]
+        The types of statements to extract. Default: ['influence']
+    nproc : Optional[int]
+        The number of worker processes to use. If None or 1, outputs are
+        processed in the current process. Default: 4
+    max_pending : Optional[int]
+        The maximum number of outputs submitted for processing whose results
+        haven't been consumed yet. Default: twice the number of workers.
+    stmt_cache : Optional[indra_world.sources.dart.stmt_cache.StatementCache]
+        A cache of processed raw statements. Default: None
+
+    Yields
+    ------
+    tuple
+        Each input item along with the list of statements (with provenance
+        fixed) extracted from its reader output, in order of completion.
+        Instead of a list of statements, None is given for items whose
+        reader output couldn't be obtained or processed, so that these can
+        be told apart from outputs without any statements.
+    """
+    if not extract_filter:
+        extract_filter = ['influence']
+    process_fun = functools.partial(_process_item, dart_client=dart_client,
+                                    grounding_mode=grounding_mode,
+                                    extract_filter=extract_filter,
+                                    stmt_cache=stmt_cache)
+    nitems = 0
+    nfailed = 0
+    for item, stmts in _iter_results(process_fun, items, nproc, max_pending):
+        nitems += 1
+        if stmts is None:
+            nfailed += 1
+        yield item, stmts
+    if nfailed:
+        logger.warning('Could not obtain or process %d of %d reader outputs'
+                       % (nfailed, nitems))
+
+
+def _iter_results(process_fun, items, nproc, max_pending):
+    if not nproc or nproc <= 1:
+        for item in items:
+            yield process_fun(item)
+        return
+    max_pending = max_pending if max_pending else 2 * nproc
+    with ProcessPoolExecutor(max_workers=nproc) as executor:
+        pending = set()
+        for item in items:
+            if len(pending) >= max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield _intern_result(future.result())
+            pending.add(executor.submit(process_fun, item))
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield _intern_result(future.result())
+
+
+def _process_item(item, dart_client, grounding_mode, extract_filter,
+                  stmt_cache=None):
+    """Return an item along with statements processed from its reader output,
+    or None instead of statements if processing failed."""
+    if isinstance(item, dict):
+        reader, doc_id = item['identity'], item['document_id']
+    else:
+        reader, doc_id, fname = item
+    try:
+        if isinstance(item, dict):
+            stmts = process_dart_record_output(item, dart_client,
+                                               grounding_mode=grounding_mode,
+                                               extract_filter=extract_filter,
+                                               stmt_cache=stmt_cache)
+        else:
+            stmts = process_reader_output_file(reader, fname, doc_id,
+                                               grounding_mode=grounding_mode,
+                                               extract_filter=extract_filter,
+                                               stmt_cache=stmt_cache)
+    except Exception:
+        logger.exception('Error processing %s output for %s' %
+                         (reader, doc_id))
+        return item, None
+    if stmts is None:
+        logger.warning('No %s output available for %s' % (reader, doc_id))
+    return item, stmts
+
+
+def _intern_result(result):
+    # Statements unpickled from worker processes don't share groundings
+    # so we intern them in this process
+    item, stmts = result
+    return item, intern_statements(stmts) if stmts is not None else None
+
+
 def print_record_stats(recs):
     """Print statistics for a list of DART records."""
     print("reader,tenants,reader_version,ontology_version,count")
@@ -0,0 +1,208 @@
+"""A persistent, indexed catalog of DART records known to the DART client."""
+__all__ = ['RecordCatalog']
+
+import os
+import sqlite3
+import logging
+import threading
+from indra_world import json_codec
+
+
+logger = logging.getLogger(__name__)
+
+
+class RecordCatalog:
+    """A catalog of DART records backed by SQLite.
+
+    The catalog stores each record along with indexed columns for its
+    reader, reader version, document ID, timestamp, ontology (output)
+    version, and tenants, so that records can be queried without walking
+    the local storage folder.
+
+    Parameters
+    ----------
+    path : str
+        The path to the SQLite file in which the catalog is stored.
+    timeout : Optional[float]
+        The number of seconds to wait for a lock held by another process
+        or thread to be released. Default: 60
+    """
+    def __init__(self, path, timeout=60):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        conn = self.get_connection()
+        with conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS records ('
+                         'storage_key TEXT PRIMARY KEY, identity TEXT, '
+                         'version TEXT, document_id TEXT, '
+                         'output_version TEXT, timestamp TEXT, '
+                         'record TEXT)')
+            conn.execute('CREATE TABLE IF NOT EXISTS record_tenants ('
+                         'storage_key TEXT, tenant TEXT, '
+                         'PRIMARY KEY (storage_key, tenant))')
+            for name, columns in [('reader', 'identity, version'),
+                                  ('document', 'document_id'),
+                                  ('ontology', 'output_version'),
+                                  ('timestamp', 'timestamp')]:
+                conn.execute('CREATE INDEX IF NOT EXISTS records_%s_idx ON '
+                             'records (%s)' % (name, columns))
+            conn.execute('CREATE INDEX IF NOT EXISTS record_tenants_idx ON '
+                         'record_tenants (tenant)')
+            conn.execute('CREATE TABLE IF NOT EXISTS sync_watermarks ('
+                         'query TEXT PRIMARY KEY, watermark TEXT)')
+
+    def get_connection(self):
+        """Return a connection to the catalog for the current thread."""
+        # Connections can't be shared across threads or processes so we
+        # keep one per thread and open a new one in forked processes.
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_local'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    def add_records(self, records):
+        """Add or update a list of DART records in the catalog."""
+        conn = self.get_connection()
+        with conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?, ?, ?, ?)',
+                [(rec['storage_key'], rec.get('identity'), rec.get('version'),
+                  rec.get('document_id'), rec.get('output_version'),
+                  rec.get('timestamp'), json_codec.dumps(rec))
+                 for rec in records])
+            conn.executemany(
+                'DELETE FROM record_tenants WHERE storage_key = ?',
+                [(rec['storage_key'],) for rec in records])
+            conn.executemany(
+                'INSERT INTO record_tenants VALUES (?, ?)',
+                [(rec['storage_key'], tenant) for rec in records
+                 for tenant in set(_get_tenants(rec))])
+
+    def get_records(self, readers=None, versions=None, document_ids=None,
+                    timestamp=None, tenant=None, ontology_id=None):
+        """Return DART records from the catalog given constraints.
+
+        Parameters
+        ----------
+        readers : Optional[list[str]]
+            A list of reader names.
+        versions : Optional[list[str]]
+            A list of reader versions.
+        document_ids : Optional[list[str]]
+            A list of document identifiers.
+        timestamp : Optional[dict]
+            A dict with "before" and/or "after" keys whose values are
+            timestamp strings formatted as "yyyy-mm-ddThh:mm:ss".
+        tenant : Optional[str]
+            Return only records for the given tenant.
+        ontology_id : Optional[str]
+            Return only records for the given ontology ID.
+
+        Returns
+        -------
+        list[dict]
+            A list of DART records satisfying the constraints.
+        """
+        # We query documents in batches to stay within SQLite's limit on
+        # the number of query parameters
+        if document_ids and len(document_ids) > 500:
+            document_ids = list(document_ids)
+            records = []
+            for idx in range(0, len(document_ids), 500):
+                records += self.get_records(
+                    readers=readers, versions=versions,
+                    document_ids=document_ids[idx:idx + 500],
+                    timestamp=timestamp, tenant=tenant,
+                    ontology_id=ontology_id)
+            return records
+        constraints = []
+        params = []
+        for column, values in [('identity', readers), ('version', versions),
+                               ('document_id', document_ids)]:
+            if values:
+                constraints.append('%s IN (%s)' %
+                                   (column, ','.join('?' * len(values))))
+                params += list(values)
+        if ontology_id:
+            constraints.append('output_version = ?')
+            params.append(ontology_id)
+        if timestamp:
+            if timestamp.get('after'):
+                constraints.append('timestamp > ?')
+                params.append(timestamp['after'])
+            if timestamp.get('before'):
+                constraints.append('timestamp < ?')
+                params.append(timestamp['before'])
+        if tenant:
+            constraints.append('storage_key IN (SELECT storage_key FROM '
+                               'record_tenants WHERE tenant = ?)')
+            params.append(tenant)
+        query = 'SELECT record FROM records'
+        if constraints:
+            query += ' WHERE ' + ' AND '.join(constraints)
+        rows = self.get_connection().execute(query, params).fetchall()
+        return [json_codec.loads(row[0]) for row in rows]
+
+    def get_known_storage_keys(self, storage_keys):
+        """Return the subset of the given storage keys that are cataloged."""
+        storage_keys = list(storage_keys)
+        conn = self.get_connection()
+        known = set()
+        # We query keys in batches to stay within SQLite's limit on the
+        # number of query parameters
+        for idx in range(0, len(storage_keys), 500):
+            key_batch = storage_keys[idx:idx + 500]
+            rows = conn.execute(
+                'SELECT storage_key FROM records WHERE storage_key IN (%s)' %
+                ','.join('?' * len(key_batch)), key_batch).fetchall()
+            known |= {row[0] for row in rows}
+        return known
+
+    def get_watermark(self, query):
+        """Return the timestamp up to which records were synced for a query.
+        """
+        row = self.get_connection().execute(
+            'SELECT watermark FROM sync_watermarks WHERE query = ?',
+            (query,)).fetchone()
+        return row[0] if row else None
+
+    def set_watermark(self, query, watermark):
+        """Set the timestamp up to which records were synced for a query."""
+        conn = self.get_connection()
+        with conn:
+            conn.execute('INSERT OR REPLACE INTO sync_watermarks '
+                         'VALUES (?, ?)', (query, watermark))
+
+    def has_records(self):
+        """Return True if the catalog contains any records."""
+        conn = self.get_connection()
+        return conn.execute('SELECT 1 FROM records LIMIT 1').fetchone() \
+            is not None
+
+    def __len__(self):
+        conn = self.get_connection()
+        return conn.execute('SELECT COUNT(*) FROM records').fetchone()[0]
+
+
+def _get_tenants(record):
+    tenants = record.get('tenants')
+    if not tenants:
+        return []
+    # Tenants are typically given as a list but we also handle the
+    # pipe-joined form used in the service DB
+    if isinstance(tenants, str):
+        return tenants.split('|')
+    return tenants
@@ -4,14 +4,22 @@ import os
 import tqdm
 import json
 import glob
+import gzip
+import time
 import logging
 import requests
+import tempfile
+import functools
 import itertools
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
-from datetime import datetime
+from datetime import datetime, timedelta
 from collections import defaultdict
 from indra.config import get_config
+from indra_world import json_codec
 from .api import get_unique_records
+from .catalog import RecordCatalog
 
 
 logger = logging.getLogger(__name__)
@@ -44,10 +52,35 @@ class DartClient:
         storage_mode is `local`, it is used as the primary location to access
         reader outputs. If given, it overrides the INDRA_WM_CACHE configuration
         value.
+    max_retries : Optional[int]
+        The number of times a failed download from DART is retried.
+        Default: 3
+    backoff_factor : Optional[float]
+        The number of seconds to wait before the first retry of a failed
+        download, doubled for each subsequent retry. Default: 1.0
+    compression : Optional[str]
+        If `gzip` or `zstd`, reader outputs newly written into local storage
+        are compressed with the given method (`zstd` requires the zstandard
+        package). Files in local storage are decompressed transparently
+        when read based on their header, irrespective of this setting, so
+        existing uncompressed files can still be used. Default: None
+    timeout : Optional[float]
+        The number of seconds to wait for a response from DART before a
+        request is considered failed (and retried in case of downloads).
+        Default: 300
     """
     def __init__(self, storage_mode='web', dart_url=None, dart_uname=None,
-                 dart_pwd=None, local_storage=None):
+                 dart_pwd=None, local_storage=None, max_retries=3,
+                 backoff_factor=1.0, compression=None, timeout=300):
+        if compression not in {None, 'gzip', 'zstd'}:
+            raise ValueError('Invalid compression: %s' % compression)
+        self.compression = compression
         self.storage_mode = storage_mode
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.timeout = timeout
+        self._session = None
+        self._pool_size = None
         # We set the local storage in either mode, since even in web mode
         # it is used as a cache
         self.local_storage = local_storage if local_storage else \
@@ -95,16 +128,61 @@ class DartClient:
             except Exception as e:
                 logger.error('Could not create DART client local storage: %s'
                              % e)
+        # The catalog indexes records that are cached in local storage
+        self.catalog = None
+        if self.local_storage and os.path.exists(self.local_storage):
+            try:
+                self.catalog = RecordCatalog(
+                    os.path.join(self.local_storage, 'catalog.sqlite'))
+            except Exception as e:
+                logger.error('Could not open DART client local catalog: %s'
+                             % e)
         logger.info('Running DART client in %s mode with local storage at %s' %
                     (self.storage_mode, self.local_storage))
 
-    def get_outputs_from_records(self, records):
+    def __getstate__(self):
+        # Sessions can't be pickled (e.g., to be sent to worker processes)
+        # so we drop it and let it be created again on first use
+        state = self.__dict__.copy()
+        state['_session'] = None
+        state['_pool_size'] = None
+        return state
+
+    def get_session(self, pool_size=None):
+        """Return a requests session with connection pooling for DART.
+
+        Parameters
+        ----------
+        pool_size : Optional[int]
+            The maximum number of connections kept in the session's pool.
+            If given and different from the size of the current pool, the
+            session's connection pool is replaced with one of the given
+            size. Requests already in flight keep using the previous pool.
+            If not given, the current pool is used, or one with 10
+            connections is created. Default: None
+        """
+        if self._session is None:
+            self._session = requests.Session()
+            self._session.auth = (self.dart_uname, self.dart_pwd)
+        if self._pool_size is None or \
+                (pool_size and pool_size != self._pool_size):
+            self._pool_size = pool_size if pool_size else 10
+            adapter = HTTPAdapter(pool_connections=1,
+                                  pool_maxsize=self._pool_size)
+            self._session.mount('http://', adapter)
+            self._session.mount('https://', adapter)
+        return self._session
+
+    def get_outputs_from_records(self, records, max_workers=None):
         """Return reader outputs corresponding to a list of records.
 
         Parameters
         ----------
         records : list of dict
             A list of records returned from the reader output query.
+        max_workers : Optional[int]
+            If given, outputs are fetched concurrently with at most this
+            many requests in flight at a time. Default: None
 
         Returns
         -------
@@ -114,12 +192,25 @@ class DartClient:
         """
         # Loop document keys and get documents
         reader_outputs = defaultdict(dict)
-        for record in tqdm.tqdm(records):
+        outputs = self._map_records(self.get_output_from_record, records,
+                                    max_workers=max_workers)
+        for record, output in tqdm.tqdm(zip(records, outputs),
+                                        total=len(records)):
             reader_outputs[record['identity']][record['document_id']] = \
-                self.get_output_from_record(record)
+                output
         reader_outputs = dict(reader_outputs)
         return reader_outputs
 
+    def _map_records(self, fun, records, max_workers=None):
+        """Apply a function to each record, optionally with a thread pool."""
+        if not max_workers:
+            return map(fun, records)
+        # Make sure the session's connection pool can serve all the workers
+        if self.storage_mode == 'web':
+            self.get_session(pool_size=max_workers)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(fun, records))
+
     def get_output_from_record(self, record):
         """Return reader output corresponding to a single record.
 
@@ -137,8 +228,7 @@ class DartClient:
         fname = self.get_local_storage_path(record)
         output = None
         if fname and os.path.exists(fname):
-            with open(fname, 'r') as fh:
-                output = fh.read()
+            output = read_local_output(fname)
         elif self.storage_mode == 'web':
             try:
                 output = self.download_output(storage_key)
@@ -148,8 +238,9 @@ class DartClient:
                 return None
             try:
                 if self.local_storage:
-                    with open(fname, 'w') as fh:
-                        fh.write(output)
+                    write_local_output(fname, output,
+                                       compression=self.compression)
+                    self._add_to_catalog(record)
             except Exception as e:
                 logger.warning('Error storing %s: %s' %
                                (storage_key, e))
@@ -169,19 +260,76 @@ class DartClient:
         fname = self.get_local_storage_path(record)
         if overwrite or not os.path.exists(fname):
             output = self.download_output(record['storage_key'])
-            with open(fname, 'w') as fh:
-                fh.write(output)
+            write_local_output(fname, output, compression=self.compression)
+            self._add_to_catalog(record)
+
+    def _add_to_catalog(self, record):
+        if self.catalog is not None:
+            self.catalog.add_records([record])
+
+    def index_local_storage(self):
+        """Add reader outputs in local storage that aren't in the catalog.
+
+        This only needs to be run once for reader outputs that were cached
+        before the catalog was introduced, or that were added to local
+        storage by other means, since local lookups only use the catalog
+        once it contains any records. The full DART records of these outputs
+        aren't available, so only their reader, version and document ID are
+        indexed, and the storage key is set to the path of the output file,
+        as for outputs found by searching local storage. Since their
+        ontology version, tenants and timestamp aren't known, they don't
+        match lookups constrained by these.
 
-    def cache_records(self, records, overwrite=False):
+        Returns
+        -------
+        int
+            The number of records added to the catalog.
+        """
+        if self.catalog is None:
+            raise ValueError('Indexing local storage requires a catalog.')
+        readers = [os.path.basename(path) for path in
+                   glob.glob(os.path.join(self.local_storage, '*'))
+                   if os.path.isdir(path)]
+        cataloged = {_get_output_key(r)
+                     for r in self.catalog.get_records(readers=readers)} \
+            if readers else set()
+        records = [record for record in self._scan_local_storage(readers)
+                   if _get_output_key(record) not in cataloged]
+        logger.info('Adding %d records to the local catalog' % len(records))
+        self.catalog.add_records(records)
+        return len(records)
+
+    def cache_records(self, records, overwrite=False, max_workers=None):
         """Download and cache a list of records in local storage.
 
         Parameters
         ----------
         records : list[dict]
             A list of DART records.
+        overwrite : Optional[bool]
+            If True, records that are already cached are downloaded again.
+            Default: False
+        max_workers : Optional[int]
+            If given, records are downloaded concurrently with at most this
+            many requests in flight at a time. Default: None
         """
-        for record in tqdm.tqdm(records):
-            self.cache_record(record, overwrite=overwrite)
+        cache_fun = functools.partial(self.cache_record, overwrite=overwrite)
+        if not max_workers:
+            for record in tqdm.tqdm(records):
+                cache_fun(record)
+            return
+        if self.storage_mode == 'web':
+            self.get_session(pool_size=max_workers)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(cache_fun, record)
+                       for record in records]
+            for record, future in tqdm.tqdm(zip(records, futures),
+                                            total=len(records)):
+                try:
+                    future.result()
+                except Exception as e:
+                    logger.warning('Error caching %s: %s' %
+                                   (record['storage_key'], e))
 
     def download_output(self, storage_key):
         """Return content from the DART web service based on its storage key.
@@ -197,18 +345,41 @@ class DartClient:
             The content corresponding to the storage key.
         """
         url = self.dart_url + '/readers/download/%s' % storage_key
-        res = requests.get(url=url, auth=(self.dart_uname, self.dart_pwd))
-        res.raise_for_status()
+        res = self._request('GET', url, 'Downloading %s' % storage_key)
         return res.text
 
+    def _request(self, method, url, description, **kwargs):
+        """Send a request with the pooled session and return the response.
+
+        Connection errors, timeouts and server-side errors are retried with
+        exponential backoff.
+        """
+        session = self.get_session()
+        for attempt in range(self.max_retries + 1):
+            try:
+                res = session.request(method, url, timeout=self.timeout,
+                                      **kwargs)
+                # We only retry on server-side errors
+                if res.status_code < 500 or attempt == self.max_retries:
+                    res.raise_for_status()
+                    return res
+                error = 'status code %d' % res.status_code
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.max_retries:
+                    raise
+                error = str(e)
+            wait = self.backoff_factor * (2 ** attempt)
+            logger.warning('%s failed with %s, retrying in %.1f seconds' %
+                           (description, error, wait))
+            time.sleep(wait)
+
     def get_local_storage_path(self, record):
         """Return the local storage path for a DART record."""
         if not self.local_storage:
             return None
         folder = os.path.join(self.local_storage, record['identity'],
                               record['version'])
-        if not os.path.exists(folder):
-            os.makedirs(folder)
+        os.makedirs(folder, exist_ok=True)
         fname = os.path.join(folder, record['document_id'])
         return fname
 
@@ -242,6 +413,11 @@ class DartClient:
         unique : Optional[bool]
             If true, records that are duplicates are collapsed. Default: False.
 
+        In local mode, records are looked up in the local catalog if it
+        contains any records, otherwise the local storage folder is searched.
+        Outputs that were cached before the catalog was introduced can be
+        added to the catalog once with index_local_storage.
+
         Returns
         -------
         dict
@@ -252,65 +428,169 @@ class DartClient:
                                              timestamp)
             if not query_data:
                 return {}
-            full_query_data = {'metadata': query_data}
-            url = self.dart_url + '/readers/query'
-            res = requests.post(url, data=full_query_data,
-                                auth=(self.dart_uname, self.dart_pwd))
-            res.raise_for_status()
-            rj = res.json()
-
-            # This handles both empty list and dict
-            if not rj or 'records' not in rj:
-                records = []
-            else:
-                records = rj['records']
+            records = list(self._iter_query_records(query_data))
         else:
-            records = []
-            if readers:
-                if versions:
-                    for reader, version in itertools.product(readers, versions):
-                        path = os.path.join(self.local_storage, reader,
-                                            version, '*')
-                        for file in glob.glob(path):
-                            doc_id = os.path.basename(file)
-                            record = {
-                                'identity': reader,
-                                'version': version,
-                                'doc_id': doc_id,
-                                'storage_key': file
-                            }
-                            records.append(record)
-                else:
-                    for reader in readers:
-                        path = os.path.join(self.local_storage, reader, '*')
-                        version_paths = glob.glob(path)
-                        for version_path in version_paths:
-                            version = os.path.basename(version_path)
-                            path = glob.glob(version_path, '*')
-                            for file in glob.glob(path):
-                                doc_id = os.path.basename(file)
-                                record = {
-                                    'identity': reader,
-                                    'version': version,
-                                    'doc_id': doc_id,
-                                    'storage_key': file
-                                }
-                                records.append(record)
-                if document_ids:
-                    records = [r for r in records
-                               if r['doc_id'] in document_ids]
-            else:
+            if not readers:
                 raise ValueError('Must provide readers for searching in local '
                                  'mode.')
+            if self.catalog is not None and self.catalog.has_records():
+                records = self.catalog.get_records(readers=readers,
+                                                   versions=versions,
+                                                   document_ids=document_ids,
+                                                   timestamp=timestamp,
+                                                   tenant=tenant,
+                                                   ontology_id=ontology_id)
+            else:
+                records = self._scan_local_storage(readers, versions,
+                                                   document_ids)
         if ontology_id:
-            records = [r for r in records if r['output_version'] == ontology_id]
+            records = [r for r in records
+                       if r.get('output_version') == ontology_id]
         if tenant:
-            records = [r for r in records if r['tenants'] and
+            records = [r for r in records if r.get('tenants') and
                        tenant in r['tenants']]
         if unique:
             records = get_unique_records(records)
         return records
 
+    def _scan_local_storage(self, readers, versions=None, document_ids=None):
+        """Return records for the reader outputs found in local storage.
+
+        The records only contain the reader, version and document ID of
+        each output based on its path, and the path as the storage key.
+        """
+        document_ids = set(document_ids) if document_ids else None
+        records = []
+        for reader in readers:
+            version_paths = \
+                [os.path.join(self.local_storage, reader, version)
+                 for version in versions] if versions else \
+                glob.glob(os.path.join(self.local_storage, reader, '*'))
+            for version_path in version_paths:
+                version = os.path.basename(version_path)
+                for file in glob.glob(os.path.join(version_path, '*')):
+                    doc_id = os.path.basename(file)
+                    if document_ids and doc_id not in document_ids:
+                        continue
+                    records.append({
+                        'identity': reader,
+                        'version': version,
+                        'document_id': doc_id,
+                        # For backwards compatibility
+                        'doc_id': doc_id,
+                        'storage_key': file
+                    })
+        return records
+
+    def _iter_query_records(self, query_data):
+        """Yield records from the DART API's response to a query.
+
+        If the ijson package is available, the response is parsed as
+        a stream, otherwise it is loaded in full.
+        """
+        full_query_data = {'metadata': query_data}
+        url = self.dart_url + '/readers/query'
+        res = self._request('POST', url, 'Querying DART records',
+                            data=full_query_data, stream=True)
+        try:
+            import ijson
+        except ImportError:
+            rj = json_codec.loads(res.content)
+            # This handles both empty list and dict
+            if not rj or 'records' not in rj:
+                return
+            yield from rj['records']
+            return
+        res.raw.decode_content = True
+        yield from ijson.items(res.raw, 'records.item', use_float=True)
+
+    def sync_reader_output_records(self, readers=None, versions=None,
+                                   document_ids=None, tenant=None,
+                                   ontology_id=None, batch_size=1000):
+        """Return records newer than the last sync of the same query.
+
+        The timestamp of the newest record returned for each distinct query
+        is stored in the local catalog as a high-water mark, and the next
+        sync of the same query only fetches records after it. Records
+        are added to the local catalog in batches as they are parsed from
+        the response. Records with the same timestamp (to the second) as
+        the high-water mark are fetched again since DART's timestamp
+        constraints have a resolution of seconds. Those among them that are
+        already in the catalog are updated there but aren't returned as new.
+
+        Parameters
+        ----------
+        readers : list
+            A list of reader names
+        versions : list
+            A list of versions to match with the reader name(s)
+        document_ids : list
+            A list of document identifiers
+        tenant : Optional[str]
+            Return only records for the given tenant.
+        ontology_id : Optional[str]
+            Return only records for the given ontology ID.
+        batch_size : Optional[int]
+            The number of records added to the local catalog at a time.
+            Default: 1000
+
+        Returns
+        -------
+        list[dict]
+            The list of new records.
+        """
+        if self.storage_mode != 'web' or self.catalog is None:
+            raise ValueError('Syncing records requires web mode and a local '
+                             'storage for the catalog.')
+        query_key = _get_query_key(readers=readers, versions=versions,
+                                   document_ids=document_ids, tenant=tenant,
+                                   ontology_id=ontology_id)
+        watermark = previous_watermark = self.catalog.get_watermark(query_key)
+        timestamp = None
+        if watermark:
+            after = datetime.strptime(watermark, _ts_fmt) - timedelta(seconds=1)
+            timestamp = {'after': after.strftime(_ts_fmt)}
+            logger.info('Syncing records after %s' % timestamp['after'])
+        query_data = _jsonify_query_data(readers, versions, document_ids,
+                                         timestamp)
+        if not query_data:
+            return []
+        new_records = []
+        batch = []
+        for record in self._iter_query_records(query_data):
+            if ontology_id and record.get('output_version') != ontology_id:
+                continue
+            if tenant and tenant not in (record.get('tenants') or []):
+                continue
+            batch.append(record)
+            record_ts = _get_record_timestamp(record)
+            if record_ts and (watermark is None or record_ts > watermark):
+                watermark = record_ts
+            if len(batch) >= batch_size:
+                new_records += self._add_synced_records(batch,
+                                                        previous_watermark)
+                batch = []
+        new_records += self._add_synced_records(batch, previous_watermark)
+        # We only update the watermark once all records have been stored
+        if watermark:
+            self.catalog.set_watermark(query_key, watermark)
+        logger.info('Synced %d records' % len(new_records))
+        return new_records
+
+    def _add_synced_records(self, records, watermark):
+        """Add synced records to the catalog and return the new ones."""
+        new_records = records
+        # Records up to the previous high-water mark may have been returned
+        # by the previous sync already
+        if watermark:
+            overlap_keys = [r['storage_key'] for r in records
+                            if (_get_record_timestamp(r) or '') <= watermark]
+            known_keys = self.catalog.get_known_storage_keys(overlap_keys)
+            new_records = [r for r in records
+                           if r['storage_key'] not in known_keys]
+        self.catalog.add_records(records)
+        return new_records
+
     def get_reader_versions(self, reader):
         """Return the available versions for a given reader."""
         records = self.get_reader_output_records([reader])
@@ -319,9 +599,9 @@ class DartClient:
     def get_ontology(self, ontology_id: str):
         """Return the DART ontology record JSON for the given ontology ID."""
         url = self.dart_url + '/ontologies'
-        res = requests.get(url, params={'id': ontology_id},
-                           auth=(self.dart_uname, self.dart_pwd))
-        return res.json()
+        res = self.get_session().get(
+            url, params={'id': ontology_id}, timeout=self.timeout)
+        return json_codec.loads(res.content)
 
     def get_tenant_ontology(self, tenant_id: str,
                             version: Optional[str] = None):
@@ -331,9 +611,9 @@ class DartClient:
         if version:
             params['version'] = version
         url = self.dart_url + '/ontologies'
-        res = requests.get(url, params=params,
-                           auth=(self.dart_uname, self.dart_pwd))
-        return res.json()
+        res = self.get_session().get(
+            url, params=params, timeout=self.timeout)
+        return json_codec.loads(res.content)
 
     def get_ontology_graph(self, ontology_id: str):
         """Return the ontology graph for the given ontology ID."""
@@ -360,6 +640,68 @@ class DartClient:
 
 
 
+_gzip_magic = b'\x1f\x8b'
+_zstd_magic = b'\x28\xb5\x2f\xfd'
+
+
+def _get_output_key(record):
+    # Reader outputs are stored in local storage by reader, version and
+    # document ID
+    return record['identity'], record['version'], record['document_id']
+
+
+def read_local_output(fname):
+    """Return the content of a reader output file in local storage.
+
+    Files compressed with gzip or zstd are recognized by their header and
+    are decompressed transparently.
+    """
+    with open(fname, 'rb') as fh:
+        content = fh.read()
+    if content.startswith(_gzip_magic):
+        content = gzip.decompress(content)
+    elif content.startswith(_zstd_magic):
+        import zstandard
+        content = zstandard.ZstdDecompressor().decompressobj().decompress(
+            content)
+    return content.decode('utf-8')
+
+
+def write_local_output(fname, content, compression=None):
+    """Write a reader output into local storage, optionally compressed.
+
+    The content is first written into a temporary file which is then
+    renamed so that readers never see a partially written file.
+    """
+    content = content.encode('utf-8')
+    if compression == 'gzip':
+        content = gzip.compress(content)
+    elif compression == 'zstd':
+        import zstandard
+        content = zstandard.ZstdCompressor().compress(content)
+    folder, base = os.path.split(fname)
+    fd, tmp_fname = tempfile.mkstemp(dir=folder, prefix='.%s.' % base,
+                                     suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as fh:
+            fh.write(content)
+        os.replace(tmp_fname, fname)
+    except Exception:
+        os.remove(tmp_fname)
+        raise
+
+
+def _get_query_key(**query):
+    """Return a key identifying a record query for storing its watermark.
+
+    The key doesn't depend on the JSON backend in use or on the order of
+    values in lists, so that it is stable across runs.
+    """
+    return '&'.join('%s=%s' % (key, ','.join(sorted(value))
+                               if isinstance(value, list) else value)
+                    for key, value in sorted(query.items()))
+
+
 def prioritize_records(records, priorities=None):
     """Return unique records per reader and document prioritizing by version.
 
@@ -400,6 +742,20 @@ def prioritize_records(records, priorities=None):
     return prioritized_records
 
 
+_ts_fmt = '%Y-%m-%dT%H:%M:%S'
+
+
+def _get_record_timestamp(record):
+    """Return a record's timestamp in the format used in DART queries."""
+    ts = record.get('timestamp')
+    if not ts:
+        return None
+    try:
+        return datetime.strptime(ts[:19], _ts_fmt).strftime(_ts_fmt)
+    except ValueError:
+        return None
+
+
 def _check_lists(lst):
     if not isinstance(lst, (list, tuple)):
         return False
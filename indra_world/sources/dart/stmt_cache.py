@@ -0,0 +1,196 @@
+"""A persistent cache of raw statements processed from reader outputs."""
+__all__ = ['StatementCache', 'get_processor_version', 'get_content_key']
+
+import os
+import glob
+import zlib
+import pickle
+import sqlite3
+import hashlib
+import logging
+import functools
+import threading
+
+
+logger = logging.getLogger(__name__)
+
+# This is stored along with each entry and needs to be incremented if the
+# way in which statements are serialized changes
+cache_format = 'pickle-zlib-1'
+
+
+# Modules, relative to the indra_world package, that are shared by the
+# processing of all readers' outputs and therefore affect cached statements
+shared_processing_modules = [
+    os.path.join('sources', 'grounding_memo.py'),
+    os.path.join('sources', 'jsonld.py'),
+    os.path.join('sources', 'dart', 'api.py'),
+    'interning.py',
+    'json_codec.py',
+]
+
+
+@functools.lru_cache(maxsize=None)
+def get_processor_version(reader):
+    """Return a version string for the code used to process a reader's output.
+
+    The version is a hash of the source code of the reader's input processor
+    in INDRA World and of the modules shared by all processors (see
+    shared_processing_modules), combined with the version of INDRA itself,
+    so that changes to any of these invalidate the cached statements for
+    the reader.
+    """
+    import indra
+    package_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                  os.pardir, os.pardir)
+    reader_folder = os.path.join(package_folder, 'sources', reader)
+    fnames = sorted(glob.glob(os.path.join(reader_folder, '*.py'))) + \
+        [os.path.join(package_folder, fname)
+         for fname in shared_processing_modules]
+    sha = hashlib.sha256(indra.__version__.encode('utf-8'))
+    for fname in fnames:
+        with open(fname, 'rb') as fh:
+            sha.update(fh.read())
+    return sha.hexdigest()
+
+
+def get_content_key(content):
+    """Return a key for a reader output that isn't identified by a DART
+    storage key, based on its content."""
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    return hashlib.sha256(content).hexdigest()
+
+
+class StatementCache:
+    """A cache of raw statements processed from reader outputs, backed by
+    SQLite.
+
+    Entries are keyed by the storage key of the reader output, the reader,
+    the version of the processor code (see get_processor_version), the
+    grounding mode and the extraction filter used for processing, so
+    entries become stale, and are ignored, when the processing code changes.
+    Statements are stored pickled and compressed.
+
+    Parameters
+    ----------
+    path : str
+        The path to the SQLite file in which the cache is stored.
+    timeout : Optional[float]
+        The number of seconds to wait for a lock held by another process
+        or thread to be released. Default: 60
+    """
+    def __init__(self, path, timeout=60):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        folder = os.path.dirname(os.path.abspath(path))
+        os.makedirs(folder, exist_ok=True)
+        conn = self.get_connection()
+        with conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS statements ('
+                         'storage_key TEXT, reader TEXT, '
+                         'processor_version TEXT, grounding_mode TEXT, '
+                         'extract_filter TEXT, format TEXT, stmts BLOB, '
+                         'PRIMARY KEY (storage_key, reader, '
+                         'processor_version, grounding_mode, '
+                         'extract_filter))')
+
+    def get_connection(self):
+        """Return a connection to the cache for the current thread."""
+        # Connections can't be shared across threads or processes so we
+        # keep one per thread and open a new one in forked processes.
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_local'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    def get_statements(self, storage_key, reader, grounding_mode,
+                       extract_filter):
+        """Return cached statements for a reader output, or None if there
+        is no valid entry.
+
+        Parameters
+        ----------
+        storage_key : str
+            The DART storage key of the reader output (or another key
+            identifying its content, see get_content_key).
+        reader : str
+            The name of the reader.
+        grounding_mode : str
+            The grounding mode used for processing.
+        extract_filter : list[str] or str
+            The types of statements extracted.
+
+        Returns
+        -------
+        list[indra.statements.Statement] or None
+            The list of cached statements if available, otherwise None.
+        """
+        row = self.get_connection().execute(
+            'SELECT format, stmts FROM statements WHERE storage_key = ? '
+            'AND reader = ? AND processor_version = ? '
+            'AND grounding_mode = ? AND extract_filter = ?',
+            (storage_key, reader, get_processor_version(reader),
+             grounding_mode, _get_filter_key(extract_filter))).fetchone()
+        if row is None or row[0] != cache_format:
+            return None
+        try:
+            return pickle.loads(zlib.decompress(row[1]))
+        except Exception as e:
+            logger.warning('Could not load cached statements for %s: %s' %
+                           (storage_key, e))
+            return None
+
+    def add_statements(self, storage_key, reader, grounding_mode,
+                       extract_filter, stmts):
+        """Add statements processed from a reader output to the cache.
+
+        Parameters
+        ----------
+        storage_key : str
+            The DART storage key of the reader output (or another key
+            identifying its content, see get_content_key).
+        reader : str
+            The name of the reader.
+        grounding_mode : str
+            The grounding mode used for processing.
+        extract_filter : list[str] or str
+            The types of statements extracted.
+        stmts : list[indra.statements.Statement]
+            The statements processed from the reader output.
+        """
+        blob = zlib.compress(pickle.dumps(stmts,
+                                          protocol=pickle.HIGHEST_PROTOCOL))
+        conn = self.get_connection()
+        with conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO statements VALUES '
+                '(?, ?, ?, ?, ?, ?, ?)',
+                (storage_key, reader, get_processor_version(reader),
+                 grounding_mode, _get_filter_key(extract_filter),
+                 cache_format, sqlite3.Binary(blob)))
+
+    def __len__(self):
+        conn = self.get_connection()
+        return conn.execute('SELECT COUNT(*) FROM statements').fetchone()[0]
+
+
+def _get_filter_key(extract_filter):
+    if not extract_filter:
+        return ''
+    if isinstance(extract_filter, str):
+        extract_filter = [extract_filter]
+    return ','.join(sorted(extract_filter))
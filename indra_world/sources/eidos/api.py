@@ -1,10 +1,11 @@
 __all__ = ['process_text', 'process_json', 'process_json_str',
            'process_json_file', 'reground_texts']
 
-import json
 import logging
 from indra_world.sources.eidos import client as eidos_client
 from indra.sources.eidos.api import eidos_reader, _run_eidos_on_text
+from indra_world import json_codec
+from indra_world.sources.jsonld import load_jsonld_stream
 from .processor import EidosWorldProcessor, EidosProcessorCompositional
 
 logger = logging.getLogger(__name__)
@@ -61,7 +62,7 @@ def process_text(text, save_json='eidos_output.json',
 
 
 def process_json_file(file_name, grounding_ns=None, extract_filter=None,
-                      grounding_mode=default_grounding_mode):
+                      grounding_mode=default_grounding_mode, streaming=False):
     """Return an EidosProcessor by processing the given Eidos JSON-LD file.
 
     This function is useful if the output from Eidos is saved as a file and
@@ -84,6 +85,13 @@ def process_json_file(file_name, grounding_ns=None, extract_filter=None,
     grounding_mode : Optional[str]
         Selects whether 'flat' or 'compositional' groundings should be
         extracted. Default: 'flat'.
+    streaming : Optional[bool]
+        If True, the JSON-LD is parsed incrementally (if the ijson package
+        is available) building only the documents and extractions needed
+        for processing, and the parsed JSON-LD is released after processing.
+        This is useful for very large outputs since, unlike when the
+        file's content is processed as a string, the content is never held
+        in memory in full. Default: False
 
     Returns
     -------
@@ -93,6 +101,10 @@ def process_json_file(file_name, grounding_ns=None, extract_filter=None,
     """
     try:
         with open(file_name, 'rb') as fh:
+            if streaming:
+                return _process_json_stream(fh, grounding_ns=grounding_ns,
+                                            extract_filter=extract_filter,
+                                            grounding_mode=grounding_mode)
             json_str = fh.read().decode('utf-8')
             return process_json_str(json_str, grounding_ns=grounding_ns,
                                     extract_filter=extract_filter,
@@ -129,12 +141,23 @@ def process_json_str(json_str, grounding_ns=None, extract_filter=None,
         A EidosProcessor containing the extracted INDRA Statements
         in its statements attribute.
     """
-    json_dict = json.loads(json_str)
+    json_dict = json_codec.loads(json_str)
     return process_json(json_dict, grounding_ns=grounding_ns,
                         extract_filter=extract_filter,
                         grounding_mode=grounding_mode)
 
 
+def _process_json_stream(fh, grounding_ns=None, extract_filter=None,
+                         grounding_mode=default_grounding_mode):
+    json_dict = load_jsonld_stream(fh)
+    ep = process_json(json_dict, grounding_ns=grounding_ns,
+                      extract_filter=extract_filter,
+                      grounding_mode=grounding_mode)
+    # The parsed JSON-LD isn't needed after processing so we release it
+    ep.doc.tree = None
+    return ep
+
+
 def process_json(json_dict, grounding_ns=None, extract_filter=None,
                  grounding_mode=None):
     """Return an EidosProcessor by processing a Eidos JSON-LD dict.
@@ -1,17 +1,26 @@
 import os
-import math
+import json
+import time
 import tqdm
+import yaml
 import pickle
 import logging
 import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
 from indra.util import batch_iter
+from indra_world.ontology.ontology import get_ontology_nodes, \
+    get_ontology_changes
+from .grounding_cache import get_ontology_hash
 
 
 logger = logging.getLogger(__name__)
 
 
 def reground_texts(texts, ont_yml, webservice, topk=10, is_canonicalized=False,
-                   filter=True, cache_path=None):
+                   filter=True, cache_path=None, persistent_cache=None,
+                   batch_size=500, max_workers=1, max_retries=3,
+                   backoff_factor=1.0, timeout=600, previous_ont_yml=None):
     """Ground concept texts given an ontology with an Eidos web service.
 
     Parameters
@@ -33,6 +42,32 @@ def reground_texts(texts, ont_yml, webservice, topk=10, is_canonicalized=False,
         If True, Eidos filters the ontology to remove determiners from examples
         and other similar operations. Should typically be set to True.
         Default: True
+    cache_path : Optional[str]
+        The path to a pickle file in which groundings for texts are cached
+        across calls. Default: None
+    persistent_cache : Optional[indra_world.sources.eidos.grounding_cache.GroundingCache]
+        A persistent grounding cache which is looked up before sending
+        texts to Eidos and which is updated with any new groundings.
+        Default: None
+    batch_size : Optional[int]
+        The number of texts sent to Eidos in a single request. Default: 500
+    max_workers : Optional[int]
+        The number of requests sent to Eidos concurrently. Default: 1
+    max_retries : Optional[int]
+        The number of times a failed request is retried. Default: 3
+    backoff_factor : Optional[float]
+        The number of seconds to wait before the first retry of a failed
+        request, doubled for each subsequent retry. Default: 1.0
+    timeout : Optional[float]
+        The number of seconds to wait for a response to a request before
+        it is considered failed and retried. Default: 600
+    previous_ont_yml : Optional[str]
+        A serialized YAML string representing a previous version of the
+        ontology. If given along with a persistent_cache, texts whose cached
+        groundings with respect to the previous ontology are not affected
+        by the changes in the new ontology (see get_unaffected_groundings)
+        keep their cached groundings instead of being regrounded.
+        Default: None
 
     Returns
     -------
@@ -47,32 +82,306 @@ def reground_texts(texts, ont_yml, webservice, topk=10, is_canonicalized=False,
                 grounding_cache = pickle.load(fh)
                 logger.info('Loaded %d groundings from cache' %
                             len(grounding_cache))
+    if persistent_cache is not None:
+        ont_hash = get_ontology_hash(ont_yml)
+        grounding_cache.update(
+            persistent_cache.get_groundings(
+                ont_hash, set(texts) - set(grounding_cache.keys()),
+                topk=topk, is_canonicalized=is_canonicalized, filter=filter))
+        if previous_ont_yml:
+            unchanged_groundings = \
+                get_unaffected_groundings(
+                    set(texts) - set(grounding_cache.keys()),
+                    previous_ont_yml, ont_yml, persistent_cache, topk=topk,
+                    is_canonicalized=is_canonicalized, filter=filter,
+                    webservice=webservice, batch_size=batch_size,
+                    max_workers=max_workers, max_retries=max_retries,
+                    backoff_factor=backoff_factor, timeout=timeout)
+            grounding_cache.update(unchanged_groundings)
+            persistent_cache.add_groundings(
+                ont_hash, unchanged_groundings, topk=topk,
+                is_canonicalized=is_canonicalized, filter=filter)
     texts_to_ground = list(set(texts) - set(grounding_cache.keys()))
     logger.info('Grounding a total of %d texts' % len(texts_to_ground))
-    for text_batch in tqdm.tqdm(batch_iter(texts_to_ground, batch_size=500,
-                                           return_func=list),
-                                total=math.ceil(len(texts_to_ground)/500)):
-        params = {
+    with RegroundClient(webservice, ont_yml, topk=topk,
+                        is_canonicalized=is_canonicalized, filter=filter,
+                        max_workers=max_workers, max_retries=max_retries,
+                        backoff_factor=backoff_factor,
+                        timeout=timeout) as client:
+        new_groundings = client.reground(texts_to_ground,
+                                         batch_size=batch_size)
+    grounding_cache.update(new_groundings)
+    if persistent_cache is not None:
+        persistent_cache.add_groundings(ont_hash, new_groundings, topk=topk,
+                                        is_canonicalized=is_canonicalized,
+                                        filter=filter)
+
+    all_results = [grounding_cache[txt] for txt in texts]
+    if cache_path:
+        with open(cache_path, 'wb') as fh:
+            pickle.dump(grounding_cache, fh)
+    return all_results
+
+
+def get_unaffected_groundings(texts, previous_ont_yml, ont_yml,
+                              persistent_cache, topk=10,
+                              is_canonicalized=False, filter=True,
+                              webservice=None, batch_size=500, **kwargs):
+    """Return cached groundings with respect to a previous ontology for texts
+    that are not affected by the changes in a new ontology.
+
+    Eidos grounds texts by the embedding similarity of texts to the name and
+    examples of each node, independently for each node, so a node that was
+    added or whose name or examples changed may now score higher for any
+    text, whether or not it shares words with the node. A text's cached
+    groundings are therefore reused only if none of its top groundings is a
+    node that was removed or changed, and if none of the added or changed
+    nodes scores at least as high for the text as its lowest scoring top
+    grounding. To determine the latter, the cached texts are grounded with
+    Eidos against an ontology consisting of only the added and changed
+    nodes, which is much smaller than the full ontology.
+
+    Parameters
+    ----------
+    texts : set[str]
+        A set of concept texts to look up.
+    previous_ont_yml : str
+        A serialized YAML string representing the previous ontology.
+    ont_yml : str
+        A serialized YAML string representing the new ontology.
+    persistent_cache : indra_world.sources.eidos.grounding_cache.GroundingCache
+        A persistent grounding cache which contains groundings with respect
+        to the previous ontology.
+    topk : Optional[int]
+        The number of top scoring groundings requested. Default: 10
+    is_canonicalized : Optional[bool]
+        Whether the texts are canonicalized. Default: False
+    filter : Optional[bool]
+        Whether the ontology is filtered for regrounding. Default: True
+    webservice : Optional[str]
+        The address where the Eidos web service is running, used to score
+        added and changed nodes. If not given and nodes were added or
+        changed, all texts are considered affected. Default: None
+    batch_size : Optional[int]
+        The number of texts sent to Eidos in a single request. Default: 500
+    **kwargs :
+        Other keyword arguments passed to RegroundClient.
+
+    Returns
+    -------
+    dict
+        A dict of cached groundings keyed by text for texts not affected
+        by ontology changes.
+    """
+    previous_groundings = persistent_cache.get_groundings(
+        get_ontology_hash(previous_ont_yml), texts, topk=topk,
+        is_canonicalized=is_canonicalized, filter=filter)
+    if not previous_groundings:
+        return {}
+    try:
+        new_yml = yaml.load(ont_yml, Loader=yaml.FullLoader)
+        changed_nodes, _ = get_ontology_changes(
+            yaml.load(previous_ont_yml, Loader=yaml.FullLoader), new_yml)
+        nodes = get_ontology_nodes(new_yml)
+    except ValueError as e:
+        logger.warning('Could not compare ontologies, all texts will be '
+                       'regrounded: %s' % e)
+        return {}
+    # Nodes that are new or changed in the new ontology
+    scored_nodes = {path for path in changed_nodes if path in nodes}
+    logger.info('Found %d removed and %d added or changed ontology nodes' %
+                (len(changed_nodes) - len(scored_nodes), len(scored_nodes)))
+    affected_texts = get_texts_affected_by_changes(previous_groundings,
+                                                   changed_nodes)
+    candidates = [txt for txt in previous_groundings
+                  if txt not in affected_texts]
+    if scored_nodes and candidates:
+        if not webservice:
+            logger.info('Ontology nodes were added or changed but no Eidos '
+                        'service was given to score them, all texts will '
+                        'be regrounded')
+            return {}
+        partial_ont_yml = yaml.dump(get_partial_ontology(nodes,
+                                                         scored_nodes))
+        with RegroundClient(webservice, partial_ont_yml,
+                            topk=len(scored_nodes),
+                            is_canonicalized=is_canonicalized,
+                            filter=filter, **kwargs) as client:
+            node_scores = client.reground(candidates, batch_size=batch_size)
+        for txt in candidates:
+            grounding = previous_groundings[txt]
+            # If there are fewer than topk groundings, any other node
+            # would be added to them
+            min_score = grounding[-1][1] \
+                if grounding and len(grounding) >= topk else None
+            if any(node in scored_nodes and
+                   (min_score is None or score >= min_score)
+                   for node, score in node_scores[txt]):
+                affected_texts.add(txt)
+    logger.info('%d of %d texts with cached groundings are affected by '
+                'ontology changes' % (len(affected_texts),
+                                      len(previous_groundings)))
+    return {txt: grounding for txt, grounding in previous_groundings.items()
+            if txt not in affected_texts}
+
+
+def get_texts_affected_by_changes(groundings, changed_nodes):
+    """Return the texts whose top groundings include changed nodes.
+
+    A text is affected if any of its top groundings is a node that was
+    removed from the ontology, since another node then enters its top
+    groundings, or a node whose name or examples changed, since its
+    score may have changed.
+
+    Parameters
+    ----------
+    groundings : dict[str, list]
+        Groundings with respect to the previous ontology keyed by text.
+    changed_nodes : set[str]
+        Ontology nodes that were removed or changed.
+
+    Returns
+    -------
+    set[str]
+        The set of affected texts.
+    """
+    return {txt for txt, grounding in groundings.items()
+            if any(node in changed_nodes for node, _ in grounding)}
+
+
+def get_partial_ontology(nodes, paths):
+    """Return an ontology YAML with only the given nodes and their ancestors.
+
+    Ancestors that are not among the given nodes only retain their names.
+
+    Parameters
+    ----------
+    nodes : dict
+        The attributes of the nodes of an ontology keyed by path, as
+        returned by get_ontology_nodes.
+    paths : set[str]
+        The paths of the nodes to include.
+
+    Returns
+    -------
+    list
+        The partial ontology YAML to be serialized with the yaml package.
+    """
+    yml = []
+    entries = {}
+    for path in sorted(paths):
+        parts = path.split('/')
+        children = yml
+        for idx in range(1, len(parts) + 1):
+            prefix = '/'.join(parts[:idx])
+            if prefix not in entries:
+                entries[prefix] = {'name': parts[idx - 1]}
+                children.append({'node': entries[prefix]})
+            node = entries[prefix]
+            if prefix == path:
+                node.update(nodes[path])
+            else:
+                children = node.setdefault('children', [])
+    return yml
+
+
+class RegroundClient:
+    """A client sending concurrent batch requests to the Eidos reground
+    service over a persistent, pooled session.
+
+    Eidos' reground endpoint doesn't allow registering an ontology, so the
+    ontology is sent with every request. The client can be used as a context
+    manager which closes its session on exit.
+
+    Parameters
+    ----------
+    webservice : str
+        The address where the Eidos web service is running, e.g.,
+        http://localhost:9000.
+    ont_yml : str
+        A serialized YAML string representing the ontology.
+    topk : Optional[int]
+        The number of top scoring groundings to return. Default: 10
+    is_canonicalized : Optional[bool]
+        If True, the texts are assumed to be canonicalized. Default: False
+    filter : Optional[bool]
+        If True, Eidos filters the ontology to remove determiners from examples
+        and other similar operations. Default: True
+    max_workers : Optional[int]
+        The number of requests sent to Eidos concurrently. Default: 1
+    max_retries : Optional[int]
+        The number of times a failed request is retried. Default: 3
+    backoff_factor : Optional[float]
+        The number of seconds to wait before the first retry of a failed
+        request, doubled for each subsequent retry. Default: 1.0
+    timeout : Optional[float]
+        The number of seconds to wait for a response to a request before
+        it is considered failed and retried. Default: 600
+    """
+    def __init__(self, webservice, ont_yml, topk=10, is_canonicalized=False,
+                 filter=True, max_workers=1, max_retries=3,
+                 backoff_factor=1.0, timeout=600):
+        self.url = '%s/reground' % webservice
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.timeout = timeout
+        self.params = {
             'ontologyYaml': ont_yml,
-            'texts': text_batch,
             'topk': topk,
             'isAlreadyCanonicalized': is_canonicalized,
             'filter': filter
         }
-        res = requests.post('%s/reground' % webservice,
-                            json=params)
-        res.raise_for_status()
-        grounding_for_texts = grounding_dict_to_list(res.json())
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
 
-        for txt, grounding in zip(text_batch,
-                                  grounding_for_texts):
-            grounding_cache[txt] = grounding
+    def close(self):
+        """Close the client's session and its pooled connections."""
+        self.session.close()
 
-    all_results = [grounding_cache[txt] for txt in texts]
-    if cache_path:
-        with open(cache_path, 'wb') as fh:
-            pickle.dump(grounding_cache, fh)
-    return all_results
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def reground(self, texts, batch_size=500):
+        """Return a dict of groundings for a list of texts keyed by text."""
+        batches = list(batch_iter(texts, batch_size=batch_size,
+                                  return_func=list))
+        groundings = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for text_batch, grounding_for_texts in \
+                    tqdm.tqdm(zip(batches, executor.map(self.reground_batch,
+                                                        batches)),
+                              total=len(batches)):
+                groundings.update(zip(text_batch, grounding_for_texts))
+        return groundings
+
+    def reground_batch(self, text_batch):
+        """Return groundings for a single batch of texts, with retries."""
+        body = json.dumps(dict(self.params, texts=text_batch))
+        for attempt in range(self.max_retries + 1):
+            try:
+                res = self.session.post(
+                    self.url, data=body.encode('utf-8'),
+                    headers={'Content-Type': 'application/json'},
+                    timeout=self.timeout)
+                # We only retry on server-side errors
+                if res.status_code < 500 or attempt == self.max_retries:
+                    res.raise_for_status()
+                    return grounding_dict_to_list(res.json())
+                error = 'status code %d' % res.status_code
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.max_retries:
+                    raise
+                error = str(e)
+            wait = self.backoff_factor * (2 ** attempt)
+            logger.warning('Reground request failed with %s, retrying in '
+                           '%.1f seconds' % (error, wait))
+            time.sleep(wait)
 
 
 def grounding_dict_to_list(groundings):
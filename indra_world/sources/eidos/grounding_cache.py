@@ -0,0 +1,200 @@
+"""A persistent cache of concept text groundings obtained from Eidos."""
+__all__ = ['GroundingCache', 'get_ontology_hash']
+
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from indra.util import batch_iter
+from indra_world import json_codec
+
+
+logger = logging.getLogger(__name__)
+
+
+def get_ontology_hash(ont_yml):
+    """Return a hash of the content of a serialized YAML ontology."""
+    return hashlib.sha256(ont_yml.encode('utf-8')).hexdigest()
+
+
+class GroundingCache:
+    """A persistent cache of regrounding results backed by SQLite.
+
+    Entries are keyed by the hash of the ontology content, the concept text,
+    and the parameters of the regrounding request. The cache can be shared
+    by multiple concurrent threads and processes, and once it grows beyond a
+    given number of entries, the least recently used entries are evicted.
+    Each process counts the entries it adds to decide when to evict, so with
+    multiple concurrent writers the limit is enforced approximately.
+
+    Parameters
+    ----------
+    path : str
+        The path to the SQLite file in which the cache is stored.
+    max_entries : Optional[int]
+        The maximum number of entries to keep in the cache. If None, entries
+        are never evicted. Default: 1000000
+    timeout : Optional[float]
+        The number of seconds to wait for a lock held by another process
+        or thread to be released. Default: 60
+    """
+    def __init__(self, path, max_entries=1000000, timeout=60):
+        self.path = path
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._local = threading.local()
+        # The number of entries as far as this process knows, used to
+        # decide when to evict, which is refreshed from the DB on eviction
+        self._num_entries = None
+        folder = os.path.dirname(os.path.abspath(path))
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+        conn = self.get_connection()
+        with conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS groundings ('
+                         'ont_hash TEXT, text TEXT, topk INTEGER, '
+                         'is_canonicalized INTEGER, filter INTEGER, '
+                         'grounding TEXT, last_used REAL, '
+                         'PRIMARY KEY (ont_hash, text, topk, '
+                         'is_canonicalized, filter))')
+            conn.execute('CREATE INDEX IF NOT EXISTS last_used_idx ON '
+                         'groundings (last_used)')
+
+    def get_connection(self):
+        """Return a connection to the cache for the current thread."""
+        # Connections can't be shared across threads or processes so we
+        # keep one per thread and open a new one in forked processes.
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_local'] = None
+        state['_num_entries'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    def get_groundings(self, ont_hash, texts, topk=10, is_canonicalized=False,
+                       filter=True):
+        """Return cached groundings for a list of texts.
+
+        Parameters
+        ----------
+        ont_hash : str
+            The hash of the ontology content, see get_ontology_hash.
+        texts : list[str]
+            A list of concept texts to look up.
+        topk : Optional[int]
+            The number of top scoring groundings requested. Default: 10
+        is_canonicalized : Optional[bool]
+            Whether the texts were regrounded as canonicalized.
+            Default: False
+        filter : Optional[bool]
+            Whether the ontology was filtered for regrounding. Default: True
+
+        Returns
+        -------
+        dict
+            A dict keyed by those texts which were found in the cache,
+            with their groundings as values.
+        """
+        conn = self.get_connection()
+        groundings = {}
+        for text_batch in batch_iter(set(texts), batch_size=500,
+                                     return_func=list):
+            placeholders = ','.join('?' * len(text_batch))
+            rows = conn.execute(
+                'SELECT text, grounding FROM groundings WHERE ont_hash = ? '
+                'AND topk = ? AND is_canonicalized = ? AND filter = ? '
+                'AND text IN (%s)' % placeholders,
+                [ont_hash, topk, int(is_canonicalized), int(filter)] +
+                text_batch).fetchall()
+            for text, grounding in rows:
+                groundings[text] = [tuple(entry)
+                                    for entry in json_codec.loads(grounding)]
+        if groundings:
+            now = time.time()
+            with conn:
+                conn.executemany(
+                    'UPDATE groundings SET last_used = ? WHERE ont_hash = ? '
+                    'AND text = ? AND topk = ? AND is_canonicalized = ? '
+                    'AND filter = ?',
+                    [(now, ont_hash, text, topk, int(is_canonicalized),
+                      int(filter)) for text in groundings])
+        logger.info('Found %d of %d texts in grounding cache' %
+                    (len(groundings), len(set(texts))))
+        return groundings
+
+    def add_groundings(self, ont_hash, groundings, topk=10,
+                       is_canonicalized=False, filter=True):
+        """Add groundings for a set of texts to the cache.
+
+        Parameters
+        ----------
+        ont_hash : str
+            The hash of the ontology content, see get_ontology_hash.
+        groundings : dict
+            A dict keyed by concept text with groundings as values.
+        topk : Optional[int]
+            The number of top scoring groundings requested. Default: 10
+        is_canonicalized : Optional[bool]
+            Whether the texts were regrounded as canonicalized.
+            Default: False
+        filter : Optional[bool]
+            Whether the ontology was filtered for regrounding. Default: True
+        """
+        if not groundings:
+            return
+        conn = self.get_connection()
+        now = time.time()
+        with conn:
+            changes = conn.total_changes
+            conn.executemany(
+                'INSERT OR REPLACE INTO groundings VALUES (?, ?, ?, ?, ?, ?, ?)',
+                [(ont_hash, text, topk, int(is_canonicalized), int(filter),
+                  json_codec.dumps(grounding), now)
+                 for text, grounding in groundings.items()])
+            num_added = conn.total_changes - changes
+        if self.max_entries is None:
+            return
+        # We only count the entries in the DB when this process first adds
+        # to the cache, and then only evict once our own inserts may have
+        # pushed the number of entries beyond the limit
+        if self._num_entries is None:
+            self._num_entries = len(self)
+        else:
+            self._num_entries += num_added
+        if self._num_entries > self.max_entries:
+            self.evict()
+
+    def evict(self):
+        """Remove the least recently used entries beyond the size limit."""
+        if self.max_entries is None:
+            return
+        conn = self.get_connection()
+        with conn:
+            num_entries = conn.execute(
+                'SELECT COUNT(*) FROM groundings').fetchone()[0]
+            num_to_evict = num_entries - self.max_entries
+            if num_to_evict > 0:
+                logger.info('Evicting %d entries from grounding cache' %
+                            num_to_evict)
+                conn.execute('DELETE FROM groundings WHERE rowid IN '
+                             '(SELECT rowid FROM groundings '
+                             'ORDER BY last_used LIMIT ?)', (num_to_evict,))
+                num_entries = self.max_entries
+        self._num_entries = num_entries
+
+    def __len__(self):
+        conn = self.get_connection()
+        return conn.execute('SELECT COUNT(*) FROM groundings').fetchone()[0]
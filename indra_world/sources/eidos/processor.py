@@ -3,6 +3,7 @@ import datetime
 from indra.statements import Event, QualitativeDelta, WorldContext, \
     TimeContext, RefContext
 from indra.sources.eidos.processor import EidosProcessor, EidosDocument
+from indra_world.sources.grounding_memo import get_grounding_memo, freeze
 
 
 logger = logging.getLogger(__name__)
@@ -160,66 +161,6 @@ class EidosWorldDocument(EidosDocument):
 class EidosProcessorCompositional(EidosWorldProcessor):
     def get_groundings(self, entity):
         """Return groundings as db_refs for an entity."""
-        def get_grounding_entries_comp(grounding):
-            if not grounding:
-                return None
-
-            entry_types = ['theme', 'themeProperties', 'themeProcess',
-                           'themeProcessProperties']
-            entries = []
-            values = grounding.get('values', [])
-            # Values could still have been a None entry here
-            if values:
-                for entry in values:
-                    compositional_entry = [None, None, None, None]
-                    for idx, entry_type in enumerate(entry_types):
-                        val = entry.get(entry_type)
-                        if val is None:
-                            continue
-                        # FIXME: can there be multiple entries here?
-                        val = val[0]
-                        ont_concept = val.get('ontologyConcept')
-                        score = val.get('value')
-                        if ont_concept is None or score is None:
-                            continue
-                        if ont_concept.endswith('/'):
-                            ont_concept = ont_concept[:-1]
-                        compositional_entry[idx] = \
-                            (ont_concept, score)
-                    # Some special cases
-                    # Promote process into theme
-                    if compositional_entry[2] and not compositional_entry[0]:
-                        compositional_entry[0] = compositional_entry[2]
-                        compositional_entry[2] = None
-                        if compositional_entry[3]:
-                            compositional_entry[1] = compositional_entry[3]
-                            compositional_entry[3] = None
-                    # Promote dangling property
-                    if compositional_entry[1] and not compositional_entry[0]:
-                        compositional_entry[0] = compositional_entry[1]
-                        compositional_entry[1] = None
-                    # Promote theme process property into theme property
-                    if compositional_entry[3] and compositional_entry[0] and \
-                            not compositional_entry[2] \
-                            and not compositional_entry[1]:
-                        compositional_entry[1] = compositional_entry[3]
-                        compositional_entry[3] = None
-                    # If there is only a theme process property and nothing
-                    # else, we promote it to be the theme
-                    if compositional_entry[3] and not any(
-                            compositional_entry[:-1]):
-                        compositional_entry[0] = compositional_entry[3]
-                        compositional_entry[3] = None
-                    # Remove dangling theme process property if theme
-                    # and property are available but there is no process
-                    if compositional_entry[0] and compositional_entry[1] and \
-                            not compositional_entry[2] \
-                            and compositional_entry[3]:
-                        compositional_entry[3] = None
-                    if any(compositional_entry):
-                        entries.append(compositional_entry)
-            return entries
-
         # Save raw text and Eidos scored groundings as db_refs
         db_refs = {'TEXT': entity['text']}
         groundings = entity.get('groundings')
@@ -228,14 +169,80 @@ class EidosProcessorCompositional(EidosWorldProcessor):
         for g in groundings:
             key = g['name'].upper()
             if key == 'WM_COMPOSITIONAL':
-                entries = get_grounding_entries_comp(g)
+                # The same groundings recur frequently so we normalize each
+                # distinct one only once and share the resulting tuples
+                entries = get_grounding_memo().get(
+                    ('eidos_compositional', freeze(g)),
+                    _get_compositional_entries, g)
                 if entries:
-                    db_refs['WM'] = entries
+                    db_refs['WM'] = [list(entry) for entry in entries]
             else:
                 continue
         return db_refs
 
 
+def _get_compositional_entries(grounding):
+    """Return normalized compositional entries for an Eidos grounding."""
+    if not grounding:
+        return ()
+
+    entry_types = ['theme', 'themeProperties', 'themeProcess',
+                   'themeProcessProperties']
+    entries = []
+    values = grounding.get('values', [])
+    # Values could still have been a None entry here
+    if values:
+        for entry in values:
+            compositional_entry = [None, None, None, None]
+            for idx, entry_type in enumerate(entry_types):
+                val = entry.get(entry_type)
+                if val is None:
+                    continue
+                # FIXME: can there be multiple entries here?
+                val = val[0]
+                ont_concept = val.get('ontologyConcept')
+                score = val.get('value')
+                if ont_concept is None or score is None:
+                    continue
+                if ont_concept.endswith('/'):
+                    ont_concept = ont_concept[:-1]
+                compositional_entry[idx] = \
+                    (ont_concept, score)
+            # Some special cases
+            # Promote process into theme
+            if compositional_entry[2] and not compositional_entry[0]:
+                compositional_entry[0] = compositional_entry[2]
+                compositional_entry[2] = None
+                if compositional_entry[3]:
+                    compositional_entry[1] = compositional_entry[3]
+                    compositional_entry[3] = None
+            # Promote dangling property
+            if compositional_entry[1] and not compositional_entry[0]:
+                compositional_entry[0] = compositional_entry[1]
+                compositional_entry[1] = None
+            # Promote theme process property into theme property
+            if compositional_entry[3] and compositional_entry[0] and \
+                    not compositional_entry[2] \
+                    and not compositional_entry[1]:
+                compositional_entry[1] = compositional_entry[3]
+                compositional_entry[3] = None
+            # If there is only a theme process property and nothing
+            # else, we promote it to be the theme
+            if compositional_entry[3] and not any(
+                    compositional_entry[:-1]):
+                compositional_entry[0] = compositional_entry[3]
+                compositional_entry[3] = None
+            # Remove dangling theme process property if theme
+            # and property are available but there is no process
+            if compositional_entry[0] and compositional_entry[1] and \
+                    not compositional_entry[2] \
+                    and compositional_entry[3]:
+                compositional_entry[3] = None
+            if any(compositional_entry):
+                entries.append(tuple(compositional_entry))
+    return tuple(entries)
+
+
 def _get_time_stamp(entry):
     """Return datetime object from a timex constraint start/end entry.
 
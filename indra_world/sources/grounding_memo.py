@@ -0,0 +1,119 @@
+"""A shared, bounded memo of normalized groundings for reader processors.
+
+The same grounding payloads recur many times within and across reader
+outputs and normalizing them into (compositional) grounding entries is
+repeated for each occurrence. Processors can use the memo to normalize each
+distinct payload only once and to share the resulting grounding tuples among
+all the concepts grounded to them.
+
+Since memoized values are shared, they are immutable (tuples) and it is the
+responsibility of callers to make mutable copies of any containers they
+put into the db_refs of concepts. The maximum number of memoized entries can
+be set with the INDRA_WORLD_GROUNDING_MEMO_SIZE configuration value.
+
+This is unrelated to the persistent regrounding cache in
+indra_world.sources.eidos.grounding_cache.
+"""
+__all__ = ['GroundingMemo', 'get_grounding_memo', 'freeze']
+
+import logging
+import threading
+from collections import OrderedDict
+from indra.config import get_config
+
+
+logger = logging.getLogger(__name__)
+
+default_maxsize = 100000
+
+
+class GroundingMemo:
+    """A thread-safe least-recently-used memo of normalized groundings.
+
+    Parameters
+    ----------
+    maxsize : Optional[int]
+        The maximum number of entries to keep in the memo after which the
+        least recently used entries are discarded. Default: 100000
+
+    Attributes
+    ----------
+    hits : int
+        The number of lookups that were served from the memo.
+    misses : int
+        The number of lookups for which the value had to be computed.
+    """
+    def __init__(self, maxsize=default_maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, fun, *args):
+        """Return the cached value for a key, computing it if necessary.
+
+        Parameters
+        ----------
+        key : collections.abc.Hashable
+            The key identifying the raw grounding payload, typically
+            namespaced by the processor and constructed with `freeze`.
+        fun : Callable
+            A function which returns the (immutable) normalized grounding
+            if it is not yet in the memo.
+        *args :
+            Positional arguments with which `fun` is called.
+
+        Returns
+        -------
+        :
+            The normalized grounding.
+        """
+        with self._lock:
+            try:
+                value = self._cache[key]
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return value
+            except KeyError:
+                self.misses += 1
+        value = fun(*args)
+        with self._lock:
+            # If another thread added the value in the meantime, we use
+            # that one so that the same object is shared
+            value = self._cache.setdefault(key, value)
+            if len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+        return value
+
+    def clear(self):
+        """Remove all entries from the memo."""
+        with self._lock:
+            self._cache.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._cache)
+
+
+_grounding_memo = None
+
+
+def get_grounding_memo():
+    """Return the grounding memo shared by processors in this process."""
+    global _grounding_memo
+    if _grounding_memo is None:
+        maxsize = get_config('INDRA_WORLD_GROUNDING_MEMO_SIZE')
+        _grounding_memo = GroundingMemo(int(maxsize) if maxsize
+                                        else default_maxsize)
+    return _grounding_memo
+
+
+def freeze(obj):
+    """Return a hashable version of a JSON-like object to use as a key."""
+    if isinstance(obj, dict):
+        return tuple(sorted((k, freeze(v)) for k, v in obj.items()))
+    elif isinstance(obj, (list, tuple)):
+        return tuple(freeze(v) for v in obj)
+    return obj
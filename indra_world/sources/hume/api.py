@@ -1,7 +1,8 @@
 __all__ = ['process_jsonld_file', 'process_jsonld']
 
-import json
 import logging
+from indra_world import json_codec
+from indra_world.sources.jsonld import load_jsonld_stream
 from . import processor
 
 logger = logging.getLogger(__name__)
@@ -10,7 +11,8 @@ default_grounding_mode = 'compositional'
 
 
 def process_jsonld_file(fname, extract_filter=None,
-                        grounding_mode=default_grounding_mode):
+                        grounding_mode=default_grounding_mode,
+                        streaming=False):
     """Process a JSON-LD file in the new format to extract Statements.
 
     Parameters
@@ -25,6 +27,11 @@ def process_jsonld_file(fname, extract_filter=None,
     grounding_mode : Optional[str]
         Selects whether 'flat' or 'compositional' groundings should be
         extracted. Default: 'flat'.
+    streaming : Optional[bool]
+        If True, the JSON-LD is parsed incrementally (if the ijson package
+        is available) building only the documents and extractions needed
+        for processing. This is useful for very large outputs.
+        Default: False
 
     Returns
     -------
@@ -32,8 +39,12 @@ def process_jsonld_file(fname, extract_filter=None,
         A HumeProcessor instance, which contains a list of INDRA Statements
         as its statements attribute.
     """
-    with open(fname, 'r', encoding='utf-8') as fh:
-        json_dict = json.load(fh)
+    if streaming:
+        with open(fname, 'rb') as fh:
+            json_dict = load_jsonld_stream(fh)
+    else:
+        with open(fname, 'r', encoding='utf-8') as fh:
+            json_dict = json_codec.load(fh)
     return process_jsonld(json_dict, extract_filter=extract_filter,
                           grounding_mode=grounding_mode)
 
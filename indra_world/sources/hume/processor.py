@@ -1,6 +1,5 @@
 import os
 import logging
-import objectpath
 from datetime import datetime, timedelta
 
 
@@ -28,28 +27,39 @@ class HumeJsonLdProcessor(object):
 
     Attributes
     ----------
-    tree : objectpath.Tree
-        The objectpath Tree object representing the extractions.
+    extractions_by_id : dict
+        A dict of extractions keyed by their IDs.
+    document_dict : dict
+        A dict keyed by document ID whose values contain the document's
+        sentence texts keyed by sentence ID, and its location.
     statements : list[indra.statements.Statement]
         A list of INDRA Statements that were extracted by the processor.
     """
     def __init__(self, json_dict):
-        self.tree = objectpath.Tree(json_dict)
         self.statements = []
         self.document_dict = {}
         self.concept_dict = {}
         self.relation_dict = {}
         self.eid_stmt_dict = {}
         self.extractions_by_id = {}
-        self._get_documents()
-        self.relation_subj_obj_ids = []
-        self._get_extractions_by_id()
+        self.relation_subj_obj_ids = set()
+        self.relations = []
+        self._index_jsonld(json_dict)
 
-    def _get_extractions_by_id(self):
-        self.extractions_by_id = {
-            extr['@id']: extr for extr in
-            self.tree.execute("$.extractions[(@.@type is 'Extraction')]")
-            if '@id' in extr}
+    def _index_jsonld(self, json_dict):
+        """Index the extractions and documents of the JSON-LD.
+
+        The JSON-LD is traversed once, and the extractions are then
+        classified into relations and concepts using the index.
+        """
+        for extr in json_dict.get('extractions', []):
+            if extr.get('@type') == 'Extraction' and '@id' in extr:
+                self.extractions_by_id[extr['@id']] = extr
+        for doc in json_dict.get('documents', []):
+            sentences = {s['@id']: s['text'] for s in doc.get('sentences', [])}
+            self.document_dict[doc['@id']] = {'sentences': sentences,
+                                              'location': doc.get('location')}
+        self.relations = self._index_relations()
 
     def extract_relations(self):
         relations = self._find_relations()
@@ -86,11 +96,6 @@ class HumeJsonLdProcessor(object):
 
     def _find_events(self):
         """Find standalone events and return them in a list."""
-        # First populate self.concept_dict and self.relations_subj_obj_ids
-        if not self.relation_dict or not self.concept_dict or \
-                not self.relation_subj_obj_ids:
-            self._find_relations()
-
         # Check if events are part of relations
         events = []
         for e in self.concept_dict.values():
@@ -107,7 +112,11 @@ class HumeJsonLdProcessor(object):
         return events
 
     def _find_relations(self):
-        """Find all relevant relation elements and return them in a list."""
+        """Return all relevant relation elements in a list."""
+        return self.relations
+
+    def _index_relations(self):
+        """Index relations and concepts and return relevant relations."""
         # Get relations from extractions
         relations = []
         for eid, e in self.extractions_by_id.items():
@@ -123,7 +132,7 @@ class HumeJsonLdProcessor(object):
                         for a in e['arguments']:
                             if a['type'] == 'source' or \
                                     a['type'] == 'destination':
-                                self.relation_subj_obj_ids.append(
+                                self.relation_subj_obj_ids.add(
                                     a['value']['@id'])
             # If this is an Event or an Entity
             if {'Event', 'Entity'} & label_set:
@@ -138,14 +147,6 @@ class HumeJsonLdProcessor(object):
             logger.debug('%d concepts found.' % len(self.concept_dict))
         return relations
 
-    def _get_documents(self):
-        """Populate sentences attribute with a dict keyed by document id."""
-        documents = self.tree.execute("$.documents")
-        for doc in documents:
-            sentences = {s['@id']: s['text'] for s in doc.get('sentences', [])}
-            self.document_dict[doc['@id']] = {'sentences': sentences,
-                                              'location': doc.get('location')}
-
     def _make_world_context(self, entity):
         """Get place and time info from the json for this entity."""
         loc_context = None
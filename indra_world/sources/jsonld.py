@@ -0,0 +1,72 @@
+"""Incremental loading of large reader JSON-LD outputs."""
+__all__ = ['load_jsonld_stream']
+
+import json
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+# Token-level annotations of sentences which are large but are not used
+# by any of the processors
+default_sentence_keys_to_drop = ('words', 'dependencies')
+
+
+def load_jsonld_stream(fh, sentence_keys_to_drop=None):
+    """Return the documents and extractions of a JSON-LD by parsing a stream.
+
+    The JSON-LD is parsed incrementally with ijson, and only the documents
+    and extractions are built into Python objects, without the token-level
+    annotations of sentences. This makes it possible to process very large
+    reader outputs without materializing all their content in memory.
+    If ijson is not available, the JSON-LD is loaded in full.
+
+    Parameters
+    ----------
+    fh : file
+        A file-like object opened in binary mode from which the JSON-LD
+        is read.
+    sentence_keys_to_drop : Optional[list[str]]
+        Keys of sentence entries in documents that are skipped when building
+        the documents. Default: words and dependencies
+
+    Returns
+    -------
+    dict
+        A JSON-LD dict with the documents and extractions of the input.
+    """
+    if sentence_keys_to_drop is None:
+        sentence_keys_to_drop = default_sentence_keys_to_drop
+    try:
+        import ijson
+    except ImportError:
+        logger.warning('The ijson package is not available, loading JSON-LD '
+                       'in full.')
+        json_dict = json.load(fh)
+        return {'documents': json_dict.get('documents', []),
+                'extractions': json_dict.get('extractions', [])}
+    drop_prefixes = tuple('documents.item.sentences.item.%s' % key
+                          for key in sentence_keys_to_drop)
+    drop_nested_prefixes = tuple('%s.' % prefix for prefix in drop_prefixes)
+    item_prefixes = {'documents.item': 'documents',
+                     'extractions.item': 'extractions'}
+    json_dict = {'documents': [], 'extractions': []}
+    builder = None
+    for prefix, event, value in ijson.parse(fh, use_float=True):
+        if builder is None:
+            if prefix in item_prefixes and event == 'start_map':
+                builder = ijson.ObjectBuilder()
+                builder.event(event, value)
+            continue
+        # We skip the keys to drop in sentences along with their values
+        if prefix in drop_prefixes or prefix.startswith(drop_nested_prefixes):
+            continue
+        if event == 'map_key' and \
+                prefix == 'documents.item.sentences.item' and \
+                value in sentence_keys_to_drop:
+            continue
+        builder.event(event, value)
+        if prefix in item_prefixes and event == 'end_map':
+            json_dict[item_prefixes[prefix]].append(builder.value)
+            builder = None
+    return json_dict
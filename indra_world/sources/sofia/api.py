@@ -1,8 +1,8 @@
-import json
 import time
 import openpyxl
 import requests
 from indra.config import get_config
+from indra_world import json_codec
 from .processor import SofiaJsonProcessor, SofiaExcelProcessor
 
 default_grounding_mode = 'compositional'
@@ -31,21 +31,25 @@ def process_table(fname, extract_filter=None,
         A SofiaProcessor object which has a list of extracted INDRA
         Statements as its statements attribute.
     """
-    book = openpyxl.load_workbook(fname, read_only=True)
+    # We read each sheet exactly once, as values only, in read-only mode
+    book = openpyxl.load_workbook(fname, read_only=True, data_only=True)
     try:
-        rel_sheet = book['Relations']
-    except Exception as e:
-        rel_sheet = book['Causal']
-    event_sheet = book['Events']
-    entities_sheet = book['Entities']
-
-    sp = SofiaExcelProcessor(rel_sheet.rows, event_sheet.rows,
-                             entities_sheet.rows,
+        try:
+            rel_sheet = book['Relations']
+        except Exception as e:
+            rel_sheet = book['Causal']
+        rel_rows = list(rel_sheet.iter_rows(values_only=True))
+        event_rows = list(book['Events'].iter_rows(values_only=True))
+        entity_rows = list(book['Entities'].iter_rows(values_only=True))
+    finally:
+        book.close()
+
+    sp = SofiaExcelProcessor(rel_rows, event_rows, entity_rows,
                              grounding_mode=grounding_mode)
     if extract_filter is None or 'influence' in extract_filter:
-        sp.extract_relations(rel_sheet.rows)
+        sp.extract_relations()
     if extract_filter is None or 'event' in extract_filter:
-        sp.extract_events(event_sheet.rows, rel_sheet.rows)
+        sp.extract_events()
     return sp
 
 
@@ -101,7 +105,7 @@ def process_text(text, out_file='sofia_output.json', auth=None,
     # Cache reading output
     if out_file:
         with open(out_file, 'w') as fh:
-            json.dump(json_response, fh, indent=1)
+            json_codec.dump(json_response, fh, indent=1)
 
     return process_json(json_response, extract_filter=extract_filter,
                         grounding_mode=grounding_mode)
@@ -164,7 +168,7 @@ def process_json_file(fname, extract_filter=None,
         Statements as its statements attribute.
     """
     with open(fname, 'r') as fh:
-        jd = json.load(fh)
+        jd = json_codec.load(fh)
     return process_json(jd, extract_filter=extract_filter,
                         grounding_mode=grounding_mode)
 
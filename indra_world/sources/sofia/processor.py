@@ -482,13 +482,23 @@ class SofiaProcessor(object):
 
 
 class SofiaJsonProcessor(SofiaProcessor):
-    """A JSON processor extracting statements from reading done by Sofia"""
+    """A JSON processor extracting statements from reading done by Sofia
+
+    The entities, events and causal relations of the extractions are
+    indexed once at construction, after which statements can be extracted
+    with extract_relations and extract_events.
+    """
     def __init__(self, jd, **kwargs):
         super().__init__(**kwargs)
         self._entities = self.process_entities(jd)
         self._events = self.process_events(jd)
+        self._relations = jd.get('causal', [])
         self.statements = []
-        self.relation_subj_obj_ids = []
+        # Save indexes of events that are causes or effects in relations
+        self.relation_subj_obj_ids = set()
+        for rel_dict in self._relations:
+            self.relation_subj_obj_ids |= set(self.get_relation_events(
+                rel_dict))
 
     def process_entities(self, jd: Dict[str, Any]) -> Dict[str, Any]:
         """Process the entities of a Sofia document extraction
@@ -533,129 +543,122 @@ class SofiaJsonProcessor(SofiaProcessor):
         processed_event_dict = self.get_meaningful_events(event_dict)
         return processed_event_dict
 
-    def extract_relations(self, jd: Dict[str, Any]) -> None:
+    def extract_relations(self, jd: Dict[str, Any] = None) -> None:
         """Extract Influence statements from a Sofia document extraction
 
         Parameters
         ----------
         jd :
-            A dictionary with document extractions
+            A dictionary with document extractions. This is not used since
+            the relations are indexed when the processor is constructed
+            and is only kept for backwards compatibility.
         """
-        stmts = []
-        for rel_dict in jd['causal']:
-            # Save indexes of causes and effects
-            current_relation_events = self.get_relation_events(rel_dict)
-            for ix in current_relation_events:
-                self.relation_subj_obj_ids.append(ix)
+        for rel_dict in self._relations:
             # Make Influence Statements
-            stmt_list = self._build_influences(rel_dict)
-            if not stmt_list:
-                continue
-            stmts = stmts + stmt_list
-        for stmt in stmts:
-            self.statements.append(stmt)
+            self.statements.extend(self._build_influences(rel_dict))
 
-    def extract_events(self, jd: Dict[str, str]) -> None:
+    def extract_events(self, jd: Dict[str, str] = None) -> None:
         """Extract Event statements from a Sofia document extraction
 
         Parameters
         ----------
         jd :
-            A dictionary with document extractions
+            A dictionary with document extractions. This is not used since
+            the events are indexed when the processor is constructed
+            and is only kept for backwards compatibility.
         """
-        # First confirm we have extracted event information and relation events
-        if not self._events:
-            self.process_events(jd)
-        if not self.relation_subj_obj_ids:
-            self.extract_relations(jd)
         # Only make Event Statements from standalone events
-        for event_index in self._events:
+        for event_index, event_entry in self._events.items():
             if event_index not in self.relation_subj_obj_ids:
-                event = self.get_event(self._events[event_index])
-                self.statements.append(event)
-
-
-class SofiaExcelProcessor(SofiaProcessor):
-    """An Excel processor extracting statements from reading done by Sofia"""
-    def __init__(self, relation_rows, event_rows: Iterator[Tuple[Cell, ...]], entity_rows,
-                 **kwargs):
-        super().__init__(**kwargs)
-        self._events = self.process_events(event_rows)
-        self.statements = []
-        self.relation_subj_obj_ids = []
+                self.statements.append(self.get_event(event_entry))
+
+
+class SofiaExcelProcessor(SofiaJsonProcessor):
+    """An Excel processor extracting statements from reading done by Sofia
+
+    The rows of each sheet are read exactly once into dicts keyed by the
+    sheet's header, and are then indexed and processed the same way as
+    Sofia JSON output. As before, the entities sheet is not processed and
+    empty cells are represented as None.
+
+    Parameters
+    ----------
+    relation_rows :
+        The rows of the relations (causal) sheet, with the header first.
+    event_rows :
+        The rows of the events sheet, with the header first.
+    entity_rows :
+        The rows of the entities sheet, with the header first.
+    """
+    def __init__(self, relation_rows: Iterator[Tuple[Any, ...]],
+                 event_rows: Iterator[Tuple[Any, ...]],
+                 entity_rows: Iterator[Tuple[Any, ...]], **kwargs):
+        jd = {'causal': rows_to_dicts(relation_rows),
+              'events': rows_to_dicts(event_rows),
+              'entities': rows_to_dicts(entity_rows)}
+        super().__init__(jd, **kwargs)
 
-    def process_events(self, event_rows: Iterator[Tuple[Cell, ...]]) -> Dict[str, Union[int, str]]:
-        """Process the events of Sofia document extractions in Excel format
-
-        Parameters
-        ----------
-        event_rows :
-            The extracted event data from an Excel document
-
-        Returns
-        -------
-        processed_event_dict :
-            A dict of event keyed by their event index
-        """
-        header = [cell.value for cell in next(event_rows)]
-        event_dict = {}
-        for row in event_rows:
-            row_values = [r.value for r in row]
-            row_dict = {h: v for h, v in zip(header, row_values)}
-            event_index = row_dict.get('Event Index')
-            event_dict[event_index] = self.process_event(row_dict)
-        processed_event_dict = self.get_meaningful_events(event_dict)
-        return processed_event_dict
+    def process_entities(self, jd: Dict[str, Any]) -> Dict[str, Any]:
+        """Return no entities since these are not used from Excel output."""
+        return {}
 
-    def extract_relations(self, relation_rows: Iterator[Tuple[Cell, ...]]) -> None:
+    def extract_relations(self, relation_rows=None) -> None:
         """Extract Influence statements from relation events
 
         Parameters
         ----------
         relation_rows :
-            The extracted relation data from an Excel document
+            Not used since the relations are read when the processor is
+            constructed, only kept for backwards compatibility.
         """
-        header = [cell.value for cell in next(relation_rows)]
-        stmts = []
-        for row in relation_rows:
-            row_values = [r.value for r in row]
-            row_dict = {h: v for h, v in zip(header, row_values)}
-            # Save indexes of causes and effects
-            current_relation_events = self.get_relation_events(row_dict)
-            for ix in current_relation_events:
-                self.relation_subj_obj_ids.append(ix)
-            # Make Influence Statements
-            stmt_list = self._build_influences(row_dict)
-            if not stmt_list:
-                continue
-            stmts = stmts + stmt_list
-        for stmt in stmts:
-            self.statements.append(stmt)
+        super().extract_relations()
 
-    def extract_events(
-        self,
-        event_rows: Iterator[Tuple[Cell, ...]],
-        relation_rows: Iterator[Tuple[Cell, ...]],
-    ) -> None:
+    def extract_events(self, event_rows=None, relation_rows=None) -> None:
         """Extract Event statements of a Sofia document in Excel format
 
         Parameters
         ----------
         event_rows :
-            The extracted event data from an Excel document
+            Not used since the events are read when the processor is
+            constructed, only kept for backwards compatibility.
         relation_rows :
-            The extracted relation data from an Excel document
+            Not used since the relations are read when the processor is
+            constructed, only kept for backwards compatibility.
         """
-        # First confirm we have extracted event information and relation events
-        if not self._events:
-            self.process_events(event_rows)
-        if not self.relation_subj_obj_ids:
-            self.extract_relations(relation_rows)
-        # Only make Event Statements from standalone events
-        for event_index in self._events:
-            if event_index not in self.relation_subj_obj_ids:
-                event = self.get_event(self._events[event_index])
-                self.statements.append(event)
+        super().extract_events()
+
+
+def rows_to_dicts(rows: Iterator[Tuple[Any, ...]]) -> List[Dict[str, Any]]:
+    """Return the rows of a sheet as dicts keyed by the sheet's header.
+
+    Parameters
+    ----------
+    rows :
+        The rows of a sheet, with the header first. Each row is either
+        a tuple of values or a tuple of openpyxl Cells.
+
+    Returns
+    -------
+    row_dicts :
+        A list of dicts, one for each non-empty row after the header.
+    """
+    rows = iter(rows)
+    try:
+        header = _get_row_values(next(rows))
+    except StopIteration:
+        return []
+    row_dicts = []
+    for row in rows:
+        values = _get_row_values(row)
+        # Read-only sheets often end with empty rows which we skip
+        if all(v is None for v in values):
+            continue
+        row_dicts.append(dict(zip(header, values)))
+    return row_dicts
+
+
+def _get_row_values(row):
+    return [cell.value if isinstance(cell, Cell) else cell for cell in row]
 
 
 def _in_rels(value, rels):
@@ -0,0 +1,53 @@
+"""A local HTTP server used to test clients of web services."""
+import json
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+@contextmanager
+def serve(respond):
+    """Run a local HTTP server answering requests with a function.
+
+    Parameters
+    ----------
+    respond : Callable
+        A function which takes the request method, path and body (bytes)
+        and returns a tuple of a status code and a response content which
+        is either bytes, a str, a JSON-serializable object or None. It is
+        called in a separate thread for each request.
+
+    Yields
+    ------
+    str
+        The URL of the server, e.g., http://localhost:8000.
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def _respond(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            body = self.rfile.read(length)
+            status, content = respond(self.command, self.path, body)
+            if content is None:
+                content = b''
+            elif isinstance(content, str):
+                content = content.encode('utf-8')
+            elif not isinstance(content, bytes):
+                content = json.dumps(content).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Length', str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        do_GET = _respond
+        do_POST = _respond
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('localhost', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        yield 'http://localhost:%d' % server.server_port
+    finally:
+        server.shutdown()
+        server.server_close()
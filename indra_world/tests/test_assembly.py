@@ -91,6 +91,40 @@ def test_compositional_grounding_filter_self_loops():
     assert concept.db_refs['WM'][0][1] is None
 
 
+def test_compositional_grounding_filter_copy_modes():
+    wm = [[('x', 0.5), ('y', 0.8), None, None]]
+    ev = Evidence(source_api='eidos', text='some text',
+                  annotations={'x': 'y'})
+    stmt = Event(Concept('x', db_refs={'WM': wm}), evidence=[ev])
+    stmt_out = compositional_grounding_filter_stmt(stmt, 0.7, [],
+                                                   copy_mode='cow')
+    assert stmt_out is not stmt
+    assert stmt_out.evidence[0] is ev
+    assert stmt_out.concept.db_refs['WM'][0][0] == ('y', 0.8)
+    # The original statement is unchanged
+    assert stmt.concept.db_refs['WM'][0][0] == ('x', 0.5)
+
+    stmt_out = compositional_grounding_filter_stmt(stmt, 0.7, [],
+                                                   copy_mode='inplace')
+    assert stmt_out is stmt
+    assert stmt.concept.db_refs['WM'][0][0] == ('y', 0.8)
+
+
+def test_expanded_events_cow():
+    ev = Evidence(source_api='eidos', text='some text',
+                  context=WorldContext(geo_location=RefContext('x')),
+                  annotations={'x': 'y'})
+    stmt = Influence(Event(Concept('x')), Event(Concept('y')),
+                     evidence=[ev])
+    expanded = get_expanded_events_influences([stmt], copy_mode='cow')
+    assert len(expanded) == 3
+    assert expanded[2] is stmt
+    for event in expanded[:2]:
+        assert event.evidence[0].context is None
+        assert event.evidence[0].annotations is ev.annotations
+    assert ev.context is not None
+    assert stmt.subj.evidence == []
+
 
 def test_compositional_refinements():
     def make_event(comp_grounding):
@@ -89,3 +89,297 @@ def test_api():
     url = client.dart_url + '/health'
     res = requests.get(url, auth=(client.dart_uname, client.dart_pwd))
     assert res.status_code == 200
+
+
+def test_cache_records_concurrent():
+    import tempfile
+    from .http_server import serve
+
+    requests_seen = []
+
+    def respond(method, path, body):
+        requests_seen.append(path)
+        # Fail the first request to test retries
+        if len(requests_seen) == 1:
+            return 503, None
+        return 200, 'output for %s' % path.split('/')[-1]
+
+    records = [{'identity': 'eidos', 'version': '1.0',
+                'document_id': 'd%d' % idx, 'storage_key': 'k%d' % idx}
+               for idx in range(5)]
+    with serve(respond) as url:
+        client = dart_client.DartClient(
+            storage_mode='web', dart_url=url, dart_uname='x',
+            dart_pwd='y', local_storage=tempfile.mkdtemp(),
+            backoff_factor=0)
+        client.cache_records(records, max_workers=3)
+    assert len(requests_seen) == 6
+    for record in records:
+        with open(client.get_local_storage_path(record), 'r') as fh:
+            assert fh.read() == 'output for %s' % record['storage_key']
+    # Cached records are not downloaded again
+    outputs = client.get_outputs_from_records(records, max_workers=3)
+    assert outputs['eidos']['d0'] == 'output for k0'
+    assert len(requests_seen) == 6
+
+
+def test_download_timeout():
+    import time
+    import tempfile
+    from .http_server import serve
+
+    requests_seen = []
+
+    def respond(method, path, body):
+        requests_seen.append(path)
+        # The first request hangs beyond the client's timeout
+        if len(requests_seen) == 1:
+            time.sleep(1)
+        return 200, 'output'
+
+    with serve(respond) as url:
+        client = dart_client.DartClient(
+            storage_mode='web', dart_url=url, dart_uname='x',
+            dart_pwd='y', local_storage=tempfile.mkdtemp(),
+            backoff_factor=0, timeout=0.2)
+        assert client.download_output('k0') == 'output'
+    assert len(requests_seen) == 2
+
+
+def test_session_pool_size():
+    import tempfile
+    client = dart_client.DartClient(storage_mode='web', dart_uname='x',
+                                    dart_pwd='y',
+                                    local_storage=tempfile.mkdtemp())
+    session = client.get_session()
+    assert session.get_adapter('https://x')._pool_maxsize == 10
+    # A larger pool replaces the adapter of the same session
+    assert client.get_session(pool_size=20) is session
+    assert session.get_adapter('https://x')._pool_maxsize == 20
+    # Not giving a size keeps the current pool
+    client.get_session()
+    assert session.get_adapter('https://x')._pool_maxsize == 20
+
+
+def test_compressed_local_storage():
+    import gzip
+    import tempfile
+    client = dart_client.DartClient(storage_mode='local',
+                                    local_storage=tempfile.mkdtemp(),
+                                    compression='gzip')
+    rec1 = {'identity': 'eidos', 'version': '1.0', 'document_id': 'd1',
+            'storage_key': 'k1'}
+    rec2 = {'identity': 'eidos', 'version': '1.0', 'document_id': 'd2',
+            'storage_key': 'k2'}
+    fname1 = client.get_local_storage_path(rec1)
+    dart_client.write_local_output(fname1, '{"x": "y"}',
+                                   compression=client.compression)
+    with open(fname1, 'rb') as fh:
+        assert gzip.decompress(fh.read()) == b'{"x": "y"}'
+    # Uncompressed files written earlier still work
+    with open(client.get_local_storage_path(rec2), 'w') as fh:
+        fh.write('{"a": "b"}')
+    assert client.get_output_from_record(rec1) == '{"x": "y"}'
+    assert client.get_output_from_record(rec2) == '{"a": "b"}'
+
+
+def test_local_catalog():
+    import tempfile
+    client = dart_client.DartClient(storage_mode='local',
+                                    local_storage=tempfile.mkdtemp())
+    # Without a catalog, outputs are found in local storage
+    rec = {'identity': 'hume', 'version': '1.0', 'document_id': 'd0'}
+    with open(client.get_local_storage_path(rec), 'w') as fh:
+        fh.write('{}')
+    records = client.get_reader_output_records(readers=['hume'])
+    assert len(records) == 1
+    assert records[0]['document_id'] == 'd0'
+
+    records = [{'identity': 'hume', 'version': '1.0', 'document_id': 'd1',
+                'storage_key': 'k1', 'output_version': 'o1',
+                'tenants': ['t1'], 'timestamp': '2021-01-01T00:00:00'},
+               {'identity': 'hume', 'version': '2.0', 'document_id': 'd2',
+                'storage_key': 'k2', 'output_version': 'o2',
+                'tenants': ['t1', 't2'], 'timestamp': '2021-02-01T00:00:00'}]
+    client.catalog.add_records(records)
+    # A cataloged record whose output is also in local storage
+    with open(client.get_local_storage_path(records[0]), 'w') as fh:
+        fh.write('{}')
+
+    def get_keys(**kwargs):
+        return {r['storage_key'] for r in
+                client.get_reader_output_records(readers=['hume'], **kwargs)}
+
+    # Once the catalog has records, only the catalog is used
+    assert get_keys() == {'k1', 'k2'}
+    # Outputs cached before the catalog are added by indexing once
+    assert client.index_local_storage() == 1
+    assert client.index_local_storage() == 0
+    uncataloged_key = client.get_local_storage_path(rec)
+    assert get_keys() == {'k1', 'k2', uncataloged_key}
+    assert get_keys(versions=['2.0']) == {'k2'}
+    assert get_keys(document_ids=['d1']) == {'k1'}
+    # Indexed outputs have no tenant, ontology or timestamp so they don't
+    # match lookups constrained by these
+    assert get_keys(tenant='t2') == {'k2'}
+    assert get_keys(ontology_id='o1') == {'k1'}
+    assert get_keys(timestamp={'after': '2021-01-15T00:00:00'}) == {'k2'}
+    assert client.get_reader_output_records(readers=['hume'],
+                                            document_ids=['d1'])[0] == \
+        records[0]
+
+
+
+def test_sync_records():
+    import tempfile
+    from urllib.parse import parse_qs
+    from .http_server import serve
+
+    all_records = [{'identity': 'eidos', 'version': '1.0',
+                    'document_id': 'd%d' % idx, 'storage_key': 'k%d' % idx,
+                    'output_version': '1.2', 'tenants': ['t1'],
+                    'timestamp': '2021-01-0%dT00:00:00.000Z' % (idx + 1)}
+                   for idx in range(3)]
+    queries = []
+    failures = []
+
+    def respond(method, path, body):
+        # Fail the first query to test retries
+        if not failures:
+            failures.append(path)
+            return 503, None
+        query = json.loads(parse_qs(body.decode('utf-8'))['metadata'][0])
+        queries.append(query)
+        after = query.get('timestamp', {}).get('after', '')
+        records = [r for r in all_records if r['timestamp'][:19] > after]
+        return 200, {'records': records}
+
+    with serve(respond) as url:
+        client = dart_client.DartClient(
+            storage_mode='web', dart_url=url, dart_uname='x',
+            dart_pwd='y', local_storage=tempfile.mkdtemp(),
+            backoff_factor=0)
+        records = client.sync_reader_output_records(readers=['eidos'])
+        assert len(records) == 3
+        all_records.append(
+            {'identity': 'eidos', 'version': '1.0', 'document_id': 'd3',
+             'storage_key': 'k3', 'output_version': '1.2', 'tenants': ['t1'],
+             'timestamp': '2021-01-05T00:00:00.000Z'})
+        # A record added later within the same second as the last one
+        all_records.append(
+            {'identity': 'eidos', 'version': '1.0', 'document_id': 'd4',
+             'storage_key': 'k4', 'output_version': '1.2', 'tenants': ['t1'],
+             'timestamp': '2021-01-03T00:00:00.900Z'})
+        records = client.sync_reader_output_records(readers=['eidos'])
+    assert failures == ['/readers/query']
+    assert queries[1]['timestamp'] == {'after': '2021-01-02T23:59:59'}
+    # The last record of the previous sync is fetched again but isn't new
+    assert {r['storage_key'] for r in records} == {'k3', 'k4'}
+    assert len(client.catalog.get_records(readers=['eidos'])) == 5
+
+
+def test_iter_process_reader_outputs():
+    import os
+    from indra_world.sources.dart import iter_process_reader_outputs
+    fname = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data',
+                         'eidos', 'eidos_compositional.jsonld')
+    items = [('eidos', 'd%d' % idx, fname) for idx in range(4)]
+    results = list(iter_process_reader_outputs(items, nproc=2,
+                                               max_pending=2))
+    assert {item for item, _ in results} == set(items)
+    for (_, doc_id, _), stmts in results:
+        assert stmts
+        assert all(ev.text_refs['DART'] == doc_id
+                   for stmt in stmts for ev in stmt.evidence)
+
+
+def test_iter_process_reader_outputs_failure():
+    import os
+    import tempfile
+    from indra_world.sources.dart import iter_process_reader_outputs
+    bad_fname = os.path.join(tempfile.mkdtemp(), 'bad.jsonld')
+    with open(bad_fname, 'w') as fh:
+        fh.write('{')
+    empty_fname = os.path.join(tempfile.mkdtemp(), 'empty.jsonld')
+    with open(empty_fname, 'w') as fh:
+        fh.write('{"documents": [], "extractions": []}')
+    items = [('eidos', 'd0', bad_fname), ('eidos', 'd1', empty_fname)]
+    results = dict(iter_process_reader_outputs(items, nproc=1))
+    # Failures are told apart from outputs without statements
+    assert results[items[0]] is None
+    assert results[items[1]] == []
+
+
+def test_iter_process_reader_output_files():
+    import os
+    import tempfile
+    from indra_world.sources.dart import iter_process_reader_outputs
+    from indra_world.sources.dart.client import write_local_output
+    from .test_sofia import make_table, _get_data_file
+    fname = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data',
+                         'eidos', 'eidos_compositional.jsonld')
+    with open(fname, 'r') as fh:
+        content = fh.read()
+    # Compressed outputs from local storage and Sofia workbooks
+    gz_fname = os.path.join(tempfile.mkdtemp(), 'd0')
+    write_local_output(gz_fname, content, compression='gzip')
+    table_fname = make_table(_get_data_file('sofia_infl_polarities.json'))
+    items = [('eidos', 'd0', gz_fname), ('sofia', 'd1', table_fname)]
+    results = dict(iter_process_reader_outputs(items, grounding_mode='flat',
+                                               nproc=2))
+    assert results[items[0]]
+    assert results[items[1]]
+    assert all(ev.text_refs['DART'] == 'd1'
+               for stmt in results[items[1]] for ev in stmt.evidence)
+
+
+def test_processor_version():
+    from indra_world.sources.dart.stmt_cache import get_processor_version
+    # This also makes sure that all the shared modules that are hashed exist
+    eidos_version = get_processor_version('eidos')
+    assert eidos_version != get_processor_version('hume')
+    assert eidos_version == get_processor_version('eidos')
+
+
+def test_stmt_cache():
+    import os
+    import tempfile
+    from indra_world.sources.dart import process_reader_output
+    from indra_world.sources.dart.stmt_cache import StatementCache
+    fname = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data',
+                         'eidos', 'eidos_compositional.jsonld')
+    with open(fname, 'r') as fh:
+        content = fh.read()
+    cache = StatementCache(os.path.join(tempfile.mkdtemp(), 'stmts.sqlite'))
+    stmts = process_reader_output('eidos', content, 'd1',
+                                  grounding_mode='compositional',
+                                  extract_filter=['influence'],
+                                  stmt_cache=cache, storage_key='xxx')
+    assert len(cache) == 1
+    cached_stmts = cache.get_statements('xxx', 'eidos', 'compositional',
+                                        ['influence'])
+    assert [s.get_hash() for s in cached_stmts] == \
+        [s.get_hash() for s in stmts]
+    # A different extraction filter or grounding mode isn't a cache hit
+    assert cache.get_statements('xxx', 'eidos', 'compositional',
+                                ['influence', 'event']) is None
+    assert cache.get_statements('xxx', 'eidos', 'flat',
+                                ['influence']) is None
+    # Cached statements get the provenance of the requested document
+    stmts = process_reader_output('eidos', 'invalid', 'd2',
+                                  grounding_mode='compositional',
+                                  extract_filter=['influence'],
+                                  stmt_cache=cache, storage_key='xxx')
+    assert stmts
+    assert all(ev.text_refs['DART'] == 'd2'
+               for stmt in stmts for ev in stmt.evidence)
+    # Cache hits for DART records don't need the reader output and are
+    # interned like freshly processed statements
+    from indra_world.interning import intern_term
+    from indra_world.sources.dart.api import process_dart_record_output
+    record = {'storage_key': 'xxx', 'identity': 'eidos',
+              'document_id': 'd3'}
+    stmts = process_dart_record_output(record, None, 'compositional',
+                                       ['influence'], stmt_cache=cache)
+    entry = stmts[0].subj.concept.db_refs['WM'][0][0]
+    assert intern_term(entry) is entry
@@ -133,3 +133,223 @@ def test_get_projects():
     assert len(projects) == 2
     assert {p['id'] for p in projects} == {'p1', 'p2'}
     assert {p['name'] for p in projects} == {'Project 1', 'Project 2'}
+
+
+def test_upsert_dart_records():
+    db = _get_db()
+    db.add_dart_record('eidos', '1.0', 'd1', 'k1', 'today')
+    records = [{'reader': 'eidos', 'reader_version': '1.0',
+                'document_id': 'd1', 'storage_key': 'k1', 'date': 'later',
+                'output_version': '1.2', 'labels': None, 'tenants': 't1'},
+               {'reader': 'hume', 'reader_version': '2.0',
+                'document_id': 'd1', 'storage_key': 'k2', 'date': 'later',
+                'output_version': '1.2', 'labels': None, 'tenants': None}]
+    db.upsert_dart_records(records)
+    db.upsert_dart_records(records)
+    full_records = db.get_full_dart_records()
+    assert len(full_records) == 2
+    assert {r['date'] for r in full_records} == {'later'}
+    assert db.get_dart_records(tenants=['t1']) == ['k1']
+    # A failing batch leaves none of the records replaced
+    bad_records = [dict(records[0], date='never'),
+                   dict(records[1], date='never'),
+                   dict(records[1], storage_key='k3'),
+                   dict(records[1], storage_key='k3')]
+    assert db.upsert_dart_records(bad_records, batch_size=2) is None
+    full_records = db.get_full_dart_records()
+    assert {r['storage_key'] for r in full_records} == {'k1', 'k2'}
+    assert {r['date'] for r in full_records} == {'later'}
+
+
+def test_statements_bulk_compressed():
+    db = DbManager('sqlite:///:memory:', stmt_format='json-zlib-1')
+    db.create_all()
+    res = db.add_statements_for_records({'xyz1': [s1, s2], 'xyz2': [s1],
+                                         'xyz3': []},
+                                        indra_version='1.0', batch_size=2)
+    assert res['rowcount'] == 3, res
+    stmts = db.get_statements_for_record('xyz1')
+    assert {s.uuid for s in stmts} == {s1.uuid, s2.uuid}
+    # Statements stored in different formats can be read together
+    db.stmt_format = 'json'
+    db.add_statements_for_record('xyz4', [s2], indra_version='1.0')
+    stmts = db.get_statements()
+    assert len(stmts) == 4
+    assert stmts[-1].uuid == s2.uuid
+
+
+def test_statements_bulk_atomic():
+    db = _get_db()
+    # The record key of the second batch can't be stored so none of the
+    # statements are added
+    res = db.add_statements_for_records({'xyz1': [s1, s2],
+                                         ('xyz2',): [s1]},
+                                        indra_version='1.0', batch_size=2)
+    assert res is None
+    assert db.get_statements() == []
+
+
+def test_iter_statements_for_records():
+    db = _get_db()
+    db.add_statements_for_records({'xyz1': [s1, s2], 'xyz2': [s1]},
+                                  indra_version='1.0')
+    stmts_iter = db.iter_statements_for_records(['xyz1', 'xyz2'],
+                                                batch_size=1, chunk_size=1)
+    assert not isinstance(stmts_iter, list)
+    assert len(list(stmts_iter)) == 3
+    assert len(list(db.iter_statements_for_records(['xyz2']))) == 1
+    assert len(list(db.iter_statements_for_records(chunk_size=2))) == 3
+
+
+def test_statement_columns():
+    from indra_world.assembly.matches import location_matches_compositional
+    db = _get_db()
+    db.add_statements_for_records({'xyz1': [s1, s2], 'xyz2': [s1]},
+                                  indra_version='1.0')
+    s1h = s1.get_hash(matches_fun=location_matches_compositional)
+    s2h = s2.get_hash(matches_fun=location_matches_compositional)
+    assert db.get_statement_hash_counts() == {s1h: 2, s2h: 1}
+    assert db.get_statement_hash_counts(['xyz2']) == {s1h: 1}
+    stmts = db.get_statements_by_hash([s2h])
+    assert [s.uuid for s in stmts] == [s2.uuid]
+    stmts = db.get_statements_by_hash([s1h], record_keys=['xyz1'])
+    assert [s.uuid for s in stmts] == [s1.uuid]
+    stmts = db.get_statements_for_theme('wm/concept/agriculture')
+    assert len(stmts) == 2
+    assert {s.uuid for s in stmts} == {s1.uuid}
+    stmts = db.get_statements_for_theme('wm/concept/agriculture/crop',
+                                        record_keys=['xyz1'])
+    assert {s.uuid for s in stmts} == {s1.uuid, s2.uuid}
+    # Long lists of hashes and record keys are queried for in batches
+    assert db.get_statement_hash_counts(['xyz1', 'xyz2', 'xyz3'],
+                                        batch_size=1) == {s1h: 2, s2h: 1}
+    stmts = db.get_statements_by_hash([s1h, s2h, s1h],
+                                      record_keys=['xyz1', 'xyz2'],
+                                      batch_size=1)
+    assert sorted(s.uuid for s in stmts) == \
+        sorted([s1.uuid, s1.uuid, s2.uuid])
+    stmts = db.get_statements_for_theme('wm/concept/agriculture',
+                                        record_keys=['xyz1', 'xyz2'],
+                                        batch_size=1)
+    assert len(stmts) == 2
+
+
+def test_migrate():
+    import os
+    import tempfile
+    from sqlalchemy import create_engine
+    from indra.statements import stmts_to_json
+    from indra_world import json_codec
+    from indra_world.service.db.migrate import migrate
+    url = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'test.db')
+    # We create tables the way they were before normalized labels and
+    # tenants and precomputed statement columns were added
+    engine = create_engine(url)
+    engine.execute('CREATE TABLE dart_records (storage_key VARCHAR '
+                   'PRIMARY KEY, document_id VARCHAR, reader_version '
+                   'VARCHAR, reader VARCHAR, output_version VARCHAR, '
+                   'date VARCHAR, labels VARCHAR, tenants VARCHAR)')
+    engine.execute('CREATE TABLE prepared_statements (_dummy INTEGER '
+                   'PRIMARY KEY, record_key VARCHAR, indra_version VARCHAR, '
+                   'stmt JSON)')
+    engine.execute("INSERT INTO dart_records VALUES ('k1', 'd1', '1.0', "
+                   "'eidos', '1.2', 'today', 'embed|test', 't1|t2')")
+    # A malformed statement is skipped without aborting the migration
+    engine.execute('INSERT INTO prepared_statements (record_key, '
+                   'indra_version, stmt) VALUES (?, ?, ?)',
+                   ('k1', '1.0', '{"type": "Influence"}'))
+    engine.execute('INSERT INTO prepared_statements (record_key, '
+                   'indra_version, stmt) VALUES (?, ?, ?)',
+                   ('k1', '1.0', json_codec.dumps(stmts_to_json([s1])[0])))
+    migrate(url)
+    # Migrating again is a no-op
+    migrate(url)
+
+    db = DbManager(url)
+    assert db.get_dart_records(tenants=['t2'], labels=['test']) == ['k1']
+    assert db.get_dart_records(tenants=['t3']) == []
+    stmts = db.get_statements_for_theme('wm/concept/agriculture')
+    assert [s.uuid for s in stmts] == [s1.uuid]
+
+
+def test_concurrent_sessions():
+    import os
+    import tempfile
+    from concurrent.futures import ThreadPoolExecutor
+    # Writers wait for the SQLite file lock longer than the default 5s so
+    # that the test doesn't fail on slow machines
+    url = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'test.db') + \
+        '?timeout=60'
+    db = DbManager(url)
+    db.create_all()
+
+    def add_and_get(idx):
+        project_id = 'p%d' % idx
+        db.add_project(project_id, project_id)
+        db.add_records_for_project(project_id, ['r%d' % idx, 'x'])
+        return db.get_records_for_project(project_id)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(add_and_get, range(16)))
+    for idx, record_keys in enumerate(results):
+        assert set(record_keys) == {'r%d' % idx, 'x'}
+    assert len(db.get_projects()) == 16
+
+
+def test_retry_on_disconnect():
+    from sqlalchemy.exc import DBAPIError
+    db = _get_db()
+    calls = []
+
+    def fun(session):
+        calls.append(session)
+        if len(calls) < 3:
+            raise DBAPIError('SELECT 1', {}, Exception('disconnected'),
+                             connection_invalidated=True)
+        return 'done'
+    assert db.run(fun) == 'done'
+    assert len(calls) == 3
+
+    # If the connection is lost on every attempt, the error is raised
+    calls = []
+    db.retries = 1
+    try:
+        db.run(fun)
+        assert False
+    except DBAPIError:
+        pass
+    assert len(calls) == 2
+
+
+def test_no_retry_on_commit_disconnect():
+    from sqlalchemy import event
+    from sqlalchemy.exc import DBAPIError
+    db = _get_db()
+    calls = []
+
+    def lose_connection(session):
+        raise DBAPIError('COMMIT', {}, Exception('disconnected'),
+                         connection_invalidated=True)
+    event.listen(db.session_maker, 'before_commit', lose_connection)
+    # The transaction may have been applied so it isn't run again
+    try:
+        db.run(lambda session: calls.append(session))
+        assert False
+    except DBAPIError:
+        pass
+    assert len(calls) == 1
+
+
+def test_project_records_from_corpus():
+    db = _get_db()
+    record_keys = ['r%d' % idx for idx in range(2500)]
+    db.add_corpus('c1', {})
+    db.add_records_for_corpus('c1', record_keys, batch_size=1000)
+    db.add_records_for_corpus('c2', ['x'])
+    db.add_project('p1', 'project 1', corpus_id='c1')
+    res = db.add_records_for_project_from_corpus('p1', 'c1')
+    assert res['rowcount'] == 2500
+    assert sorted(db.get_records_for_project('p1')) == sorted(record_keys)
+    # Records that are already in the project can't be added again
+    assert db.add_records_for_project_from_corpus('p1', 'c1') is None
+    assert len(db.get_records_for_project('p1')) == 2500
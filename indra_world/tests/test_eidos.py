@@ -179,6 +179,16 @@ def test_compositional_grounding():
     assert ep.statements
 
 
+def test_streaming():
+    for fname in [test_jsonld, _get_data_file('eidos_compositional.jsonld')]:
+        ep = eidos.process_json_file(fname)
+        ep_stream = eidos.process_json_file(fname, streaming=True)
+        assert [s.get_hash() for s in ep.statements] == \
+            [s.get_hash() for s in ep_stream.statements]
+        assert [s.evidence[0].text for s in ep.statements] == \
+            [s.evidence[0].text for s in ep_stream.statements]
+
+
 def test_eidos_to_cx():
     stmts = _get_stmts_from_remote_jsonld()
     cx = CxAssembler()
@@ -248,3 +258,185 @@ def test_reground_texts():
             'meteorologic/precipitation/rainfall'), groundings
     assert groundings[1][0][0] == \
            'wm/concept/causal_factor/condition/famine', groundings
+
+
+def test_grounding_cache():
+    import tempfile
+    from indra_world.sources.eidos.grounding_cache import GroundingCache, \
+        get_ontology_hash
+    path = os.path.join(tempfile.mkdtemp(), 'groundings.sqlite')
+    cache = GroundingCache(path, max_entries=2)
+    ont_hash = get_ontology_hash('wm: []')
+    cache.add_groundings(ont_hash, {'rainfall': [('wm/x', 0.8)],
+                                    'hunger': [('wm/y', 0.7)]})
+    groundings = cache.get_groundings(ont_hash, ['rainfall', 'drought'])
+    assert groundings == {'rainfall': [('wm/x', 0.8)]}, groundings
+    # Different parameters or ontology don't match
+    assert not cache.get_groundings(ont_hash, ['rainfall'], topk=5)
+    assert not cache.get_groundings(get_ontology_hash('wm: [x]'),
+                                    ['rainfall'])
+    # The least recently used entry is evicted
+    cache.add_groundings(ont_hash, {'drought': [('wm/z', 0.9)]})
+    assert len(cache) == 2
+    assert set(cache.get_groundings(ont_hash,
+                                    ['rainfall', 'hunger', 'drought'])) == \
+        {'rainfall', 'drought'}
+    # The cache persists across instances
+    assert len(GroundingCache(path)) == 2
+
+
+def test_grounding_cache_threads():
+    import tempfile
+    from concurrent.futures import ThreadPoolExecutor
+    from indra_world.sources.eidos.grounding_cache import GroundingCache
+    cache = GroundingCache(os.path.join(tempfile.mkdtemp(), 'g.sqlite'),
+                           max_entries=10)
+    evictions = []
+    evict = cache.evict
+    cache.evict = lambda: (evictions.append(1), evict())
+
+    def add(idx):
+        cache.add_groundings('h', {'text%d' % idx: [('wm/x', 0.5)]})
+        return cache.get_groundings('h', ['text%d' % idx])
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(add, range(8)))
+    assert all(len(res) == 1 for res in results)
+    # Entries aren't counted for eviction while the cache is below its limit
+    assert not evictions
+    cache.add_groundings('h', {'text%d' % idx: [('wm/x', 0.5)]
+                               for idx in range(8, 12)})
+    assert evictions
+    assert len(cache) == 10
+
+
+def test_reground_client_local_server():
+    from indra_world.sources.eidos.client import reground_texts
+    from .http_server import serve
+
+    requests_seen = []
+
+    def respond(method, path, body):
+        body = json.loads(body)
+        requests_seen.append(body)
+        # Fail the first request to test retries
+        if len(requests_seen) == 1:
+            return 503, None
+        return 200, [[{'grounding': 'wm/%s/' % txt, 'score': 0.5}]
+                     for txt in body['texts']]
+
+    texts = ['t%d' % idx for idx in range(10)] + ['t0']
+    with serve(respond) as url:
+        groundings = reground_texts(texts, 'wm: []', url, batch_size=3,
+                                    max_workers=2, backoff_factor=0)
+    assert groundings == [[('wm/%s' % txt, 0.5)] for txt in texts]
+    assert all(req['ontologyYaml'] == 'wm: []' for req in requests_seen)
+    assert len(requests_seen) == 5
+
+
+def test_reground_client_timeout():
+    import time
+    from indra_world.sources.eidos.client import RegroundClient
+    from .http_server import serve
+
+    requests_seen = []
+
+    def respond(method, path, body):
+        body = json.loads(body)
+        requests_seen.append(body)
+        # The first request hangs beyond the client's timeout
+        if len(requests_seen) == 1:
+            time.sleep(1)
+        return 200, [[{'grounding': 'wm/x', 'score': 0.5}]
+                     for _ in body['texts']]
+
+    with serve(respond) as url:
+        with RegroundClient(url, 'wm: []', backoff_factor=0,
+                            timeout=0.2) as client:
+            groundings = client.reground(['a "quoted" text'])
+    assert groundings == {'a "quoted" text': [('wm/x', 0.5)]}
+    assert len(requests_seen) == 2
+
+
+def test_texts_affected_by_changes():
+    from indra_world.sources.eidos.client import \
+        get_texts_affected_by_changes
+    groundings = {'food': [('wm/food', 0.9), ('wm/water', 0.5)],
+                  'drinking water': [('wm/water', 0.9)],
+                  'low yield': [('wm/water', 0.3)],
+                  'fuel prices': [('wm/fuel', 0.7)]}
+    affected = get_texts_affected_by_changes(
+        groundings, changed_nodes={'wm/food', 'wm/fuel'})
+    assert affected == {'food', 'fuel prices'}, affected
+
+
+def test_unaffected_groundings():
+    import yaml
+    import tempfile
+    from indra_world.sources.eidos.client import get_unaffected_groundings
+    from indra_world.sources.eidos.grounding_cache import GroundingCache, \
+        get_ontology_hash
+    from .http_server import serve
+    old_yml = """
+- node:
+    name: wm
+    children:
+      - node:
+          name: food
+          examples: [food]
+      - node:
+          name: fuel
+          examples: [fuel]
+"""
+    removed_yml = """
+- node:
+    name: wm
+    children:
+      - node:
+          name: food
+          examples: [food]
+"""
+    cache = GroundingCache(os.path.join(tempfile.mkdtemp(), 'g.sqlite'))
+    cache.add_groundings(get_ontology_hash(old_yml),
+                         {'bread': [('wm/food', 0.8)],
+                          'crop': [('wm/food', 0.6)],
+                          'petrol': [('wm/fuel', 0.9)]}, topk=1)
+    texts = {'bread', 'crop', 'petrol'}
+    # Only the texts grounded to removed nodes are regrounded
+    unaffected = get_unaffected_groundings(texts, old_yml, removed_yml,
+                                           cache, topk=1)
+    assert unaffected == {'bread': [('wm/food', 0.8)],
+                          'crop': [('wm/food', 0.6)]}, unaffected
+
+    # An added node may score higher than the cached groundings of texts
+    # that share no words with it so we need to score it
+    added_yml = removed_yml + """
+      - node:
+          name: harvest
+          examples: [harvest]
+"""
+    assert not get_unaffected_groundings(texts, old_yml, added_yml, cache,
+                                         topk=1)
+    requests_seen = []
+
+    def respond(method, path, body):
+        body = json.loads(body)
+        requests_seen.append(body)
+        scores = {'bread': 0.2, 'crop': 0.7}
+        # Ancestors of the scored nodes are ignored
+        return 200, [[{'grounding': 'wm/', 'score': 0.99},
+                      {'grounding': 'wm/harvest/', 'score': scores[txt]}]
+                     for txt in body['texts']]
+
+    with serve(respond) as url:
+        unaffected = get_unaffected_groundings(texts, old_yml, added_yml,
+                                               cache, topk=1,
+                                               webservice=url)
+    assert unaffected == {'bread': [('wm/food', 0.8)]}, unaffected
+    assert len(requests_seen) == 1
+    # Only the added node is scored, and only for texts that aren't
+    # already known to be affected
+    assert sorted(requests_seen[0]['texts']) == ['bread', 'crop']
+    assert yaml.safe_load(requests_seen[0]['ontologyYaml']) == \
+        [{'node': {'name': 'wm', 'children': [
+            {'node': {'name': 'harvest', 'examples': ['harvest']}}]}}]
@@ -0,0 +1,28 @@
+from indra_world.sources.grounding_memo import GroundingMemo, freeze
+
+
+def test_grounding_memo():
+    calls = []
+
+    def normalize(grounding):
+        calls.append(grounding)
+        return tuple(sorted(grounding['values']))
+
+    memo = GroundingMemo(maxsize=2)
+    g1 = {'name': 'x', 'values': [('b', 0.5), ('a', 0.6)]}
+    g2 = {'name': 'y', 'values': [('c', 0.7)]}
+    g3 = {'name': 'z', 'values': [('d', 0.8)]}
+    res1 = memo.get(freeze(g1), normalize, g1)
+    assert res1 == (('a', 0.6), ('b', 0.5))
+    # An equal payload returns the same object without recomputing it
+    res1_copy = memo.get(freeze(dict(g1)), normalize, dict(g1))
+    assert res1_copy is res1
+    assert len(calls) == 1
+    assert memo.hits == 1 and memo.misses == 1
+
+    # The least recently used entry is discarded
+    memo.get(freeze(g2), normalize, g2)
+    memo.get(freeze(g3), normalize, g3)
+    assert len(memo) == 2
+    memo.get(freeze(g1), normalize, g1)
+    assert len(calls) == 4
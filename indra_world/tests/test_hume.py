@@ -125,3 +125,12 @@ def test_compositional_grounding_influence():
     grounding = hp.statements[0].obj.concept.db_refs['WM'][0]
     assert grounding[0][0] == 'wm/concept/goods/food', grounding
     assert grounding[2][0] == 'wm/process/access', grounding
+
+
+def test_streaming():
+    for fname in [test_file_new_simple,
+                  _get_data_file('compositional_influence.jsonld')]:
+        hp = process_jsonld_file(fname)
+        hp_stream = process_jsonld_file(fname, streaming=True)
+        assert [s.get_hash() for s in hp.statements] == \
+            [s.get_hash() for s in hp_stream.statements]
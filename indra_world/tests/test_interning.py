@@ -0,0 +1,43 @@
+from indra.statements import Concept, Event, Influence, stmts_from_json, \
+    stmts_to_json
+from indra_world.interning import intern_groundings, intern_statements
+
+
+def test_intern_groundings():
+    flat = intern_groundings([('wm/concept/agriculture', 0.8)])
+    comp = intern_groundings([[['wm/concept/agriculture', 0.8], None,
+                               ('wm/process/production', 0.7), None]])
+    assert flat == [('wm/concept/agriculture', 0.8)]
+    assert comp == [[('wm/concept/agriculture', 0.8), None,
+                     ('wm/process/production', 0.7), None]]
+    # Compositional groundings remain mutable lists but share their entries
+    assert isinstance(comp[0], list)
+    assert comp[0][0] is flat[0]
+
+
+def test_intern_statements():
+    def make_event(name):
+        return Event(Concept(name, db_refs={
+            'WM': [[('wm/concept/%s' % name, 0.9), None, None, None]]}))
+    stmts = [Influence(make_event('rain'), make_event('flooding')),
+             Influence(make_event('flooding'), make_event('rain'))]
+    stmts = intern_statements(stmts_from_json(stmts_to_json(stmts)))
+    assert stmts[0].subj.concept.db_refs['WM'][0][0] is \
+        stmts[1].obj.concept.db_refs['WM'][0][0]
+    assert stmts[0].subj.concept.db_refs['WM'][0][0] == \
+        ('wm/concept/rain', 0.9)
+
+
+def test_pool_bounded():
+    from indra_world import interning
+    interning.clear_pool()
+    maxsize = interning._get_maxsize()
+    first = interning.intern_term(('wm/concept/agriculture', 0.0))
+    for idx in range(maxsize + 10):
+        interning.intern_term(('wm/concept/agriculture', 1.0 / (idx + 2)))
+    assert interning.get_pool_size() == maxsize
+    # The least recently used entry was discarded so an equal entry
+    # is now a new object
+    again = interning.intern_term(('wm/concept/agriculture', 0.0))
+    assert again == first and again is not first
+    interning.clear_pool()
@@ -0,0 +1,32 @@
+import json
+import math
+from indra_world import json_codec
+
+
+def test_roundtrip():
+    obj = {'a': [1, 2.5, None, True], 'b': {'c': 'dé'},
+           'hash': -1234567890123456789, 'u64': 2 ** 64 - 1,
+           'digits': '123456789012345678901234567890'}
+    big_obj = {'big': 2 ** 70 + 1, 'neg_big': -2 ** 63 - 1}
+    try:
+        for backend in ['json', 'orjson']:
+            if backend == 'orjson' and json_codec.orjson is None:
+                continue
+            json_codec.set_backend(backend)
+            assert json_codec.get_backend() == backend
+            jstr = json_codec.dumps(obj)
+            assert isinstance(jstr, str)
+            assert json.loads(jstr) == obj
+            assert json_codec.loads(jstr) == obj
+            assert json_codec.loads(jstr.encode('utf-8')) == obj
+            assert json.loads(json_codec.dumps(obj, indent=1)) == obj
+            sorted_str = json_codec.dumps({'b': 1, 'a': 2}, sort_keys=True)
+            assert sorted_str.index('"a"') < sorted_str.index('"b"')
+            # Integers beyond 64 bits are serialized without loss
+            assert json.loads(json_codec.dumps(big_obj)) == big_obj
+            # NaN literals aren't supported by orjson but can be loaded
+            assert math.isnan(json_codec.loads('[NaN]')[0])
+        json_codec.set_backend('json')
+        assert json_codec.loads(json.dumps(big_obj)) == big_obj
+    finally:
+        json_codec._backend = None
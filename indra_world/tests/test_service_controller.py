@@ -145,3 +145,42 @@ def test_get_projects():
     projects = sc.get_projects()
     assert len(projects) == 1
     assert projects[0] == {'id': 'p1', 'name': 'Project 1'}
+
+
+def test_process_dart_records():
+    import tempfile
+    local_storage = tempfile.mkdtemp()
+    dart_client = DartClient(storage_mode='local',
+                             local_storage=local_storage)
+    sc = ServiceController(db_url='sqlite:///:memory:',
+                           dart_client=dart_client)
+    sc.db.create_all()
+    records = [{'identity': 'eidos',
+                'version': '1.0',
+                'document_id': 'd%d' % idx,
+                'storage_key': 'xxx%d' % idx,
+                'output_version': '1.2'} for idx in range(3)]
+    eidos_output = _get_eidos_output()
+    for record in records:
+        with open(dart_client.get_local_storage_path(record), 'w') as fh:
+            fh.write(eidos_output)
+    # A record whose output can't be processed
+    bad_record = dict(records[0], document_id='d3', storage_key='xxx3')
+    with open(dart_client.get_local_storage_path(bad_record), 'w') as fh:
+        fh.write('{')
+    res = sc.process_dart_records(records + [bad_record], nproc=2,
+                                  batch_size=2, chunksize=1)
+    assert sorted(res['processed']) == ['xxx0', 'xxx1', 'xxx2']
+    assert list(res['failed']) == ['xxx3']
+    assert len(sc.get_all_records()) == 3
+    for record in records:
+        stmts = sc.db.get_statements_for_record(record['storage_key'])
+        assert len(stmts) == 1, stmts
+
+
+def test_process_dart_record_missing_output():
+    sc = _get_controller()
+    record = {'identity': 'eidos', 'version': '1.0', 'document_id': 'd1',
+              'storage_key': 'missing', 'output_version': '1.2'}
+    assert sc.process_dart_record(record) is None
+    assert sc.db.get_statements_for_record('missing') == []
@@ -89,6 +89,15 @@ def test_influence_event_polarity():
     assert stmt.obj.delta.polarity == -1, stmt.obj.delta
 
 
+def test_event_filter_skips_relations():
+    # Events that are part of relations are not extracted standalone,
+    # and influences are only extracted if requested
+    test_file = _get_data_file('sofia_infl_polarities.json')
+    sp = sofia.process_json_file(test_file, extract_filter={'event'},
+                                 grounding_mode='flat')
+    assert not sp.statements, sp.statements
+
+
 def test_grounding_normalize():
     grnd, _ = SofiaProcessor._clean_grnd_filter(
         'event/base_path/concept/plan', 0.6, 'process')
@@ -96,3 +105,61 @@ def test_grounding_normalize():
     grnd, _ = SofiaProcessor._clean_grnd_filter(
         'event/base_path/process/provision', 0.6, 'process')
     assert grnd == 'wm/process/provision', grnd
+
+
+def make_table(test_file):
+    """Return the path to an Excel workbook made from a Sofia JSON output."""
+    import json
+    import tempfile
+    import openpyxl
+    with open(test_file, 'r') as fh:
+        jd = json.load(fh)
+    # We write the JSON extractions into the Excel format
+    book = openpyxl.Workbook()
+    book.remove(book.active)
+    for sheet_name, key in [('Causal', 'causal'), ('Events', 'events'),
+                            ('Entities', 'entities')]:
+        sheet = book.create_sheet(sheet_name)
+        header = sorted({k for row in jd[key] for k in row})
+        sheet.append(header)
+        for row in jd[key]:
+            sheet.append([row.get(h) for h in header])
+    fname = os.path.join(tempfile.mkdtemp(), 'sofia.xlsx')
+    book.save(fname)
+    return fname
+
+
+def test_process_table():
+    test_file = _get_data_file('sofia_infl_polarities.json')
+    fname = make_table(test_file)
+    sp = sofia.process_table(fname, grounding_mode='flat')
+    sp_json = sofia.process_json_file(test_file, grounding_mode='flat')
+    assert sp.statements
+    assert [s.get_hash() for s in sp.statements] == \
+        [s.get_hash() for s in sp_json.statements]
+
+
+def test_process_table_no_entities():
+    import tempfile
+    import openpyxl
+    from indra_world.sources.sofia.processor import rows_to_dicts
+    assert rows_to_dicts([('a', 'b'), (1, None), (None, None)]) == \
+        [{'a': 1, 'b': None}]
+    book = openpyxl.Workbook()
+    book.remove(book.active)
+    book.create_sheet('Causal').append(['Cause Index', 'Effect Index'])
+    events = book.create_sheet('Events')
+    events.append(['Event Index', 'Relation', 'Event_Type', 'Agent Index',
+                   'Patient Index', 'Sentence'])
+    events.append(['E1', 'increase', 'event1/process/increase', None, None,
+                   'Prices increase.'])
+    # The entities sheet isn't processed so its columns don't matter
+    book.create_sheet('Entities').append(['Entity'])
+    book['Entities'].append(['prices'])
+    fname = os.path.join(tempfile.mkdtemp(), 'sofia.xlsx')
+    book.save(fname)
+
+    sp = sofia.process_table(fname, grounding_mode='flat')
+    assert len(sp.statements) == 1
+    assert sp.statements[0].concept.name == 'increase'
+    assert not sp.statements[0].evidence[0].annotations
@@ -89,3 +89,31 @@ def test_old_new_format_switch():
     new_ont = load_world_ontology(new_url)
     new_ont.initialize()
     assert len(new_ont) == 580, len(new_ont)
+
+
+def test_get_ontology_changes():
+    from indra_world.ontology import get_ontology_changes
+    old_yml = yaml.load("""
+- node:
+    name: wm
+    children:
+      - node:
+          name: food
+          examples: [food, nutrition]
+      - node:
+          name: water
+          examples: [water]
+      - node:
+          name: fuel
+          examples: [fuel]
+""", Loader=yaml.FullLoader)
+    new_yml = copy.deepcopy(old_yml)
+    children = new_yml[0]['node']['children']
+    children[0]['node']['examples'].append('crop yield')
+    children.pop(2)
+    children.append({'node': {'name': 'rain', 'examples': ['rainfall']}})
+    changed_nodes, added_examples = get_ontology_changes(old_yml, new_yml)
+    assert changed_nodes == {'wm/food', 'wm/fuel', 'wm/rain'}, \
+        changed_nodes
+    assert added_examples == {'wm/food': ['crop yield'],
+                              'wm/rain': ['rainfall']}, added_examples